@@ -187,6 +187,13 @@ SIMULATION_CONFIG = {
     'plot_interval': 0.1,    # seconds
     'data_dir': 'data/',
     'plots_dir': 'assets/images/',
+    'output_chunk_rows': 8192,      # HDF5 rows per chunk/write (see history_store.py)
+    'output_compression': 'gzip',
+    
+    # Result cache (see result_cache.py)
+    'cache_enabled': False,  # Opt in (or TRIFECTA_CACHE=1): runs write to disk
+    'cache_dir': None,       # None: $TRIFECTA_CACHE_DIR or ~/.cache/trifecta
+    'cache_max_bytes': 2e9,  # LRU eviction above this size
 }
 
 # ============================================================================
@@ -0,0 +1,301 @@
+"""
+History Store
+
+Streaming, compressed HDF5 storage for simulation output.
+
+Time series are written column by column (one extendable dataset per
+field) and field data as stacks of frames. Rows are buffered and written
+one chunk at a time while the simulation runs, so memory stays bounded
+however long the run. Each dataset carries its units, and the file
+carries the run parameters as JSON, so a file is self-describing.
+
+Readers return the h5py datasets themselves: slicing one reads and
+decompresses only the chunks it touches, so multi-GB files can be
+inspected range by range without loading them.
+
+Layout:
+    /<series>/<field>    1-D float64, attrs 'units'
+    /<series>            attrs 'fields'
+    /<frames>            (n, ...) stack, attrs 'units'
+    /                    attrs 'schema_version', 'parameters' (JSON)
+
+Typical use:
+    with HistoryStore('run.h5', 'w', parameters={'P_laser': 5.0}) as store:
+        series = store.series('history', ('t', 'T'), units=('s', 'K'))
+        for row in rows:
+            series.append(row)
+
+    with HistoryStore('run.h5') as store:
+        T = store['history']['T'][1000:2000]
+        window = store['history'].time_slice(0.5, 1.0)
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import bisect
+import json
+
+import numpy as np
+
+from config import SIMULATION_CONFIG
+
+h5py = None  # Optional, imported by the first store opened (~40 ms)
+
+# Bump when the layout changes incompatibly
+SCHEMA_VERSION = 1
+
+
+def _require_h5py():
+    global h5py
+    if h5py is None:
+        try:
+            import h5py as module
+        except ImportError:
+            raise ImportError("HDF5 output requires h5py (pip install h5py)") from None
+        h5py = module
+
+
+class SeriesWriter:
+    """
+    Buffered appender for one time-series group
+
+    Rows collect in a (chunk_rows × fields) block that is written to the
+    per-field datasets whenever it fills (and on flush/close).
+    """
+
+    def __init__(self, group, fields, chunk_rows):
+        self.group = group
+        self.fields = tuple(fields)
+        self._datasets = [group[name] for name in self.fields]
+        self._block = np.zeros((chunk_rows, len(self.fields)))
+        self._n_block = 0
+
+    def __len__(self):
+        return self._datasets[0].shape[0] + self._n_block
+
+    def append(self, row):
+        """Append one value per field"""
+        self._block[self._n_block] = row
+        self._n_block += 1
+        if self._n_block == self._block.shape[0]:
+            self.flush()
+
+    def extend(self, rows):
+        """Append rows (array_like, shape (n, fields))"""
+        rows = np.asarray(rows, dtype=float).reshape(-1, len(self.fields))
+        free = self._block.shape[0] - self._n_block
+        if len(rows) < free:
+            self._block[self._n_block:self._n_block + len(rows)] = rows
+            self._n_block += len(rows)
+            return
+        # Large batch: write straight through after the buffered rows
+        self.flush()
+        self._write(rows)
+
+    def flush(self):
+        """Write the buffered rows"""
+        if self._n_block:
+            self._write(self._block[:self._n_block])
+            self._n_block = 0
+
+    def _write(self, rows):
+        n = self._datasets[0].shape[0]
+        for dataset, column in zip(self._datasets, rows.T):
+            dataset.resize((n + len(rows),))
+            dataset[n:] = column
+
+
+class FrameWriter:
+    """Appender for a stack of equally shaped field snapshots"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return self.dataset.shape[0]
+
+    def append(self, frame):
+        """Append one frame (array of the stack's frame shape)"""
+        n = self.dataset.shape[0]
+        self.dataset.resize((n + 1,) + self.dataset.shape[1:])
+        self.dataset[n] = frame
+
+
+class SeriesReader:
+    """
+    Lazy view of one time-series group
+
+    Indexing by field name returns the h5py dataset, which can be sliced
+    like an array without reading the rest of the file.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.fields = tuple(group.attrs['fields'])
+
+    def __len__(self):
+        return self.group[self.fields[0]].shape[0]
+
+    def __getitem__(self, name):
+        return self.group[name]
+
+    @property
+    def units(self):
+        """{field: units}"""
+        return {name: self.group[name].attrs['units'] for name in self.fields}
+
+    def read(self, start=None, stop=None, fields=None):
+        """{field: ndarray} for rows start:stop"""
+        return {name: self.group[name][start:stop] for name in (fields or self.fields)}
+
+    def time_slice(self, t_start, t_stop, fields=None, time_field='t'):
+        """
+        Rows with t_start <= t < t_stop
+
+        The row range is found by bisection on the (increasing) time
+        dataset, touching O(log n) chunks instead of reading it whole.
+        """
+        t = self.group[time_field]
+        start = bisect.bisect_left(_DatasetSequence(t), t_start)
+        stop = bisect.bisect_left(_DatasetSequence(t), t_stop, lo=start)
+        return self.read(start, stop, fields)
+
+
+class _DatasetSequence:
+    """Sequence adapter so bisect can probe a 1-D dataset element-wise"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return self.dataset.shape[0]
+
+    def __getitem__(self, i):
+        return self.dataset[i]
+
+
+class HistoryStore:
+    """
+    HDF5 file of time series and field frames
+
+    Parameters:
+    -----------
+    path : str
+        File path
+    mode : str
+        'r' (default), 'r+', 'w' (truncate) or 'a'
+    parameters : dict, optional
+        Run parameters stored as JSON in the file attributes (write modes)
+    chunk_rows : int, optional
+        Rows per chunk and per write (default
+        SIMULATION_CONFIG['output_chunk_rows'])
+    compression : str or None, optional
+        h5py filter (default SIMULATION_CONFIG['output_compression'])
+    """
+
+    def __init__(self, path, mode='r', parameters=None, chunk_rows=None, compression=None):
+        _require_h5py()
+        self.path = path
+        self.chunk_rows = int(chunk_rows or SIMULATION_CONFIG['output_chunk_rows'])
+        self.compression = compression or SIMULATION_CONFIG['output_compression']
+        self.file = h5py.File(path, mode)
+        self._writers = []
+        if mode != 'r':
+            self.file.attrs.setdefault('schema_version', SCHEMA_VERSION)
+            if parameters is not None:
+                self.file.attrs['parameters'] = json.dumps(parameters, default=float)
+        elif self.file.attrs.get('schema_version', SCHEMA_VERSION) > SCHEMA_VERSION:
+            raise ValueError(f"'{path}' uses a newer store schema "
+                             f"({self.file.attrs['schema_version']} > {SCHEMA_VERSION})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.file
+
+    def __getitem__(self, name):
+        """SeriesReader for a series group, h5py dataset for frames"""
+        node = self.file[name]
+        return SeriesReader(node) if isinstance(node, h5py.Group) else node
+
+    @property
+    def parameters(self):
+        """Run parameters stored with the file"""
+        return json.loads(self.file.attrs.get('parameters', '{}'))
+
+    def _dataset_options(self):
+        options = {'compression': self.compression}
+        if self.compression:
+            options['shuffle'] = True  # Byte shuffling helps smooth float data
+        return options
+
+    def series(self, name, fields, units=None):
+        """
+        Create (or reopen for appending) a time-series group
+
+        Parameters:
+        -----------
+        name : str
+            Group path, e.g. 'history' or 'stats/mean'
+        fields : sequence of str
+            Column names
+        units : sequence of str, optional
+            Units per field
+
+        Returns:
+        --------
+        writer : SeriesWriter
+        """
+        fields = tuple(fields)
+        if name in self.file:
+            group = self.file[name]
+            if tuple(group.attrs['fields']) != fields:
+                raise ValueError(f"Series '{name}' exists with fields {tuple(group.attrs['fields'])}")
+        else:
+            group = self.file.create_group(name)
+            group.attrs['fields'] = list(fields)
+            for i, field in enumerate(fields):
+                dataset = group.create_dataset(field, shape=(0,), maxshape=(None,), dtype='f8',
+                                               chunks=(self.chunk_rows,), **self._dataset_options())
+                dataset.attrs['units'] = units[i] if units else ''
+        writer = SeriesWriter(group, fields, self.chunk_rows)
+        self._writers.append(writer)
+        return writer
+
+    def frames(self, name, shape, units='', dtype='f8'):
+        """
+        Create a stack of field snapshots, one chunk per frame
+
+        Parameters:
+        -----------
+        name : str
+            Dataset path
+        shape : tuple of int
+            Shape of one frame (e.g. grid resolution)
+        units : str
+            Units of the field values
+        """
+        shape = tuple(shape)
+        dataset = self.file.create_dataset(name, shape=(0,) + shape, maxshape=(None,) + shape,
+                                           dtype=dtype, chunks=(1,) + shape,
+                                           **self._dataset_options())
+        dataset.attrs['units'] = units
+        return FrameWriter(dataset)
+
+    def flush(self):
+        """Write buffered rows and flush the file to disk"""
+        for writer in self._writers:
+            writer.flush()
+        self.file.flush()
+
+    def close(self):
+        """Flush and close the file"""
+        if self.file:
+            for writer in self._writers:
+                writer.flush()
+            self.file.close()
@@ -5,6 +5,10 @@ Physical properties for various rock types and materials
 for the Trifecta Drill simulations
 """
 
+import bisect
+import os
+import sys
+
 import numpy as np
 
 # ============================================================================
@@ -216,6 +220,246 @@ MATERIALS = {
     },
 }
 
+# ============================================================================
+# TEMPERATURE-DEPENDENT PROPERTIES
+# ============================================================================
+
+# Consumed by TrifectaDrillSimulator(temperature_dependent=True) in fixed-step
+# run(); run_adaptive() and the ensemble reject that option, and
+# PulsedLaserHeating and PlasmaEfficiencyModel keep their constant properties.
+
+# Tabulation temperatures (K)
+PROPERTY_TEMPERATURES = [300.0, 400.0, 500.0, 600.0, 700.0, 800.0, 1000.0, 1200.0, 1500.0]
+
+# Property / value at 300 K for typical silicate rock. Conductivity falls
+# with the phonon mean free path (slight radiative recovery near melt),
+# heat capacity rises toward the Dulong-Petit limit, and blue absorptivity
+# grows as the surface darkens and oxidizes.
+PROPERTY_RATIOS = {
+    'thermal_conductivity': [1.00, 0.87, 0.77, 0.70, 0.64, 0.60, 0.55, 0.53, 0.55],
+    'specific_heat':        [1.00, 1.10, 1.18, 1.24, 1.29, 1.33, 1.38, 1.41, 1.45],
+    'absorptivity_445nm':   [1.00, 1.00, 1.02, 1.05, 1.08, 1.12, 1.22, 1.35, 1.60],
+}
+
+# Measured tables replacing the scaled defaults: {material: {property: values}}
+# on PROPERTY_TEMPERATURES
+PROPERTY_TABLES = {}
+
+# ============================================================================
+# COLUMNAR STORE
+# ============================================================================
+
+class MaterialTable:
+    """
+    Columnar, read-only view of a material database
+    
+    Every numeric property becomes a float64 field of one structured array
+    (one row per material, NaN where a material lacks the property); nested
+    dicts are flattened to '<key>_<sub>' (e.g. 'absorptivity_445nm').
+    Missing acoustic_impedance (ρc) and thermal_diffusivity (k/ρc_p) are
+    filled in vectorized at build time. Columns are read-only views, so
+    lookups never copy the database.
+    
+    The table is a snapshot: rebuild it after editing MATERIALS.
+    
+    Typical use:
+        ids = MATERIAL_TABLE.ids(sample_materials)      # millions of names
+        rho = MATERIAL_TABLE['density'][ids]
+    """
+    
+    def __init__(self, materials=None):
+        materials = MATERIALS if materials is None else materials
+        self.names = tuple(materials)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        
+        rows = [self._flatten(props) for props in materials.values()]
+        fields = sorted({key for row in rows for key in row})
+        self.records = np.full(len(rows), np.nan, dtype=[(field, 'f8') for field in fields])
+        for i, row in enumerate(rows):
+            for key, value in row.items():
+                self.records[key][i] = value
+        
+        # Derived properties where the database gives none
+        Z = self.records['acoustic_impedance']
+        Z[:] = np.where(np.isnan(Z), self.records['density'] * self.records['p_wave_velocity'], Z)
+        alpha = self.records['thermal_diffusivity']
+        alpha[:] = np.where(np.isnan(alpha), self.records['thermal_conductivity'] /
+                            (self.records['density'] * self.records['specific_heat']), alpha)
+        
+        self.records.flags.writeable = False
+    
+    @staticmethod
+    def _flatten(props):
+        row = {}
+        for key, value in props.items():
+            if isinstance(value, dict):
+                for sub, item in value.items():
+                    row[f'{key}_{sub}'] = float(item)
+            elif isinstance(value, (int, float)):
+                row[key] = float(value)
+        return row
+    
+    @property
+    def properties(self):
+        """Available column names"""
+        return self.records.dtype.names
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def __getitem__(self, prop):
+        """Read-only column (one value per material, indexed by id)"""
+        return self.records[self.column_name(prop)]
+    
+    @staticmethod
+    def column_name(prop):
+        """Column for a property key; ('absorptivity', '445nm') -> 'absorptivity_445nm'"""
+        return f'{prop[0]}_{prop[1]}' if isinstance(prop, tuple) else prop
+    
+    def id(self, name):
+        """Row index of a material (case-insensitive)"""
+        try:
+            return self._index[name.lower()]
+        except KeyError:
+            available = ', '.join(self.names)
+            raise ValueError(f"Material '{name}' not found. Available: {available}") from None
+    
+    def ids(self, materials):
+        """
+        Row indices for many materials at once
+        
+        Parameters:
+        -----------
+        materials : str, sequence of str or array of int
+            Names are resolved once per distinct value; integer ids pass
+            through unchanged
+            
+        Returns:
+        --------
+        ids : ndarray of int
+        """
+        materials = np.asarray(materials)
+        if materials.dtype.kind in 'iu':
+            return materials
+        unique, inverse = np.unique(materials, return_inverse=True)
+        lookup = np.array([self.id(str(name)) for name in unique], dtype=np.intp)
+        return lookup[inverse].reshape(materials.shape)
+    
+    def take(self, materials, properties=None):
+        """
+        Per-sample property arrays
+        
+        Parameters:
+        -----------
+        materials : str, sequence of str or array of int
+            Material of each sample (names or ids)
+        properties : sequence, optional
+            Column names or (key, sub) tuples (default all)
+            
+        Returns:
+        --------
+        values : dict of ndarray
+            {property: array shaped like materials}
+        """
+        ids = self.ids(materials)
+        properties = self.properties if properties is None else properties
+        return {prop: self[prop][ids] for prop in properties}
+
+
+class PropertyTable:
+    """
+    Temperature-dependent properties of one material
+    
+    Properties are tabulated on PROPERTY_TEMPERATURES (PROPERTY_TABLES
+    where given, else the database value at 300 K times PROPERTY_RATIOS)
+    and interpolated with a monotone cubic (PCHIP), so there is no
+    overshoot between table points. Temperatures outside the table clamp
+    to its ends. thermal_diffusivity = k/(ρ c_p) is tabulated alongside.
+    
+    __call__ evaluates arrays in one vectorized pass. at() serves scalar
+    hot loops: it memoizes every property on temperature rounded to
+    `quantum` kelvin, so repeated steps cost one dict lookup, and a miss
+    evaluates the cubic pieces in plain Python (no NumPy call overhead).
+    
+    Parameters:
+    -----------
+    name : str
+        Material name
+    quantum : float
+        Temperature resolution of the at() memo (K)
+    """
+    
+    def __init__(self, name, quantum=0.1):
+        self.name = name.lower()
+        self.quantum = quantum
+        self.temperatures = np.array(PROPERTY_TEMPERATURES)
+        
+        row = MATERIAL_TABLE.id(name)
+        measured = PROPERTY_TABLES.get(self.name, {})
+        columns = {}
+        for prop, ratios in PROPERTY_RATIOS.items():
+            if prop in measured:
+                columns[prop] = np.asarray(measured[prop], dtype=float)
+            else:
+                columns[prop] = MATERIAL_TABLE[prop][row] * np.asarray(ratios)
+        columns['thermal_diffusivity'] = (columns['thermal_conductivity'] /
+                                          (MATERIAL_TABLE['density'][row] * columns['specific_heat']))
+        self.properties = tuple(columns)
+        self.values = np.column_stack([columns[prop] for prop in self.properties])
+        self.values.flags.writeable = False
+        
+        from scipy.interpolate import PchipInterpolator  # Deferred: scipy import is slow
+        self._interp = PchipInterpolator(self.temperatures, self.values, axis=0)
+        self._T_min = float(self.temperatures[0])
+        self._T_max = float(self.temperatures[-1])
+        self._memo = {}
+        
+        # Scalar path: breakpoints and per-piece (c3, c2, c1, c0) per property
+        self._breaks = self.temperatures.tolist()
+        self._pieces = [list(zip(*self._interp.c[:, i, :].tolist()))
+                        for i in range(len(self._breaks) - 1)]
+    
+    def __call__(self, T, prop=None):
+        """
+        Vectorized evaluation
+        
+        Parameters:
+        -----------
+        T : float or array_like
+            Temperature(s) (K)
+        prop : str, optional
+            One property; default all
+            
+        Returns:
+        --------
+        values : ndarray or dict of ndarray
+        """
+        values = self._interp(np.clip(T, self._T_min, self._T_max))
+        if prop is not None:
+            return values[..., self.properties.index(prop)]
+        return {name: values[..., i] for i, name in enumerate(self.properties)}
+    
+    def at(self, T):
+        """
+        All properties at a scalar temperature, memoized on T rounded to quantum
+        
+        Returns:
+        --------
+        values : dict
+            {property: float}; shared between callers, do not modify
+        """
+        key = round(float(T) / self.quantum)
+        values = self._memo.get(key)
+        if values is None:
+            T_key = min(max(key * self.quantum, self._T_min), self._T_max)
+            i = min(bisect.bisect_right(self._breaks, T_key), len(self._pieces)) - 1
+            x = T_key - self._breaks[i]
+            values = {prop: ((a * x + b) * x + c) * x + d
+                      for prop, (a, b, c, d) in zip(self.properties, self._pieces[i])}
+            self._memo[key] = values
+        return values
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -267,30 +511,25 @@ def compare_materials(property_name):
         else:
             print(f"  {name.capitalize():12s}: N/A")
 
+_property_tables = {}
+
+def get_property_table(material_name):
+    """Shared PropertyTable of a material (built on first use)"""
+    key = material_name.lower()
+    table = _property_tables.get(key)
+    if table is None:
+        table = _property_tables[key] = PropertyTable(key)
+    return table
+
 def get_acoustic_impedance(material_name):
-    """Calculate acoustic impedance if not provided"""
-    mat = get_material(material_name)
-    if 'acoustic_impedance' in mat:
-        return mat['acoustic_impedance']
-    else:
-        # Z = ρ * c
-        rho = mat['density']
-        c = mat['p_wave_velocity']
-        return rho * c
+    """Acoustic impedance (database value, else Z = ρ * c)"""
+    return float(MATERIAL_TABLE['acoustic_impedance'][MATERIAL_TABLE.id(material_name)])
 
 def get_thermal_diffusivity(material_name):
-    """Calculate thermal diffusivity if not provided"""
-    mat = get_material(material_name)
-    if 'thermal_diffusivity' in mat:
-        return mat['thermal_diffusivity']
-    else:
-        # α = k / (ρ * c_p)
-        k = mat['thermal_conductivity']
-        rho = mat['density']
-        c_p = mat['specific_heat']
-        return k / (rho * c_p)
+    """Thermal diffusivity (database value, else α = k / (ρ * c_p))"""
+    return float(MATERIAL_TABLE['thermal_diffusivity'][MATERIAL_TABLE.id(material_name)])
 
-def estimate_drilling_rate(material_name, method='trifecta'):
+def estimate_drilling_rate(material_name, method='trifecta', depth=None):
     """
     Estimate drilling rate for a material
     
@@ -300,6 +539,9 @@ def estimate_drilling_rate(material_name, method='trifecta'):
         Material name
     method : str
         'mechanical' or 'trifecta'
+    depth : float or array_like, optional
+        Hole depth (m, 0-1000) for a trifecta rate from the depth-dependent
+        engine in simulations/coupled/drilling_rate.py (cached per material)
         
     Returns:
     --------
@@ -309,6 +551,8 @@ def estimate_drilling_rate(material_name, method='trifecta'):
     
     if method == 'mechanical':
         return mat['drilling_rate_mechanical']
+    elif method == 'trifecta' and depth is not None:
+        return _rate_at_depth(material_name, depth)
     elif method == 'trifecta':
         # Estimate based on synergy factor (15-20×)
         base = mat['drilling_rate_mechanical']
@@ -317,6 +561,18 @@ def estimate_drilling_rate(material_name, method='trifecta'):
     else:
         raise ValueError(f"Unknown method: {method}")
 
+def _rate_at_depth(material_name, depth):
+    """Depth-dependent trifecta rate (imported lazily: drilling_rate imports this module)"""
+    coupled = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', '..', 'simulations', 'coupled')
+    if coupled not in sys.path:
+        sys.path.insert(0, coupled)
+    from drilling_rate import rate_at_depth
+    return rate_at_depth(material_name, depth)
+
+# Shared columnar snapshot of MATERIALS
+MATERIAL_TABLE = MaterialTable()
+
 # ============================================================================
 # EXAMPLE USAGE
 # ============================================================================
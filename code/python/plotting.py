@@ -0,0 +1,182 @@
+"""
+Plotting Backend
+
+Lazy matplotlib access for the simulation scripts. Nothing here imports
+matplotlib at module load, so computing without plotting never pays its
+import cost (~0.5 s) or touches a display.
+
+Each script splits its validation into the computation (run_validation)
+and the figure (plot_validation), which asks for pyplot only when called.
+Run a script with --headless to compute and print without plotting.
+
+Long histories are reduced to screen resolution before drawing, by
+largest-triangle-three-buckets (shape-preserving) or min/max envelopes
+(keeps every extreme), and figures can be rendered on the Agg backend in
+a background process so the caller goes on computing meanwhile.
+
+Typical use:
+    from plotting import headless_requested, pyplot
+
+    def plot_validation(results, show=True):
+        plt = pyplot(show)
+        ...
+
+    if __name__ == '__main__':
+        run_validation(plot=not headless_requested())
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Points kept per line: ~2 per horizontal pixel of a full-width panel
+SCREEN_POINTS = 2000
+
+DOWNSAMPLERS = ('lttb', 'minmax')
+
+
+def pyplot(show=True):
+    """
+    matplotlib.pyplot, imported on first call
+
+    With show=False the non-interactive Agg backend is selected before
+    the first pyplot import, so figures are only saved and no GUI toolkit
+    is loaded.
+    """
+    if not show and 'matplotlib.pyplot' not in sys.modules:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def finish(plt, fig, show):
+    """Display the figure, or release it when only saved"""
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+def headless_requested(argv=None):
+    """True if the script was started with --headless (no plotting at all)"""
+    return '--headless' in (sys.argv[1:] if argv is None else argv)
+
+
+def lttb(x, y, n_out=SCREEN_POINTS):
+    """
+    Largest-triangle-three-buckets subsample
+
+    Keeps the first and last points and, from each of n_out - 2 equal
+    buckets in between, the point spanning the largest triangle with the
+    previously kept point and the mean of the next bucket.
+
+    Parameters:
+    -----------
+    x, y : array_like
+        Samples (x increasing)
+    n_out : int
+        Points to keep
+
+    Returns:
+    --------
+    idx : ndarray of int
+        Indices of the kept samples (all if n_out >= len(x))
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # Buckets [edges[i], edges[i+1])
+    counts = np.diff(edges)
+    x_mean = np.append(np.add.reduceat(x[:-1], edges[:-1]) / counts, x[-1])
+    y_mean = np.append(np.add.reduceat(y[:-1], edges[:-1]) / counts, y[-1])
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xa, ya = x[a], y[a]
+        # Twice the triangle area (a, candidate, next-bucket mean)
+        area = np.abs((xa - x_mean[i + 1]) * (y[lo:hi] - ya) -
+                      (xa - x[lo:hi]) * (y_mean[i + 1] - ya))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def minmax_envelope(y, n_buckets=SCREEN_POINTS // 2):
+    """
+    Indices of the minimum and maximum of each of n_buckets equal buckets
+
+    Every extreme survives, so spikes stay visible; at most 2·n_buckets
+    points are kept, in order.
+    """
+    y = np.asarray(y, dtype=float)
+    n = y.size
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+
+    starts = np.linspace(0, n, n_buckets + 1).astype(int)[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+    idx = []
+    for reduce in (np.minimum, np.maximum):
+        hits = np.flatnonzero(y == reduce.reduceat(y, starts)[bucket])
+        idx.append(hits[np.unique(bucket[hits], return_index=True)[1]])  # First per bucket
+    return np.unique(np.concatenate(idx))
+
+
+def downsample(x, y, n_out=SCREEN_POINTS, method='lttb'):
+    """
+    Reduce a line to about n_out points for drawing
+
+    Parameters:
+    -----------
+    x, y : array_like
+        Samples (x increasing)
+    n_out : int
+        Target number of points
+    method : str
+        'lttb' (shape-preserving) or 'minmax' (envelope of extremes)
+
+    Returns:
+    --------
+    x, y : ndarray
+        Kept samples
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown downsampler '{method}'. Available: {', '.join(DOWNSAMPLERS)}")
+    x = np.asarray(x)
+    y = np.asarray(y)
+    idx = lttb(x, y, n_out) if method == 'lttb' else minmax_envelope(y, n_out // 2)
+    return x[idx], y[idx]
+
+
+_renderer = None
+
+
+def render_in_background(function, *args, **kwargs):
+    """
+    Call function(*args, show=False, **kwargs) in a rendering process
+
+    One worker process draws the submitted figures in order on the Agg
+    backend while the caller continues. Arguments must be picklable (pass
+    downsampled arrays rather than simulators). Pending figures are
+    finished before the interpreter exits.
+
+    Returns:
+    --------
+    future : concurrent.futures.Future
+        Resolves to the function's return value
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = ProcessPoolExecutor(max_workers=1)
+    return _renderer.submit(function, *args, show=False, **kwargs)
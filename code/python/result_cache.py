@@ -0,0 +1,364 @@
+"""
+Result Cache
+
+Content-addressed disk cache for expensive simulation calls.
+
+A result is stored under the SHA-256 of everything that determines it:
+the instance state (every attribute, arrays by content), the call
+arguments, a code version (source of the defining module plus
+config.py and material_properties.py) and the live contents of the
+config dicts the cached methods read (SIMULATION_CONFIG, SAFETY_LIMITS,
+MATERIALS). Rerunning with unchanged parameters loads the pickled
+result instead of recomputing; changing any constant, config entry
+(also when patched at runtime) or line of code gives a new key.
+
+Entries are written atomically (temporary file + rename), so concurrent
+processes never see partial files. Reads refresh the entry's mtime,
+which orders least-recently-used eviction once the directory exceeds
+its size cap; eviction runs under an advisory file lock.
+
+Typical use:
+    class Model:
+        @cached_method()
+        def compute(self, n=100):
+            ...
+
+The cache is off by default: a cached run() pickles its whole final
+state to disk. Opt in with SIMULATION_CONFIG['cache_enabled'] = True or
+TRIFECTA_CACHE=1 (TRIFECTA_CACHE=0 overrides the config), and bypass it
+around calls with `with disabled():` (e.g. timings).
+"""
+
+import contextlib
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import struct
+import tempfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction runs unlocked
+    fcntl = None
+
+from config import SAFETY_LIMITS, SIMULATION_CONFIG
+from material_properties import MATERIALS
+
+# Bump to invalidate every entry after a change in key or storage format
+FORMAT_VERSION = 1
+
+# Library modules whose source is part of every code version
+_LIBRARY_SOURCES = ('config.py', 'material_properties.py')
+
+
+def _encode(obj, h, seen):
+    """Feed a type-tagged, order-stable encoding of obj into hash h"""
+    if obj is None or isinstance(obj, (bool, str, bytes, int)):
+        h.update(f'{type(obj).__name__}:{obj!r};'.encode())
+    elif isinstance(obj, float):
+        h.update(b'f:' + struct.pack('<d', obj))
+    elif isinstance(obj, np.generic):
+        h.update(f'np:{obj.dtype.str}:'.encode() + obj.tobytes())
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            raise TypeError("Object arrays cannot be hashed")
+        h.update(f'nd:{obj.dtype.str}:{obj.shape};'.encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(f'{type(obj).__name__}:{len(obj)}['.encode())
+        for item in obj:
+            _encode(item, h, seen)
+        h.update(b']')
+    elif isinstance(obj, dict):
+        h.update(f'dict:{len(obj)}{{'.encode())
+        for key in sorted(obj, key=repr):
+            _encode(key, h, seen)
+            _encode(obj[key], h, seen)
+        h.update(b'}')
+    elif isinstance(obj, (set, frozenset)):
+        h.update(f'set:{len(obj)}{{'.encode())
+        for item in sorted(obj, key=repr):
+            _encode(item, h, seen)
+        h.update(b'}')
+    elif callable(obj) and hasattr(obj, '__qualname__'):
+        h.update(f'fn:{getattr(obj, "__module__", "")}.{obj.__qualname__};'.encode())
+    elif hasattr(obj, '__dict__'):
+        if id(obj) in seen:
+            raise TypeError("Cyclic object state cannot be hashed")
+        seen.add(id(obj))
+        h.update(f'obj:{type(obj).__module__}.{type(obj).__qualname__}'.encode())
+        # Classes control their hashed state the same way as their pickled state
+        getstate = getattr(type(obj), '__getstate__', None)
+        state = getstate(obj) if getstate is not None else vars(obj)
+        _encode(vars(obj) if state is None else state, h, seen)
+        seen.discard(id(obj))
+    else:
+        raise TypeError(f"Cannot hash {type(obj).__name__}")
+
+
+def stable_hash(*objs):
+    """Hex SHA-256 of objs, stable across processes and sessions"""
+    h = hashlib.sha256()
+    for obj in objs:
+        _encode(obj, h, set())
+    return h.hexdigest()
+
+
+_source_hashes = {}
+
+
+def _source_hash(path):
+    """SHA-256 of a source file (memoized per process)"""
+    digest = _source_hashes.get(path)
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = _source_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return digest
+
+
+def code_version(fn):
+    """Hash of fn's module source, the library sources and FORMAT_VERSION"""
+    library = os.path.dirname(os.path.abspath(__file__))
+    paths = [inspect.getsourcefile(fn)] + [os.path.join(library, name) for name in _LIBRARY_SOURCES]
+    return stable_hash(FORMAT_VERSION, [_source_hash(path) for path in paths])
+
+
+def config_state():
+    """
+    Live contents of the config dicts read by the cached methods
+    
+    Computed per call so runtime edits (sweeps, tests) change the key.
+    The cache_* settings only control the cache itself and are left out.
+    """
+    simulation = {name: value for name, value in SIMULATION_CONFIG.items()
+                  if not name.startswith('cache_')}
+    return simulation, SAFETY_LIMITS, MATERIALS
+
+
+def default_directory():
+    """
+    Directory shared by every on-disk cache of the simulations
+    
+    SIMULATION_CONFIG['cache_dir'], else $TRIFECTA_CACHE_DIR, else
+    ~/.cache/trifecta.
+    """
+    return (SIMULATION_CONFIG['cache_dir'] or os.environ.get('TRIFECTA_CACHE_DIR') or
+            os.path.join(os.path.expanduser('~'), '.cache', 'trifecta'))
+
+
+class ResultCache:
+    """
+    Size-capped, process-safe directory of pickled results
+
+    Parameters:
+    -----------
+    directory : str, optional
+        Cache directory (default default_directory())
+    max_bytes : float, optional
+        Size cap (default SIMULATION_CONFIG['cache_max_bytes'])
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or default_directory()
+        self.max_bytes = SIMULATION_CONFIG['cache_max_bytes'] if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size_estimate = None  # Bytes, refreshed by each directory scan
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Missing, being evicted, or written by incompatible code
+            self.misses += 1
+            return False, None
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another process after we read it
+        self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        """
+        Store value atomically, evicting once the size cap is exceeded
+        
+        The directory is only rescanned when this process's running size
+        estimate crosses the cap, so a put does not walk the whole cache.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        
+        if self._size_estimate is None:
+            self._size_estimate = self.size()
+        else:
+            self._size_estimate += written
+        if self._size_estimate > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """[(mtime, size, path)] of all entries, oldest first"""
+        out = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pkl'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                out.append((st.st_mtime, st.st_size, path))
+        return sorted(out)
+
+    def size(self):
+        """Total size of the entries (bytes)"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        """Delete least-recently-used entries until under max_bytes"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._size_estimate = total
+
+    def clear(self):
+        """Delete every entry"""
+        self.evict(max_bytes=0)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Shared ResultCache built from SIMULATION_CONFIG"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
+
+
+_disabled_depth = 0
+
+
+def cache_enabled():
+    if _disabled_depth:
+        return False
+    setting = os.environ.get('TRIFECTA_CACHE')
+    if setting is not None:
+        return setting != '0'
+    return SIMULATION_CONFIG['cache_enabled']
+
+
+@contextlib.contextmanager
+def disabled():
+    """Bypass the cache inside the block (timings, benchmarks)"""
+    global _disabled_depth
+    _disabled_depth += 1
+    try:
+        yield
+    finally:
+        _disabled_depth -= 1
+
+
+def cached_method(ignore=(), exclude_state=(), mutates=False, bypass=(), live=()):
+    """
+    Cache a method's result on disk, keyed by instance state and arguments
+
+    Parameters:
+    -----------
+    ignore : tuple of str
+        Arguments that do not affect the result (e.g. 'verbose')
+    exclude_state : tuple of str
+        Instance attributes left out of the key (derived caches)
+    mutates : bool
+        The method works by updating the instance (e.g. run()); its
+        attributes after the call are stored and restored on a hit
+    bypass : tuple of str
+        Arguments that disable caching when not None
+    live : tuple of str
+        Instance attributes holding attached consumers (subscribers,
+        observers); caching is disabled while any is non-empty, since a
+        hit would replay nothing to them
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        version = []
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            del arguments[next(iter(signature.parameters))]
+
+            if (not cache_enabled() or any(arguments.get(name) is not None for name in bypass)
+                    or any(getattr(self, name, None) for name in live)):
+                return method(self, *args, **kwargs)
+
+            if not version:
+                version.append(code_version(method))
+            state = {name: value for name, value in vars(self).items()
+                     if name not in exclude_state and name not in live}
+            try:
+                key = stable_hash(version[0], config_state(), method.__qualname__, state,
+                                  {name: value for name, value in arguments.items()
+                                   if name not in ignore})
+            except TypeError:
+                return method(self, *args, **kwargs)  # Unhashable input
+
+            cache = default_cache()
+            hit, stored = cache.get(key)
+            if hit:
+                result, attributes = stored
+                if attributes is not None:
+                    vars(self).update(attributes)
+                if arguments.get('verbose'):
+                    print(f"Loaded cached result of {method.__qualname__} ({key[:12]})")
+                return result
+
+            result = method(self, *args, **kwargs)
+            attributes = None
+            if mutates:
+                attributes = {name: value for name, value in vars(self).items()
+                              if name not in exclude_state and name not in live}
+            try:
+                cache.put(key, (result, attributes))
+            except OSError:
+                pass  # Read-only or full disk: the cache is best effort
+            return result
+
+        wrapper.uncached = method
+        return wrapper
+    return decorator
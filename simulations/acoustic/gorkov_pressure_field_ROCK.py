@@ -14,9 +14,14 @@ Author: Sportysport + Claude + Grok collaboration
 Date: December 2025
 """
 
+import os
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from plotting import finish, headless_requested, pyplot
+from result_cache import cached_method
 
 class AcousticPressureField:
     """Model acoustic pressure field - ROCK CONTACT MODE"""
@@ -184,6 +189,7 @@ class AcousticPressureField:
 
         return P
 
+    @cached_method()
     def compute_field_2d(self, z_plane=0.05, x_range=0.1, y_range=0.1, resolution=50):
         """Compute 2D field"""
         x = np.linspace(-x_range/2, x_range/2, resolution)
@@ -200,6 +206,7 @@ class AcousticPressureField:
 
         return X, Y, P
 
+    @cached_method()
     def compute_axial_profile(self, z_max=0.2, resolution=150):
         """Compute on-axis profile"""
         z = np.linspace(0.001, z_max, resolution)
@@ -219,8 +226,17 @@ class AcousticPressureField:
         return f_damage
 
 
-def run_validation():
-    """Run validation in ROCK MODE"""
+def run_validation(plot=True, show=True):
+    """
+    Run validation in ROCK MODE
+
+    Parameters:
+    -----------
+    plot : bool
+        Compute the 2D field and draw the validation figure (plot_validation)
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    """
 
     print("="*70)
     print("ACOUSTIC PRESSURE FIELD VALIDATION - ROCK CONTACT MODE")
@@ -297,6 +313,42 @@ def run_validation():
     print(f"  Maximum at z={z_max*1000:.1f} mm: {P_max/1e6:.2f} MPa")
     print()
 
+    if plot:
+        print("Computing 2D pressure field...")
+        field = fol.compute_field_2d(z_plane=z_focus, resolution=50)
+        plot_validation(fol, z_focus, P_focus, sigma_fracture, z, P_axial, field, results,
+                        show=show)
+
+    return fol, P_focus, f_damage
+
+
+def plot_validation(fol, z_focus, P_focus, sigma_fracture, z, P_axial, field, results,
+                    filename='acoustic_validation_ROCK.png', show=True):
+    """
+    Validation figure (imports matplotlib on first call)
+
+    Parameters:
+    -----------
+    fol : AcousticPressureField
+        Flower of Life array
+    z_focus, P_focus : float
+        Focal distance (m) and pressure (Pa)
+    sigma_fracture : float
+        Fracture threshold (Pa)
+    z, P_axial : array
+        compute_axial_profile() output
+    field : tuple of array
+        compute_field_2d() output (X, Y, P)
+    results : dict
+        {geometry: focal pressure (Pa)}
+    filename : str
+        Output image
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    """
+    plt = pyplot(show)
+    from matplotlib.patches import Circle
+
     # Plots
     fig = plt.figure(figsize=(15, 10))
 
@@ -336,8 +388,7 @@ def run_validation():
     ax3.legend()
 
     # 4. 2D field
-    print("Computing 2D pressure field...")
-    X, Y, P_2d = fol.compute_field_2d(z_plane=z_focus, resolution=50)
+    X, Y, P_2d = field
 
     ax4 = fig.add_subplot(2, 3, 4)
     im = ax4.contourf(X*1000, Y*1000, P_2d/1e6, levels=20, cmap='hot')
@@ -353,7 +404,7 @@ def run_validation():
     # 5. Geometry comparison
     ax5 = fig.add_subplot(2, 3, 5)
     geom_names = ['FoL', 'Grid', 'Random']
-    pressures = [results[g]/1e6 for g in geometries]
+    pressures = [results[g]/1e6 for g in ('fol', 'grid', 'random')]
     colors = ['blue', 'orange', 'red']
     bars = ax5.bar(geom_names, pressures, color=colors, alpha=0.6)
     ax5.axhline(sigma_fracture/1e6, color='black', linestyle='--', label='Fracture')
@@ -372,15 +423,13 @@ def run_validation():
     ax6.grid(True, alpha=0.3)
 
     plt.tight_layout()
-    plt.savefig('acoustic_validation_ROCK.png', dpi=150, bbox_inches='tight')
-    print("Plots saved to: acoustic_validation_ROCK.png")
-    plt.show()
-
-    return fol, P_focus, f_damage
+    plt.savefig(filename, dpi=150, bbox_inches='tight')
+    print(f"Plots saved to: {filename}")
+    finish(plt, fig, show)
 
 
 if __name__ == '__main__':
-    fol, P_focus, f_damage = run_validation()
+    fol, P_focus, f_damage = run_validation(plot=not headless_requested())
 
     print()
     print("="*70)
@@ -0,0 +1,229 @@
+"""
+Drilling Rate vs Depth
+======================
+
+Steady-state trifecta drilling rate as a function of hole depth, following
+the "Depth Scaling" section of docs/theory/05-complete-model.md.
+
+At each depth the surface sits at the equilibrium of the laser energy
+balance (TrifectaDrillSimulator.equilibrium), and the plasma removes rock
+at the coupled model's rate. Three effects grow with depth:
+
+- Wall conduction: the hot hole wall adds a loss proportional to the
+  exposed depth (P_loss ∝ depth). The tool retracts and restarts every
+  session_length (~100 mm practical limit), so the loss runs over the
+  depth drilled in the current session and the reported rate is the
+  session average (harmonic mean over the session).
+- Acoustic path attenuation: the transducer array stays at the surface,
+  and its intensity at the hole bottom decays with the rock's attenuation
+  (database dB/(cm·MHz), else from the quality factor). Damage, and with
+  it laser absorption and plasma transfer, fades with depth.
+- Debris removal: cuttings are lifted out by the gas flow, whose
+  volumetric capacity falls off with hole depth and caps the removal
+  rate.
+
+All depths are evaluated in one vectorized pass (depth × session nodes),
+and per-material curves over 0-1000 m are cached for fast lookups such
+as material_properties.estimate_drilling_rate(name, depth=...).
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from trifecta_simulator import TrifectaDrillSimulator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from material_properties import get_material
+
+# Depth grid of the cached per-material curves (m)
+CURVE_DEPTHS = np.linspace(0.0, 1000.0, 2001)
+
+
+def acoustic_attenuation(material, frequency):
+    """
+    Acoustic attenuation of a rock (dB/m)
+
+    Uses the database 'attenuation' (dB/(cm·MHz)) where given; otherwise
+    α = π f / (Q v) from 'quality_factor', or with Q = 1/'damping_factor'.
+
+    Parameters:
+    -----------
+    material : str
+        Material name
+    frequency : float
+        Acoustic frequency (Hz)
+    """
+    mat = get_material(material)
+    if 'attenuation' in mat:
+        return mat['attenuation'] * 100 * frequency / 1e6
+    Q = mat.get('quality_factor') or 1 / mat['damping_factor']
+    alpha = np.pi * frequency / (Q * mat['p_wave_velocity'])  # Np/m
+    return 20 / np.log(10) * alpha
+
+
+class DrillingRateEngine:
+    """
+    Depth-dependent drilling rate with per-material curve cache
+
+    Parameters:
+    -----------
+    session_length : float
+        Depth drilled between retract/restart cycles (m)
+    wall_loss_length : float
+        Exposed wall depth whose conduction loss equals the bottom
+        conduction loss (m); 0.02 leaves granite just above the plasma
+        threshold at the end of a 100 mm session
+    debris_capacity : float
+        Cuttings removal capacity at the surface (m³/s)
+    debris_lift_length : float
+        Depth at which the removal capacity has halved (m)
+    n_session : int
+        Gauss-Legendre nodes for the session average
+    **inputs
+        Simulator inputs shared by every material (P_laser, P_plasma, ...)
+    """
+
+    def __init__(self, session_length=0.1, wall_loss_length=0.02, debris_capacity=100e-9,
+                 debris_lift_length=100.0, n_session=16, **inputs):
+        self.session_length = session_length
+        self.wall_loss_length = wall_loss_length
+        self.debris_capacity = debris_capacity
+        self.debris_lift_length = debris_lift_length
+        self.inputs = inputs
+
+        x, w = np.polynomial.legendre.leggauss(n_session)
+        self._s = (x + 1) / 2 * session_length   # Depth into the session (m)
+        self._w = w / 2                           # Weights, sum to 1
+
+        self._curves = {}
+
+    def _simulator(self, material):
+        sim = TrifectaDrillSimulator(material=material)
+        if self.inputs:
+            sim.set_inputs(**self.inputs)
+        return sim
+
+    @staticmethod
+    def _equilibrium_temperature(sim, f_damage, G_wall, max_iter=50):
+        """Vectorized TrifectaDrillSimulator.equilibrium with extra wall conductance"""
+        T = np.full(np.broadcast(f_damage, G_wall).shape, sim.T_ambient)
+        for _ in range(max_iter):
+            P_net, dP_dT = sim._heating_power(T, f_damage)
+            P_net = P_net - G_wall * (T - sim.T_ambient)
+            dT = P_net / (dP_dT - G_wall)
+            T -= dT
+            if np.all(np.abs(dT) <= 1e-12 * T):
+                break
+        return np.maximum(T, sim.T_ambient)
+
+    def _session_average(self, V):
+        """
+        Harmonic session mean of removal rates V (depth × session nodes)
+
+        Only nodes the plasma still reaches count; the wall loss grows
+        monotonically, so these form a prefix of the session.
+        """
+        active = V > 0
+        time_per_m = np.sum(np.where(active, self._w / np.where(active, V, 1.0), 0.0), axis=1)
+        covered = np.sum(np.where(active, self._w, 0.0), axis=1)
+        return np.divide(covered, time_per_m, out=np.zeros_like(covered), where=time_per_m > 0)
+
+    def profile(self, material, depths=CURVE_DEPTHS):
+        """
+        Rate versus depth for one material (uncached)
+
+        Parameters:
+        -----------
+        material : str
+            Material name
+        depths : array_like
+            Hole depths (m)
+
+        Returns:
+        --------
+        profile : dict of ndarray
+            'depth' (m), 'f_damage' (at the bottom), 'T' (session start, K),
+            'rate' (session average, m/hr), 'rate_plasma' (plasma-limited,
+            m/hr), 'rate_debris' (removal capacity, m/hr), 'debris_limited'
+        """
+        sim = self._simulator(material)
+        z = np.atleast_1d(np.asarray(depths, dtype=float))
+
+        # Acoustic intensity at the bottom
+        loss_dB = acoustic_attenuation(material, sim.f_acoustic) * z
+        f_damage = sim.equilibrium()[1] * 10**(-loss_dB / 10)
+
+        # Bottom temperature over the session: wall conductance ∝ exposed depth
+        G_cond = sim.k_thermal * sim.A_spot / sim.conduction_length
+        G_wall = G_cond * self._s / self.wall_loss_length
+        f = f_damage[:, None]
+        T = self._equilibrium_temperature(sim, f, G_wall)
+
+        V_plasma = np.where(sim.plasma_active(T), sim._plasma_removal_rate(T, f), 0.0)
+        V_debris = self.debris_capacity / (1 + z / self.debris_lift_length)
+        V = np.minimum(V_plasma, V_debris[:, None])
+
+        to_rate = 3600 / sim.A_kerf  # m³/s -> m/hr
+        return {
+            'depth': z,
+            'f_damage': f_damage,
+            'T': T[:, 0],
+            'rate': self._session_average(V) * to_rate,
+            'rate_plasma': self._session_average(V_plasma) * to_rate,
+            'rate_debris': V_debris * to_rate,
+            'debris_limited': np.any(V_plasma > V_debris[:, None], axis=1),
+        }
+
+    def curve(self, material):
+        """Cached profile() over CURVE_DEPTHS"""
+        key = material.lower()
+        if key not in self._curves:
+            self._curves[key] = self.profile(key)
+        return self._curves[key]
+
+    def rate(self, material, depth):
+        """Drilling rate (m/hr) at depth(s) in m, interpolated from the cached curve"""
+        curve = self.curve(material)
+        depth = np.asarray(depth, dtype=float)
+        if np.any((depth < 0) | (depth > CURVE_DEPTHS[-1])):
+            raise ValueError(f"Depth must lie within 0-{CURVE_DEPTHS[-1]:.0f} m")
+        return np.interp(depth, curve['depth'], curve['rate'])
+
+
+_default_engine = None
+
+
+def rate_at_depth(material, depth):
+    """Drilling rate (m/hr) at depth(s) from a shared default engine"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = DrillingRateEngine()
+    return _default_engine.rate(material, depth)
+
+
+if __name__ == '__main__':
+    import time
+
+    print("="*70)
+    print("TRIFECTA DRILLING RATE VS DEPTH")
+    print("="*70)
+    print()
+
+    engine = DrillingRateEngine()
+    materials = ['granite', 'basalt', 'limestone', 'sandstone', 'concrete', 'marble']
+    t0 = time.perf_counter()
+    for name in materials:
+        engine.curve(name)
+    print(f"{len(materials)} curves × {CURVE_DEPTHS.size} depths in "
+          f"{(time.perf_counter() - t0)*1000:.0f} ms")
+    print()
+
+    depths = [0.0, 1.0, 10.0, 100.0, 1000.0]
+    print(f"{'material':>12s} " + ' '.join(f"{f'{d:g} m':>9s}" for d in depths) + "   (m/hr)")
+    for name in materials:
+        print(f"{name:>12s} " + ' '.join(f"{r:9.1f}" for r in engine.rate(name, depths)))
@@ -0,0 +1,361 @@
+"""
+Trifecta Ensemble Simulator - Batched Coupled System
+====================================================
+
+Advances N independent copies of the coupled acoustic-laser-plasma model
+in lock-step, one vectorized NumPy step for the whole ensemble.
+
+Every parameter of TrifectaDrillSimulator (powers, duty cycle, material
+constants, plasma threshold, ...) may differ per member. State lives in
+struct-of-arrays form (one array per state variable), and the branches of
+the scalar model (plasma activation, efficiency clipping, ambient floor)
+become masks. Trajectories match N independent scalar runs to rounding.
+
+Typical use:
+    ens = TrifectaEnsembleSimulator(P_laser=np.linspace(3, 6, 1000))
+    ens.run(2.0)
+    ens.results()['rate']
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import time
+
+import numpy as np
+
+from trifecta_simulator import TrifectaDrillSimulator, material_arrays
+
+# Fields available for per-member history recording
+ENSEMBLE_FIELDS = ('T', 'f_damage', 'depth', 'rate', 'eta')
+
+# Rocks compared by compare_materials()
+COMPARISON_MATERIALS = ('granite', 'basalt', 'limestone', 'sandstone', 'concrete', 'marble')
+
+
+class TrifectaEnsembleSimulator:
+    """Vectorized ensemble of coupled trifecta simulations"""
+
+    # Constants of TrifectaDrillSimulator that may vary per member
+    PARAMETERS = (
+        'rho', 'c_p', 'k_thermal', 'T_ambient', 'T_melt', 'sigma_fracture',
+        'P_acoustic', 'P_peak_acoustic', 'f_acoustic',
+        'P_laser', 'f_pulse', 'duty_cycle', 'alpha_base',
+        'P_plasma', 'eta_arc', 'eta_transfer_base', 'T_plasma_threshold',
+        'spot_size', 'kerf_width', 'tau_thermal', 't_steady', 'E_specific',
+        'f_damage_max', 'damage_cycles', 'absorption_coupling', 'thermal_enhancement',
+        'thermal_enhancement_rate', 'plasma_damage_coupling', 'eta_transfer_max',
+        'min_energy_fraction', 'heated_depth', 'conduction_length', 'emissivity',
+    )
+
+    def __init__(self, n=None, record=(), record_interval=None, **params):
+        """
+        Initialize ensemble
+
+        Parameters:
+        -----------
+        n : int, optional
+            Ensemble size - inferred from array-valued parameters if omitted
+        record : tuple of str
+            Per-member fields to record (subset of ENSEMBLE_FIELDS); empty
+            by default because 10⁵ members × many samples adds up quickly
+        record_interval : float, optional
+            History interval (s) - default from the scalar simulator
+        **params : float or array_like
+            Overrides for any name in PARAMETERS (scalar or length-n)
+        """
+        unknown = set(params) - set(self.PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameter(s): {sorted(unknown)}")
+        unknown = set(record) - set(ENSEMBLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown record field(s): {sorted(unknown)}")
+
+        base = TrifectaDrillSimulator(record_interval=record_interval)
+
+        if n is None:
+            sizes = {np.size(v) for v in params.values() if np.ndim(v) > 0}
+            if len(sizes) > 1:
+                raise ValueError(f"Parameter arrays have different lengths: {sorted(sizes)}")
+            n = sizes.pop() if sizes else 1
+        self.n = int(n)
+
+        for name in self.PARAMETERS:
+            value = params.get(name, getattr(base, name))
+            array = np.array(np.broadcast_to(np.asarray(value, dtype=float), (self.n,)))
+            setattr(self, name, array)
+
+        self.record = tuple(record)
+        self.record_interval = base.record_interval
+
+        self.reset()
+
+    @classmethod
+    def from_simulators(cls, simulators, **kwargs):
+        """Build an ensemble from configured scalar simulators (one member each)"""
+        if any(sim.temperature_dependent for sim in simulators):
+            raise ValueError("The ensemble does not support temperature_dependent properties; "
+                             "run the simulators individually")
+        if any(sim.formation is not None for sim in simulators):
+            raise ValueError("The ensemble does not support layered formations; "
+                             "run the simulators individually")
+        if any(sim.integrator != 'euler' for sim in simulators):
+            raise ValueError("The ensemble only supports the explicit 'euler' integrator; "
+                             "run the simulators individually")
+        params = {name: [getattr(sim, name) for sim in simulators] for name in cls.PARAMETERS}
+        return cls(n=len(simulators), **params, **kwargs)
+
+    @classmethod
+    def from_materials(cls, materials, **kwargs):
+        """
+        One member per material, constants from the material database
+
+        Parameters:
+        -----------
+        materials : sequence of str or array of int
+            Material names or MATERIAL_TABLE ids
+        **kwargs
+            Passed to __init__ (record, record_interval and shared
+            PARAMETERS overrides such as P_laser)
+        """
+        params = material_arrays(materials)
+        overlap = set(params) & set(kwargs)
+        if overlap:
+            raise ValueError(f"Material constant(s) {sorted(overlap)} cannot be overridden here")
+        return cls(n=len(materials), **params, **kwargs)
+
+    def _derived(self):
+        """Quantities the scalar simulator derives in __init__"""
+        self.P_pulse = self.P_laser / self.duty_cycle
+        self.A_spot = np.pi * (self.spot_size/2)**2
+        self.A_kerf = np.pi * (self.kerf_width/2)**2
+
+        # Step-invariant coefficients
+        self._mass_cp = (self.rho * self.A_spot * self.heated_depth) * self.c_p
+        self._P_base = self.P_acoustic + self.P_laser
+        self._T_amb4 = self.T_ambient**4
+
+    def reset(self):
+        """Reset all members to the initial state"""
+        self._derived()
+
+        self.time = 0.0
+        self.T_surface = self.T_ambient.copy()
+        self.f_damage = np.zeros(self.n)
+        self.depth = np.zeros(self.n)
+        self.energy_used = np.zeros(self.n)
+        self.rate = np.zeros(self.n)          # m/s
+        self.eta_system = np.zeros(self.n)
+        self.t_ignition = np.full(self.n, np.nan)  # first plasma-active time (s)
+
+        self.t_history = [0.0]
+        self._history = {field: [self._field(field)] for field in self.record}
+        self._next_record = self.record_interval
+
+    def _field(self, field):
+        values = {
+            'T': self.T_surface,
+            'f_damage': self.f_damage,
+            'depth': self.depth,
+            'rate': self.rate * 3600,
+            'eta': self.eta_system,
+        }[field]
+        return values.copy()
+
+    def step(self, dt):
+        """
+        Advance every member by one time step (same update as the scalar model)
+
+        Parameters:
+        -----------
+        dt : float
+            Time step (s)
+        """
+        self.time += dt
+        t = self.time
+
+        # 1. Acoustic damage accumulation
+        N_cycles = self.f_acoustic * t
+        f_damage = np.where(N_cycles < 1, 0.0,
+                            self.f_damage_max * (1 - np.exp(-N_cycles / self.damage_cycles)))
+        self.f_damage = f_damage
+
+        # 2. Laser heating (explicit, lumped surface element)
+        T = self.T_surface
+        alpha = self.alpha_base * (1 + self.absorption_coupling * f_damage)
+        P_absorbed = alpha * self.P_laser
+        P_loss = self.k_thermal * self.A_spot * (T - self.T_ambient) / self.conduction_length
+        sigma_sb = 5.67e-8
+        P_rad = self.emissivity * sigma_sb * self.A_spot * (T**4 - self._T_amb4)
+        P_net = P_absorbed - P_loss - P_rad
+        T = T + (P_net * dt) / self._mass_cp
+        T = np.maximum(T, self.T_ambient)
+        self.T_surface = T
+
+        # 3. Plasma removal where active
+        active = T >= self.T_plasma_threshold
+
+        T_factor = (T - self.T_plasma_threshold) / (self.T_melt - self.T_plasma_threshold)
+        T_factor = np.clip(T_factor, 0, 1)
+        eta_temp = np.where(active,
+                            self.eta_transfer_base * (1 + self.thermal_enhancement *
+                                (1 - np.exp(-self.thermal_enhancement_rate * T_factor))),
+                            self.eta_transfer_base)
+        eta = np.minimum(eta_temp * (1.0 + self.plasma_damage_coupling * f_damage),
+                         self.eta_transfer_max)
+
+        E_preheat = self.rho * self.c_p * (T - self.T_ambient)
+        E_remaining = np.maximum(self.E_specific - E_preheat,
+                                 self.E_specific * self.min_energy_fraction)
+        V_dot = np.where(active, (self.P_plasma * self.eta_arc * eta) / E_remaining, 0.0)
+
+        self.rate = np.where(V_dot > 0, V_dot / self.A_kerf, 0.0)
+        self.depth = self.depth + self.rate * dt
+
+        newly = active & np.isnan(self.t_ignition)
+        if newly.any():
+            self.t_ignition[newly] = t
+
+        # 4. Energy accounting
+        self.energy_used = self.energy_used + (self._P_base + np.where(active, self.P_plasma, 0.0)) * dt
+
+        # 5. System efficiency
+        E_ideal = self.E_specific * (self.depth * self.A_kerf)
+        self.eta_system = np.divide(E_ideal, self.energy_used,
+                                    out=np.zeros(self.n),
+                                    where=(self.depth > 0) & (self.energy_used > 0))
+
+        # 6. History
+        if self.record and self.time >= self._next_record - 1e-9 * self.record_interval:
+            self._emit()
+
+    def _emit(self):
+        self.t_history.append(self.time)
+        for field in self.record:
+            self._history[field].append(self._field(field))
+        while self._next_record <= self.time + 1e-9 * self.record_interval:
+            self._next_record += self.record_interval
+            if self.record_interval <= 0:
+                break
+
+    def run(self, duration, dt=0.001, verbose=False):
+        """
+        Run all members for the specified duration
+
+        Parameters:
+        -----------
+        duration : float
+            Simulation time (s)
+        dt : float
+            Time step (s)
+        verbose : bool
+            Print a one-line summary when done
+        """
+        steps = int(duration / dt)
+        for _ in range(steps):
+            self.step(dt)
+        if self.record and self.t_history[-1] < self.time:
+            self._emit()
+
+        if verbose:
+            print(f"Ensemble of {self.n} members: {duration:.2f} s in {steps} steps, "
+                  f"{np.mean(~np.isnan(self.t_ignition))*100:.0f}% ignited")
+
+    def history(self, field):
+        """Recorded field as an (n_samples, n) array"""
+        return np.stack(self._history[field])
+
+    def results(self):
+        """
+        Final per-member summary
+
+        Returns:
+        --------
+        summary : dict of ndarray
+            'T' (K), 'f_damage', 'depth' (m), 'rate' (m/hr), 'eta',
+            'energy' (J), 'energy_per_mm' (J/mm, inf if nothing drilled),
+            't_ignition' (s, NaN if the plasma never ignited)
+        """
+        with np.errstate(divide='ignore'):
+            energy_per_mm = np.where(self.depth > 0, self.energy_used / (self.depth * 1000), np.inf)
+        return {
+            'T': self.T_surface.copy(),
+            'f_damage': self.f_damage.copy(),
+            'depth': self.depth.copy(),
+            'rate': self.rate * 3600,
+            'eta': self.eta_system.copy(),
+            'energy': self.energy_used.copy(),
+            'energy_per_mm': energy_per_mm,
+            't_ignition': self.t_ignition.copy(),
+        }
+
+
+def compare_materials(materials=COMPARISON_MATERIALS, duration=2.0, dt=0.001, verbose=True,
+                      **inputs):
+    """
+    Run the coupled model on several rocks at once and tabulate the results
+
+    All materials advance together as one ensemble, so the comparison costs
+    about one simulation instead of one per material.
+
+    Parameters:
+    -----------
+    materials : sequence of str
+        Material names (default COMPARISON_MATERIALS)
+    duration, dt : float
+        Simulated time and step (s)
+    verbose : bool
+        Print the comparison table
+    **inputs
+        Operating point shared by all materials (e.g. P_laser, duty_cycle)
+
+    Returns:
+    --------
+    table : dict
+        {material: {metric: value}} with the results() metrics
+    """
+    t0 = time.perf_counter()
+    ens = TrifectaEnsembleSimulator.from_materials(materials, **inputs)
+    ens.run(duration, dt)
+    res = ens.results()
+    table = {name: {metric: float(values[i]) for metric, values in res.items()}
+             for i, name in enumerate(materials)}
+
+    if verbose:
+        print(f"{len(materials)} materials, {duration:.2f} s each, "
+              f"in {time.perf_counter() - t0:.2f} s")
+        print(f"{'material':>12s} {'T (K)':>8s} {'ignition (s)':>13s} {'depth (mm)':>11s} "
+              f"{'rate (m/hr)':>12s} {'J/mm':>10s} {'eta (%)':>8s}")
+        for name, row in table.items():
+            print(f"{name:>12s} {row['T']:8.0f} {row['t_ignition']:13.3f} "
+                  f"{row['depth']*1000:11.3f} {row['rate']:12.2f} "
+                  f"{row['energy_per_mm']:10.1f} {row['eta']*100:8.2f}")
+    return table
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("TRIFECTA ENSEMBLE - LASER POWER SWEEP")
+    print("="*70)
+    print()
+
+    P_laser = np.linspace(3.0, 6.0, 7)
+    ens = TrifectaEnsembleSimulator(P_laser=P_laser)
+    t0 = time.perf_counter()
+    ens.run(2.0, verbose=True)
+    print(f"Wall time: {time.perf_counter() - t0:.2f} s")
+    print()
+
+    res = ens.results()
+    print(f"{'P_laser (W)':>12s} {'T (K)':>8s} {'ignition (s)':>13s} {'depth (mm)':>11s} {'rate (m/hr)':>12s}")
+    for i in range(ens.n):
+        print(f"{P_laser[i]:12.1f} {res['T'][i]:8.0f} {res['t_ignition'][i]:13.3f} "
+              f"{res['depth'][i]*1000:11.3f} {res['rate'][i]:12.2f}")
+
+    print()
+    print("="*70)
+    print("TRIFECTA ENSEMBLE - MATERIAL COMPARISON")
+    print("="*70)
+    print()
+
+    compare_materials()
@@ -0,0 +1,308 @@
+"""
+Trifecta Monte Carlo - Material Uncertainty Propagation
+=======================================================
+
+Propagates uncertainty in the material database (point estimates such as
+"compressive strength typical 100-250 MPa", absorptivity ±50%) through the
+coupled simulator.
+
+Samples are drawn per material from the distributions in UNCERTAINTY and
+run in chunks through TrifectaEnsembleSimulator on a process pool. Every
+chunk has its own random stream spawned from one SeedSequence, so results
+depend only on the seed and chunk size, not on the number of workers.
+Chunk results are reduced on arrival into StreamingStats (mergeable
+moments plus fixed-bin histograms for quantiles); no per-sample data is
+kept, so 10⁶ samples never sit in memory at once.
+
+Typical use:
+    result = run_monte_carlo('granite', n_samples=100_000, workers=4)
+    result['rate'].summary()
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from trifecta_simulator import material_parameters
+from trifecta_ensemble import TrifectaEnsembleSimulator
+
+# Relative uncertainty of each material input: (distribution, spread)
+#   'normal'    - spread is the relative standard deviation
+#   'uniform'   - spread is the relative half-width
+#   'lognormal' - spread is the standard deviation of ln(value)
+UNCERTAINTY = {
+    'rho': ('normal', 0.03),
+    'c_p': ('normal', 0.05),
+    'k_thermal': ('normal', 0.15),
+    'T_melt': ('normal', 0.03),
+    'sigma_fracture': ('uniform', 0.4),   # Database gives ranges of ~2.5×
+    'alpha_base': ('uniform', 0.5),       # ±50% at 445 nm
+    'E_specific': ('lognormal', 0.2),
+}
+
+# Output metrics and their histogram bins: (scale, low, high, n_bins)
+METRICS = {
+    'rate': ('linear', 0.0, 500.0, 5000),        # m/hr (0 if never ignited)
+    't_ignition': ('linear', 0.0, None, 1000),   # s, high = duration
+    'energy_per_mm': ('log', 1e0, 1e9, 2000),    # J/mm
+}
+
+
+def sample_parameters(material, n, rng, uncertainty=None):
+    """
+    Draw n sets of simulator inputs around a material's nominal values
+
+    Parameters:
+    -----------
+    material : str
+        Material name
+    n : int
+        Number of samples
+    rng : numpy.random.Generator
+        Random stream
+    uncertainty : dict, optional
+        Overrides for UNCERTAINTY ({name: (distribution, spread)})
+
+    Returns:
+    --------
+    params : dict of ndarray
+        {simulator attribute: length-n array}
+    """
+    spec = dict(UNCERTAINTY)
+    spec.update(uncertainty or {})
+    nominal = material_parameters(material)
+
+    params = {}
+    for name, value in nominal.items():
+        dist, spread = spec.get(name, ('fixed', 0.0))
+        if dist == 'normal':
+            # Truncate far tails that would give unphysical (negative) values
+            z = np.clip(rng.standard_normal(n), -4, 4)
+            params[name] = value * np.maximum(1 + spread * z, 1e-3)
+        elif dist == 'uniform':
+            params[name] = value * rng.uniform(1 - spread, 1 + spread, n)
+        elif dist == 'lognormal':
+            params[name] = value * rng.lognormal(0.0, spread, n)
+        elif dist == 'fixed':
+            params[name] = np.full(n, value)
+        else:
+            raise ValueError(f"Unknown distribution '{dist}' for {name}")
+    return params
+
+
+class StreamingStats:
+    """
+    Mergeable summary of a stream of values
+
+    Count/mean/M2 are combined with Chan's parallel update, so merging two
+    partial summaries is exact up to rounding. Quantiles come from a fixed
+    histogram (linear or log bins), accurate to about one bin width; values
+    outside the range are counted in the end bins. Non-finite values (never
+    ignited, nothing drilled) are counted separately and excluded.
+    """
+
+    def __init__(self, scale, low, high, n_bins):
+        self.scale = scale
+        self.low = low
+        self.high = high
+        if scale == 'log':
+            self.edges = np.geomspace(low, high, n_bins + 1)
+        else:
+            self.edges = np.linspace(low, high, n_bins + 1)
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.n = 0
+        self.n_missing = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        self.n_missing += int(values.size - finite.sum())
+        values = values[finite]
+        if not values.size:
+            return
+
+        n_b = values.size
+        mean_b = values.mean()
+        M2_b = np.sum((values - mean_b)**2)
+        self._combine(n_b, mean_b, M2_b)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        idx = np.searchsorted(self.edges, values, side='right') - 1
+        np.clip(idx, 0, self.counts.size - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=self.counts.size)
+
+    def _combine(self, n_b, mean_b, M2_b):
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.M2 += M2_b + delta**2 * self.n * n_b / n
+        self.n = n
+
+    def merge(self, other):
+        """Fold another summary (same bins) into this one"""
+        if other.n:
+            self._combine(other.n, other.mean, other.M2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.counts += other.counts
+        self.n_missing += other.n_missing
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.M2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def quantile(self, q):
+        """Histogram quantile(s), interpolated within the bin"""
+        q = np.asarray(q, dtype=float)
+        if not self.n:
+            return np.full(q.shape, np.nan)
+        cdf = np.concatenate([[0], np.cumsum(self.counts)]) / self.n
+        if self.scale == 'log':
+            x = np.exp(np.interp(q, cdf, np.log(self.edges)))
+        else:
+            x = np.interp(q, cdf, self.edges)
+        return np.clip(x, self.min, self.max)
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)):
+        """Dict with n, n_missing, mean, std, min, max and the quantiles"""
+        out = {
+            'n': self.n,
+            'n_missing': self.n_missing,
+            'mean': self.mean if self.n else np.nan,
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+        }
+        for q, value in zip(quantiles, self.quantile(quantiles)):
+            out[f'q{q*100:g}'] = float(value)
+        return out
+
+
+def _new_stats(duration):
+    stats = {}
+    for name, (scale, low, high, n_bins) in METRICS.items():
+        stats[name] = StreamingStats(scale, low, duration if high is None else high, n_bins)
+    return stats
+
+
+def _run_chunk(material, n, seed, duration, dt, uncertainty):
+    """Simulate one chunk and reduce it to StreamingStats (runs in a worker)"""
+    rng = np.random.default_rng(seed)
+    params = sample_parameters(material, n, rng, uncertainty)
+    ens = TrifectaEnsembleSimulator(n=n, **params)
+    ens.run(duration, dt)
+    res = ens.results()
+
+    stats = _new_stats(duration)
+    for name in METRICS:
+        stats[name].update(res[name])
+    return stats
+
+
+def run_monte_carlo(material='granite', n_samples=10_000, duration=2.0, dt=0.001,
+                    seed=0, chunk_size=5_000, workers=None, uncertainty=None,
+                    verbose=True):
+    """
+    Monte Carlo propagation of material uncertainty through the coupled model
+
+    Parameters:
+    -----------
+    material : str
+        Material name
+    n_samples : int
+        Total number of samples
+    duration, dt : float
+        Simulated time and step of every sample (s)
+    seed : int or numpy.random.SeedSequence
+        Root seed; chunk i uses the i-th spawned child stream
+    chunk_size : int
+        Samples per ensemble run (sets peak memory per worker)
+    workers : int, optional
+        Worker processes (default os.cpu_count(); 1 runs in-process)
+    uncertainty : dict, optional
+        Overrides for UNCERTAINTY
+    verbose : bool
+        Print progress and a summary table
+
+    Returns:
+    --------
+    stats : dict of StreamingStats
+        Keyed by METRICS ('rate', 't_ignition', 'energy_per_mm');
+        t_ignition.n_missing counts samples that never ignited
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    sizes = [chunk_size] * (n_samples // chunk_size)
+    if n_samples % chunk_size:
+        sizes.append(n_samples % chunk_size)
+    seeds = root.spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+
+    total = _new_stats(duration)
+    t0 = time.perf_counter()
+
+    def fold(stats):
+        for name in METRICS:
+            total[name].merge(stats[name])
+
+    if workers == 1:
+        for n, s in zip(sizes, seeds):
+            fold(_run_chunk(material, n, s, duration, dt, uncertainty))
+    else:
+        # Keep a bounded number of chunks in flight and merge in chunk order,
+        # so the result is independent of worker scheduling
+        done = {}
+        next_submit = next_merge = 0
+        pending = set()
+        futures = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while next_merge < len(sizes):
+                while next_submit < len(sizes) and len(pending) < 2 * workers:
+                    future = pool.submit(_run_chunk, material, sizes[next_submit],
+                                         seeds[next_submit], duration, dt, uncertainty)
+                    futures[future] = next_submit
+                    pending.add(future)
+                    next_submit += 1
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done[futures.pop(future)] = future.result()
+                while next_merge in done:
+                    fold(done.pop(next_merge))
+                    next_merge += 1
+                    if verbose and next_merge % max(len(sizes) // 10, 1) == 0:
+                        print(f"  {sum(sizes[:next_merge]):,} / {n_samples:,} samples "
+                              f"({time.perf_counter() - t0:.1f} s)")
+
+    if verbose:
+        wall = time.perf_counter() - t0
+        print(f"\n{material.capitalize()}: {n_samples:,} samples in {wall:.1f} s "
+              f"({workers} worker{'s' if workers > 1 else ''})")
+        print(f"{'metric':>15s} {'mean':>10s} {'std':>10s} {'q5':>10s} {'q50':>10s} {'q95':>10s}")
+        for name, stats in total.items():
+            s = stats.summary()
+            print(f"{name:>15s} {s['mean']:10.4g} {s['std']:10.4g} "
+                  f"{s['q5']:10.4g} {s['q50']:10.4g} {s['q95']:10.4g}")
+        n_never = total['t_ignition'].n_missing
+        print(f"Never ignited: {n_never:,} ({n_never / n_samples * 100:.1f}%)")
+
+    return total
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("TRIFECTA MONTE CARLO - MATERIAL UNCERTAINTY")
+    print("="*70)
+
+    for name in ['granite', 'basalt', 'limestone']:
+        run_monte_carlo(name, n_samples=20_000, verbose=True)
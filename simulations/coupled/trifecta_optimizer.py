@@ -0,0 +1,310 @@
+"""
+Trifecta Operating-Point Optimizer
+==================================
+
+Searches the power split (acoustic / laser / plasma) and laser duty cycle
+for the highest drilling depth per joule, subject to SAFETY_LIMITS:
+
+- each subsystem below its power limit (box bounds)
+- total power below max_total_power (checked before simulating)
+- surface temperature below max_surface_temp (checked on the final
+  temperature, which is the maximum since T rises monotonically)
+
+The search is a batched compass (pattern) search in normalized
+coordinates. Every iteration polls ±(step/2, step, 2·step, 4·step) along
+each axis and evaluates all new candidates in one TrifectaEnsembleSimulator
+batch (the per-step cost of the ensemble hardly grows with batch size, so
+wide polls are nearly free).
+Infeasible candidates are rejected outright (extreme barrier). Visited
+points are cached, and the search state and cache are checkpointed to
+JSON after each iteration. The search is deterministic, and an
+interrupted run resumes where it stopped.
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from trifecta_simulator import TrifectaDrillSimulator
+from trifecta_ensemble import TrifectaEnsembleSimulator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from config import SAFETY_LIMITS, SIMULATION_CONFIG
+
+# Decision variables: (lower bound, upper bound or SAFETY_LIMITS key)
+VARIABLES = {
+    'P_acoustic': (100.0, 'max_acoustic_power'),
+    'P_laser': (1.0, 'max_laser_power'),
+    'P_plasma': (20.0, 'max_plasma_power'),
+    'duty_cycle': (0.02, 0.5),
+}
+
+# Poll distances per iteration, in units of the current step
+POLL_SCALES = (0.5, 1.0, 2.0, 4.0)
+
+
+def variable_bounds(names=None):
+    """(names, lower, upper) with upper limits resolved from SAFETY_LIMITS"""
+    names = list(names or VARIABLES)
+    lower = np.array([VARIABLES[name][0] for name in names], dtype=float)
+    upper = np.array([SAFETY_LIMITS[VARIABLES[name][1]] if isinstance(VARIABLES[name][1], str)
+                      else VARIABLES[name][1] for name in names], dtype=float)
+    return names, lower, upper
+
+
+class OperatingPointOptimizer:
+    """
+    Constrained, cached, restartable pattern search on the coupled model
+
+    Parameters:
+    -----------
+    variables : sequence of str, optional
+        Names from VARIABLES to optimize (default all)
+    duration, dt : float
+        Simulated time and step per evaluation (s)
+    checkpoint : str, optional
+        JSON file for search state and evaluation cache; resumed if present
+    **fixed
+        Other simulator inputs held constant (any ensemble PARAMETERS name)
+    """
+
+    def __init__(self, variables=None, duration=None, dt=None, checkpoint=None, **fixed):
+        self.names, self.lower, self.upper = variable_bounds(variables)
+        self.duration = SIMULATION_CONFIG['duration'] if duration is None else duration
+        self.dt = SIMULATION_CONFIG['time_step'] if dt is None else dt
+        self.checkpoint = checkpoint
+        self.fixed = fixed
+
+        self.cache = {}        # key -> (objective, T_final, rate, feasible)
+        self.n_simulated = 0
+        self.cache_hits = 0
+        self.state = None
+
+        if checkpoint and os.path.exists(checkpoint):
+            self._load_checkpoint()
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def _config(self):
+        return {'names': self.names, 'lower': self.lower.tolist(), 'upper': self.upper.tolist(),
+                'duration': self.duration, 'dt': self.dt, 'fixed': self.fixed}
+
+    def to_physical(self, u):
+        """Normalized [0, 1] coordinates -> physical values"""
+        return self.lower + np.asarray(u) * (self.upper - self.lower)
+
+    @staticmethod
+    def _key(u):
+        # Poll points lie on a dyadic lattice; rounding absorbs float noise
+        return tuple(np.round(np.asarray(u, dtype=float), 12).tolist())
+
+    def evaluate(self, U):
+        """
+        Objective for a batch of normalized points (cached)
+
+        Parameters:
+        -----------
+        U : array_like, shape (m, d)
+            Normalized points
+
+        Returns:
+        --------
+        objective : ndarray
+            Depth per energy (mm/kJ); -inf where infeasible
+        """
+        U = np.atleast_2d(np.asarray(U, dtype=float))
+        keys = [self._key(u) for u in U]
+        new = [key for key in dict.fromkeys(keys) if key not in self.cache]
+        self.cache_hits += len(keys) - len(new)
+
+        if new:
+            X = self.to_physical(np.array(new))
+            params = {name: X[:, i] for i, name in enumerate(self.names)}
+            feasible = self._power_feasible(params)
+
+            results = None
+            if feasible.any():
+                members = {name: values[feasible] for name, values in params.items()}
+                ens = TrifectaEnsembleSimulator(n=int(feasible.sum()), **self.fixed, **members)
+                ens.run(self.duration, self.dt)
+                results = ens.results()
+                self.n_simulated += ens.n
+
+            j = 0
+            for key, ok in zip(new, feasible):
+                if not ok:
+                    self.cache[key] = (-np.inf, np.nan, np.nan, False)
+                    continue
+                T = results['T'][j]
+                depth, energy = results['depth'][j], results['energy'][j]
+                objective = depth * 1000 / (energy / 1000)  # mm/kJ
+                ok = T <= SAFETY_LIMITS['max_surface_temp']
+                self.cache[key] = (objective if ok else -np.inf, T, results['rate'][j], bool(ok))
+                j += 1
+
+        return np.array([self.cache[key][0] for key in keys])
+
+    def _power_feasible(self, params):
+        """Total-power constraint, checked without simulating"""
+        base = TrifectaDrillSimulator()
+        total = sum(params.get(name, self.fixed.get(name, getattr(base, name)))
+                    for name in ('P_acoustic', 'P_laser', 'P_plasma'))
+        return np.broadcast_to(total <= SAFETY_LIMITS['max_total_power'],
+                               (len(next(iter(params.values()))),)).copy()
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _initial_point(self, x0):
+        if x0 is None:
+            base = TrifectaDrillSimulator()
+            x0 = [self.fixed.get(name, getattr(base, name)) for name in self.names]
+        x0 = np.clip(np.asarray(x0, dtype=float), self.lower, self.upper)
+        return (x0 - self.lower) / (self.upper - self.lower)
+
+    def run(self, x0=None, step=0.25, min_step=1e-3, max_evals=5000, verbose=True):
+        """
+        Run (or resume) the search
+
+        Parameters:
+        -----------
+        x0 : sequence of float, optional
+            Start point (physical units, default the simulator defaults)
+        step : float
+            Initial poll step in normalized units
+        min_step : float
+            Stop once the step falls below this
+        max_evals : int
+            Stop after this many simulated points
+        verbose : bool
+            Print one line per iteration
+
+        Returns:
+        --------
+        result : dict
+            'x' (dict of physical values), 'objective' (mm/kJ), 'T' (K),
+            'rate' (m/hr), 'iterations', 'evaluations', 'cache_hits', 'wall_time'
+        """
+        if self.state is None:
+            u = self._initial_point(x0)
+            f = self.evaluate(u[None])[0]
+            if not np.isfinite(f):
+                raise ValueError("Start point violates SAFETY_LIMITS")
+            self.state = {'u': u.tolist(), 'f': f, 'step': step, 'iteration': 0}
+
+        d = len(self.names)
+        directions = np.vstack([np.eye(d), -np.eye(d)])
+        t0 = time.perf_counter()
+
+        while self.state['step'] >= min_step and self.n_simulated < max_evals:
+            u = np.array(self.state['u'])
+            s = self.state['step']
+            polls = np.vstack([u + scale * s * directions for scale in POLL_SCALES])
+            polls = polls[np.all((polls >= 0) & (polls <= 1), axis=1)]
+
+            values = self.evaluate(polls)
+            best = int(np.argmax(values)) if len(values) else -1
+
+            if best >= 0 and values[best] > self.state['f'] * (1 + 1e-12):
+                self.state['u'] = polls[best].tolist()
+                self.state['f'] = float(values[best])
+            else:
+                self.state['step'] = s / 2
+            self.state['iteration'] += 1
+
+            if verbose:
+                x = self.to_physical(self.state['u'])
+                point = ', '.join(f"{name}={value:.4g}" for name, value in zip(self.names, x))
+                print(f"  iter {self.state['iteration']:3d}  step {s:.4f}  "
+                      f"{self.state['f']:.4f} mm/kJ  ({point})")
+            if self.checkpoint:
+                self._save_checkpoint()
+
+        u = np.array(self.state['u'])
+        objective, T, rate, _ = self.cache[self._key(u)]
+        return {
+            'x': dict(zip(self.names, self.to_physical(u).tolist())),
+            'objective': float(objective),
+            'T': float(T),
+            'rate': float(rate),
+            'iterations': self.state['iteration'],
+            'evaluations': self.n_simulated,
+            'cache_hits': self.cache_hits,
+            'wall_time': time.perf_counter() - t0,
+        }
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def _save_checkpoint(self):
+        data = {
+            'config': self._config(),
+            'state': self.state,
+            'n_simulated': self.n_simulated,
+            'cache_hits': self.cache_hits,
+            'cache': [[list(key), *[None if not np.isfinite(v) else v for v in value[:3]], value[3]]
+                      for key, value in self.cache.items()],
+        }
+        directory = os.path.dirname(os.path.abspath(self.checkpoint))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.checkpoint)
+
+    def _load_checkpoint(self):
+        with open(self.checkpoint) as f:
+            data = json.load(f)
+        if data['config'] != json.loads(json.dumps(self._config())):
+            raise ValueError(f"Checkpoint '{self.checkpoint}' belongs to a different problem")
+        self.state = data['state']
+        self.n_simulated = data['n_simulated']
+        self.cache_hits = data['cache_hits']
+        for key, objective, T, rate, feasible in data['cache']:
+            self.cache[tuple(key)] = (-np.inf if objective is None else objective,
+                                      np.nan if T is None else T,
+                                      np.nan if rate is None else rate, feasible)
+
+
+def optimize_operating_point(checkpoint=None, verbose=True, **kwargs):
+    """
+    Find the power split / duty cycle with the best depth per joule
+
+    Convenience wrapper: keyword arguments go to OperatingPointOptimizer
+    (variables, duration, dt, fixed inputs) and run() (x0, step, min_step,
+    max_evals).
+    """
+    run_keys = ('x0', 'step', 'min_step', 'max_evals')
+    run_kwargs = {key: kwargs.pop(key) for key in run_keys if key in kwargs}
+    optimizer = OperatingPointOptimizer(checkpoint=checkpoint, **kwargs)
+    result = optimizer.run(verbose=verbose, **run_kwargs)
+
+    if verbose:
+        print()
+        print(f"Best operating point ({result['evaluations']} simulated points, "
+              f"{result['cache_hits']} cache hits, {result['wall_time']:.1f} s):")
+        for name, value in result['x'].items():
+            print(f"  {name:12s} {value:10.4g}")
+        print(f"  Depth per energy: {result['objective']:.4f} mm/kJ")
+        print(f"  Drilling rate:    {result['rate']:.2f} m/hr")
+        print(f"  Final T:          {result['T']:.0f} K (limit {SAFETY_LIMITS['max_surface_temp']:.0f} K)")
+    return result
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("TRIFECTA OPERATING-POINT OPTIMIZATION")
+    print("="*70)
+    print()
+
+    optimize_operating_point()
@@ -0,0 +1,239 @@
+"""
+Trifecta Sensitivity Analysis - Sobol Indices
+=============================================
+
+Variance-based global sensitivity of the coupled model to its constants
+(material properties, powers and the coupling constants of
+TrifectaDrillSimulator such as absorption_coupling or thermal_enhancement).
+
+Sampling follows Saltelli: two independent N×d matrices A and B (one
+scrambled 2d-dimensional Sobol sequence split in half) and the d hybrids
+AB_i (A with column i from B) give N(d + 2) runs. They are evaluated in
+TrifectaEnsembleSimulator batches. Indices use the Saltelli (2010)
+first-order and Jansen total-order estimators, with percentile bootstrap
+confidence intervals over the N rows.
+
+Typical use:
+    result = sobol_analysis(n_base=1024)
+    print_indices(result, 'rate')
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import time
+
+import numpy as np
+from scipy.stats import qmc
+
+from trifecta_simulator import TrifectaDrillSimulator
+from trifecta_ensemble import TrifectaEnsembleSimulator
+
+# Parameters studied by default, varied ±DEFAULT_SPREAD around nominal
+DEFAULT_PARAMETERS = (
+    'rho', 'c_p', 'k_thermal', 'T_melt', 'alpha_base', 'absorption_coupling',
+    'f_damage_max', 'damage_cycles', 'P_laser', 'P_plasma', 'eta_arc',
+    'eta_transfer_base', 'thermal_enhancement', 'thermal_enhancement_rate',
+    'plasma_damage_coupling', 'T_plasma_threshold', 'E_specific',
+    'heated_depth', 'conduction_length', 'emissivity', 'tau_thermal', 'P_acoustic',
+)
+DEFAULT_SPREAD = 0.2
+
+# Outputs analysed (keys of TrifectaEnsembleSimulator.results())
+OUTPUTS = ('rate', 'eta', 'depth')
+
+
+def parameter_ranges(names=DEFAULT_PARAMETERS, spread=DEFAULT_SPREAD, ranges=None):
+    """
+    Uniform ranges around the simulator defaults
+
+    Parameters:
+    -----------
+    names : sequence of str
+        Ensemble PARAMETERS to vary
+    spread : float
+        Relative half-width for names without an explicit range
+    ranges : dict, optional
+        {name: (low, high)} overrides
+
+    Returns:
+    --------
+    ranges : dict
+        {name: (low, high)}
+    """
+    base = TrifectaDrillSimulator()
+    out = {}
+    for name in names:
+        if ranges and name in ranges:
+            out[name] = tuple(ranges[name])
+        else:
+            value = getattr(base, name)
+            out[name] = (value * (1 - spread), value * (1 + spread))
+    return out
+
+
+def saltelli_matrices(ranges, n_base, seed=0):
+    """
+    Saltelli sample matrices
+
+    Returns:
+    --------
+    A, B : ndarray, shape (n_base, d)
+    AB : ndarray, shape (d, n_base, d)
+        AB[i] is A with column i taken from B
+    """
+    d = len(ranges)
+    unit = qmc.Sobol(d=2 * d, scramble=True, seed=seed).random(n_base)
+    low = np.array([r[0] for r in ranges.values()])
+    high = np.array([r[1] for r in ranges.values()])
+    A = low + unit[:, :d] * (high - low)
+    B = low + unit[:, d:] * (high - low)
+    AB = np.repeat(A[None], d, axis=0)
+    for i in range(d):
+        AB[i, :, i] = B[:, i]
+    return A, B, AB
+
+
+def _evaluate(names, X, duration, dt, batch_size, fixed):
+    """Run every row of X through the ensemble; {output: values}"""
+    out = {name: np.empty(len(X)) for name in OUTPUTS}
+    for start in range(0, len(X), batch_size):
+        rows = X[start:start + batch_size]
+        params = {name: rows[:, i] for i, name in enumerate(names)}
+        ens = TrifectaEnsembleSimulator(n=len(rows), **fixed, **params)
+        ens.run(duration, dt)
+        res = ens.results()
+        for name in OUTPUTS:
+            out[name][start:start + len(rows)] = res[name]
+    return out
+
+
+def sobol_indices(f_A, f_B, f_AB, n_bootstrap=500, confidence=0.95, seed=0):
+    """
+    First-order and total Sobol indices with bootstrap intervals
+
+    Parameters:
+    -----------
+    f_A, f_B : ndarray, shape (N,)
+        Model output on A and B
+    f_AB : ndarray, shape (d, N)
+        Model output on each AB_i
+    n_bootstrap : int
+        Bootstrap resamples of the N rows
+    confidence : float
+        Interval coverage
+
+    Returns:
+    --------
+    indices : dict
+        'S1', 'ST' (shape d) and 'S1_ci', 'ST_ci' (shape d × 2)
+    """
+    def estimate(a, b, ab):
+        var = np.var(np.concatenate([a, b], axis=-1), axis=-1)
+        var = np.where(var > 0, var, np.nan)
+        S1 = np.mean(b[..., None, :] * (ab - a[..., None, :]), axis=-1) / var[..., None]
+        ST = 0.5 * np.mean((a[..., None, :] - ab)**2, axis=-1) / var[..., None]
+        return S1, ST
+
+    S1, ST = estimate(f_A, f_B, f_AB)
+
+    rng = np.random.default_rng(seed)
+    N = f_A.size
+    S1_boot = np.empty((n_bootstrap, f_AB.shape[0]))
+    ST_boot = np.empty_like(S1_boot)
+    # Resample in blocks to bound memory at large N × d
+    block = max(1, int(2e7 // (N * f_AB.shape[0])))
+    for start in range(0, n_bootstrap, block):
+        idx = rng.integers(0, N, size=(min(block, n_bootstrap - start), N))
+        S1_b, ST_b = estimate(f_A[idx], f_B[idx], f_AB[:, idx].transpose(1, 0, 2))
+        S1_boot[start:start + len(idx)] = S1_b
+        ST_boot[start:start + len(idx)] = ST_b
+
+    q = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    return {
+        'S1': S1,
+        'ST': ST,
+        'S1_ci': np.nanpercentile(S1_boot, q, axis=0).T,
+        'ST_ci': np.nanpercentile(ST_boot, q, axis=0).T,
+    }
+
+
+def sobol_analysis(names=DEFAULT_PARAMETERS, n_base=1024, spread=DEFAULT_SPREAD, ranges=None,
+                   duration=2.0, dt=0.001, batch_size=50_000, n_bootstrap=500,
+                   seed=0, verbose=True, **fixed):
+    """
+    Sobol sensitivity of the coupled model
+
+    Parameters:
+    -----------
+    names : sequence of str
+        Parameters to vary (ensemble PARAMETERS)
+    n_base : int
+        Rows per Saltelli matrix (power of two); total runs n_base·(d + 2)
+    spread, ranges
+        Passed to parameter_ranges()
+    duration, dt : float
+        Simulated time and step per run (s)
+    batch_size : int
+        Ensemble members per batch (bounds memory)
+    n_bootstrap : int
+        Bootstrap resamples for the confidence intervals
+    seed : int
+        Seed for the Sobol scrambling and the bootstrap
+    verbose : bool
+        Print timing
+    **fixed
+        Other simulator inputs held constant
+
+    Returns:
+    --------
+    result : dict
+        'names', 'ranges', 'n_runs', 'wall_time' and, per output in
+        OUTPUTS, the sobol_indices() dict
+    """
+    ranges = parameter_ranges(names, spread, ranges)
+    names = list(ranges)
+    d = len(names)
+    A, B, AB = saltelli_matrices(ranges, n_base, seed)
+    X = np.vstack([A, B, AB.reshape(-1, d)])
+
+    t0 = time.perf_counter()
+    Y = _evaluate(names, X, duration, dt, batch_size, fixed)
+    t_runs = time.perf_counter() - t0
+
+    result = {'names': names, 'ranges': ranges, 'n_runs': len(X)}
+    for output in OUTPUTS:
+        y = Y[output]
+        result[output] = sobol_indices(y[:n_base], y[n_base:2 * n_base],
+                                       y[2 * n_base:].reshape(d, n_base),
+                                       n_bootstrap=n_bootstrap, seed=seed)
+    result['wall_time'] = time.perf_counter() - t0
+
+    if verbose:
+        print(f"{len(X):,} coupled runs ({d} parameters, N={n_base}) in {t_runs:.1f} s, "
+              f"indices + bootstrap in {result['wall_time'] - t_runs:.1f} s")
+    return result
+
+
+def print_indices(result, output='rate'):
+    """Table of indices for one output, sorted by total effect"""
+    idx = result[output]
+    order = np.argsort(-np.nan_to_num(idx['ST']))
+    print(f"\nSobol indices for '{output}' (95% bootstrap CI)")
+    print(f"{'parameter':>26s} {'S1':>7s} {'S1 CI':>17s} {'ST':>7s} {'ST CI':>17s}")
+    for i in order:
+        lo1, hi1 = idx['S1_ci'][i]
+        loT, hiT = idx['ST_ci'][i]
+        print(f"{result['names'][i]:>26s} {idx['S1'][i]:7.3f} [{lo1:6.3f}, {hi1:6.3f}] "
+              f"{idx['ST'][i]:7.3f} [{loT:6.3f}, {hiT:6.3f}]")
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("TRIFECTA SENSITIVITY ANALYSIS - SOBOL INDICES (±20% RANGES)")
+    print("="*70)
+    print()
+
+    result = sobol_analysis(n_base=1024)
+    for output in ('rate', 'eta'):
+        print_indices(result, output)
@@ -17,41 +17,364 @@ Author: Sportysport + Claude + Grok collaboration
 Date: December 2025
 """
 
+import bisect
+import os
+import sys
+import time
+from collections import OrderedDict, namedtuple
+
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from config import SAFETY_LIMITS, SIMULATION_CONFIG
+from material_properties import MATERIAL_TABLE, get_material, get_property_table
+import result_cache
+from history_store import HistoryStore
+from plotting import (SCREEN_POINTS, downsample, finish, headless_requested, pyplot,
+                      render_in_background)
+
+# Recorded channels: time (s), surface temperature (K), damage fraction,
+# depth (m), drilling rate (m/hr), system efficiency
+HISTORY_FIELDS = ('t', 'T', 'f_damage', 'depth', 'rate', 'eta')
+HISTORY_UNITS = ('s', 'K', '1', 'm', 'm/hr', '1')
+HISTORY_STATS = {'mean': np.mean, 'min': np.min, 'max': np.max}
+
+# Dense-output samples per record interval behind run_adaptive() aggregates
+AGGREGATE_SAMPLES = 16
+
+# Snapshot passed to step observers (see TrifectaDrillSimulator.observe):
+# step index within the run, time (s), T (K), f_damage, depth (m),
+# rate (m/hr), eta, energy (J)
+StepState = namedtuple('StepState', ('step', 'time', 'T', 'f_damage', 'depth', 'rate', 'eta', 'energy'))
+
+# Fixed-step integrators for the surface energy balance
+INTEGRATORS = ('euler', 'implicit')
+
+# Inputs that shape the trajectory before plasma ignition. Plasma settings
+# (P_plasma, eta_arc, eta_transfer_base, E_specific, kerf, ...) only act
+# from the first plasma-active step on.
+PREFIX_PARAMETERS = (
+    'rho', 'c_p', 'k_thermal', 'T_ambient', 'P_acoustic', 'f_acoustic',
+    'f_damage_max', 'damage_cycles', 'P_laser', 'alpha_base', 'absorption_coupling',
+    'spot_size', 'heated_depth', 'conduction_length', 'emissivity', 'T_plasma_threshold',
+)
+
+# Simulator attribute <- material_properties key
+MATERIAL_PARAMETERS = {
+    'rho': 'density',
+    'c_p': 'specific_heat',
+    'k_thermal': 'thermal_conductivity',
+    'T_melt': 'melting_point',
+    'sigma_fracture': 'fracture_threshold',
+    'alpha_base': ('absorptivity', '445nm'),
+    'E_specific': 'specific_energy',
+}
+
+# Simulator attribute <- PropertyTable property (temperature_dependent=True);
+# the attribute holds its value at PROPERTY_T_REF scaled by the table ratio
+PROPERTY_T_REF = 300.0
+PROPERTY_ATTRIBUTES = {
+    'k_thermal': 'thermal_conductivity',
+    'c_p': 'specific_heat',
+    'alpha_base': 'absorptivity_445nm',
+}
+
+
+def material_parameters(name):
+    """
+    Simulator inputs for a material from the material database
+    
+    Parameters:
+    -----------
+    name : str
+        Material name (see material_properties.MATERIALS)
+        
+    Returns:
+    --------
+    params : dict
+        {simulator attribute: value} for MATERIAL_PARAMETERS
+    """
+    mat = get_material(name)
+    params = {}
+    for attr, key in MATERIAL_PARAMETERS.items():
+        if isinstance(key, tuple):
+            params[attr] = mat[key[0]][key[1]]
+        else:
+            params[attr] = mat[key]
+    return params
+
+
+def material_arrays(materials):
+    """
+    Per-sample simulator inputs for many materials at once
+    
+    Parameters:
+    -----------
+    materials : sequence of str or array of int
+        Material of each sample (names or MATERIAL_TABLE ids)
+        
+    Returns:
+    --------
+    params : dict of ndarray
+        {simulator attribute: array} for MATERIAL_PARAMETERS, read from the
+        columnar MATERIAL_TABLE
+    """
+    ids = MATERIAL_TABLE.ids(materials)
+    return {attr: MATERIAL_TABLE[key][ids] for attr, key in MATERIAL_PARAMETERS.items()}
+
+
+class HistoryBuffer:
+    """
+    Growable struct-of-arrays time-series store
+    
+    One contiguous float64 row per field, preallocated and doubled when
+    full, so appending is O(1) amortized and reading a field is a view.
+    """
+    
+    def __init__(self, fields, capacity=1024):
+        self.fields = tuple(fields)
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        self._data = np.empty((len(self.fields), max(int(capacity), 1)))
+        self._n = 0
+        
+    def __len__(self):
+        return self._n
+    
+    def __getitem__(self, name):
+        """Recorded values of one field (read-only view, no copy)"""
+        view = self._data[self._index[name], :self._n]
+        view.flags.writeable = False
+        return view
+    
+    def append(self, row):
+        """Append one value per field"""
+        if self._n == self._data.shape[1]:
+            self._grow(2 * self._n)
+        self._data[:, self._n] = row
+        self._n += 1
+        
+    def _grow(self, capacity):
+        data = np.empty((self._data.shape[0], capacity))
+        data[:, :self._n] = self._data[:, :self._n]
+        self._data = data
+        
+    def reserve(self, capacity):
+        """Preallocate room for at least `capacity` rows"""
+        if capacity > self._data.shape[1]:
+            self._grow(int(capacity))
+            
+    def copy(self, n=None):
+        """Independent buffer holding the first n rows (all by default)"""
+        n = self._n if n is None else n
+        other = HistoryBuffer(self.fields, capacity=self._data.shape[1])
+        other._data[:, :n] = self._data[:, :n]
+        other._n = n
+        return other
+    
+    def __getstate__(self):
+        # Filled rows only: the spare capacity is uninitialized memory
+        return {'fields': self.fields, 'capacity': self._data.shape[1],
+                'data': self._data[:, :self._n].copy()}
+    
+    def __setstate__(self, state):
+        self.__init__(state['fields'], state['capacity'])
+        self._n = state['data'].shape[1]
+        self._data[:, :self._n] = state['data']
+    
+    def as_dict(self):
+        """Copy of all fields as {name: ndarray}"""
+        return {name: self._data[i, :self._n].copy() for i, name in enumerate(self.fields)}
+    
+    @property
+    def nbytes(self):
+        """Memory held by the buffer (bytes)"""
+        return self._data.nbytes
+
+
+class PrefixCache:
+    """
+    In-memory cache of pre-ignition trajectory prefixes
+    
+    Runs that share every PREFIX_PARAMETERS value (and dt, integrator and
+    recording settings) are identical up to the step where the plasma
+    first switches on. The cache stores the simulator state just before
+    that step, so a sweep over plasma settings replays the preheat phase
+    once and resumes every later run from the snapshot.
+    
+    Typical use:
+        cache = PrefixCache()
+        for P in np.linspace(60, 120, 50):
+            sim = TrifectaDrillSimulator()
+            sim.P_plasma = P
+            sim.run(2.0, verbose=False, cache=cache)
+    """
+    
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def __len__(self):
+        return len(self._entries)
+    
+    @staticmethod
+    def key(sim, dt, steady_tol=None):
+        """Everything that determines the pre-ignition trajectory"""
+        formation = sim.formation
+        layers = None if formation is None else (tuple(formation.tops), tuple(formation.materials))
+        return (tuple(float(getattr(sim, name)) for name in PREFIX_PARAMETERS),
+                dt, sim.integrator, sim.record_interval, sim.aggregate, steady_tol,
+                sim.temperature_dependent, layers)
+    
+    def get(self, key):
+        """(step index, state) or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key, step, state):
+        """Store a snapshot taken before `step` steps had been completed"""
+        old = self._entries.get(key)
+        if old is not None and old[0] >= step:
+            return  # Keep the longer prefix
+        self._entries[key] = (step, state)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class Formation:
+    """
+    Layered rock column for through-strata drilling
+    
+    Layers are (top depth in m, material name) pairs sorted by depth, the
+    first starting at the surface; the last extends indefinitely. The
+    MATERIAL_PARAMETERS constants are looked up once per distinct material
+    when the formation is built, so entering a layer is a handful of
+    attribute assignments.
+    
+    Typical use:
+        rock = Formation([(0.0, 'sandstone'), (0.004, 'limestone'), (0.008, 'granite')])
+        sim = TrifectaDrillSimulator(formation=rock)
+    """
+    
+    def __init__(self, layers):
+        if not len(layers):
+            raise ValueError("A formation needs at least one layer")
+        tops = [float(top) for top, _ in layers]
+        if tops[0] != 0.0:
+            raise ValueError("The first layer must start at depth 0")
+        if any(b <= a for a, b in zip(tops, tops[1:])):
+            raise ValueError("Layer tops must be strictly increasing")
+        self.tops = tops
+        self.bottoms = tops[1:] + [np.inf]
+        self.materials = [name for _, name in layers]
+        
+        table = {name: material_parameters(name) for name in set(self.materials)}
+        self.constants = [table[name] for name in self.materials]
+    
+    @classmethod
+    def from_thicknesses(cls, thicknesses, materials):
+        """Build from layer thicknesses (m), top-down"""
+        tops = np.concatenate([[0.0], np.cumsum(thicknesses)[:-1]])
+        return cls(list(zip(tops, materials)))
+    
+    def __len__(self):
+        return len(self.tops)
+    
+    def index(self, depth):
+        """Layer containing depth (bisect, O(log n))"""
+        return max(bisect.bisect_right(self.tops, depth) - 1, 0)
+    
+    def material_at(self, depth):
+        """Material name at depth (m)"""
+        return self.materials[self.index(depth)]
+
 
 class TrifectaDrillSimulator:
     """Coupled acoustic-thermal-plasma drilling simulator"""
     
-    def __init__(self):
-        """Initialize complete trifecta system"""
+    def __init__(self, record_interval=None, aggregate=(), integrator='euler',
+                 material='granite', formation=None, temperature_dependent=False):
+        """
+        Initialize complete trifecta system
         
-        # Material properties (granite)
-        self.rho = 2700.0           # kg/m³
-        self.c_p = 800.0            # J/(kg·K)
-        self.k_thermal = 3.0        # W/(m·K)
+        Parameters:
+        -----------
+        record_interval : float, optional
+            History sampling interval (s) - default
+            SIMULATION_CONFIG['save_interval']; 0 records every step
+        aggregate : tuple of str
+            Per-interval statistics to keep alongside the samples, any of
+            'mean', 'min', 'max' (stored in history_stats)
+        integrator : str
+            'euler' - explicit update (original, needs dt ~1 ms)
+            'implicit' - trapezoidal Newton solve of the energy balance,
+            accurate at dt of 10-50 ms
+        material : str
+            Rock from material_properties.MATERIALS supplying the
+            MATERIAL_PARAMETERS constants
+        formation : Formation, optional
+            Layered column; its layers replace `material` as the drill
+            reaches them (swapped at the step where depth crosses a top)
+        temperature_dependent : bool
+            Update k_thermal, c_p and alpha_base every step from the
+            material's PropertyTable: each is its 300 K value (from the
+            material, set_inputs or an attribute edit) times the table's
+            ratio to 300 K at the current surface temperature, held over
+            each step. reset() restores the 300 K values
+        """
+        if record_interval is None:
+            record_interval = SIMULATION_CONFIG['save_interval']
+        unknown = set(aggregate) - set(HISTORY_STATS)
+        if unknown:
+            raise ValueError(f"Unknown aggregate(s): {sorted(unknown)}. "
+                             f"Available: {', '.join(HISTORY_STATS)}")
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}'. "
+                             f"Available: {', '.join(INTEGRATORS)}")
+        self.record_interval = record_interval
+        self.aggregate = tuple(aggregate)
+        self.integrator = integrator
+        
+        # Material properties (rho, c_p, k_thermal, T_melt, sigma_fracture,
+        # alpha_base, E_specific) from the material database
+        self.material = material
+        for name, value in material_parameters(material).items():
+            setattr(self, name, value)
+        self.formation = formation
+        self.temperature_dependent = temperature_dependent
         self.T_ambient = 300.0      # K
-        self.T_melt = 1500.0        # K
-        self.sigma_fracture = 100e6 # Pa - microcrack threshold
         
         # Acoustic system
         self.P_acoustic = 760.0     # W - total acoustic power
         self.P_peak_acoustic = 12e6 # Pa - peak pressure (near-field)
         self.f_acoustic = 40e3      # Hz
+        self.f_damage_max = 0.07    # Saturation damage fraction
+        self.damage_cycles = 1e6    # Cycles per e-fold of damage growth
         
         # Laser system
         self.P_laser = 5.0          # W - average power
         self.f_pulse = 1000.0       # Hz - pulse frequency
         self.duty_cycle = 0.1       # 10% duty cycle
         self.P_pulse = self.P_laser / self.duty_cycle  # 50W peak
-        self.alpha_base = 0.15      # Baseline absorption
+        self.absorption_coupling = 3.0  # Absorption gain per unit damage
         
         # Plasma system
         self.P_plasma = 85.0        # W - plasma torch
         self.eta_arc = 0.80         # Arc efficiency
         self.eta_transfer_base = 0.40  # Base transfer efficiency
         self.T_plasma_threshold = 800.0  # K - minimum for efficient plasma
+        self.thermal_enhancement = 1.0  # Max relative transfer gain from heating
+        self.thermal_enhancement_rate = 3.0  # Exponential rate over threshold->melt
+        self.plasma_damage_coupling = 0.3  # Transfer gain per unit damage
+        self.eta_transfer_max = 0.95   # Transfer efficiency cap
+        self.min_energy_fraction = 0.1  # Floor on E_specific after pre-heat
         
         # Drilling parameters
         self.spot_size = 1e-3       # m - laser/plasma spot diameter
@@ -59,12 +382,21 @@ class TrifectaDrillSimulator:
         self.A_spot = np.pi * (self.spot_size/2)**2
         self.A_kerf = np.pi * (self.kerf_width/2)**2
         
+        # Lumped surface element
+        self.heated_depth = 0.001   # m - heated layer thickness
+        self.conduction_length = 0.01  # m - conduction path (~1 cm)
+        self.emissivity = 0.9       # Surface emissivity
+        
         # Time constants
         self.tau_thermal = 0.0675   # s - thermal time constant
         self.t_steady = 0.5         # s - time to steady state
         
-        # Specific energy
-        self.E_specific = 7.36e9    # J/m³ - granite removal energy
+        # Streaming HDF5 output of the current run (see run(output=...))
+        self._output = None
+        # Callbacks receiving each history sample (see subscribe())
+        self._subscribers = []
+        # (callback, every_steps, every_time) called during run() (see observe())
+        self._observers = []
         
         # State variables
         self.reset()
@@ -76,14 +408,343 @@ class TrifectaDrillSimulator:
         self.f_damage = 0.0
         self.depth = 0.0
         self.energy_used = 0.0
+        self._equilibrium = None
         
-        # History arrays
-        self.t_history = [0]
-        self.T_history = [self.T_ambient]
-        self.f_damage_history = [0]
-        self.depth_history = [0]
-        self.rate_history = [0]
-        self.eta_history = [0]
+        # Current layer; _layer_bottom = inf without a formation keeps the
+        # per-step boundary check to one comparison
+        self._layer = None
+        self._layer_bottom = np.inf
+        if self.formation is not None:
+            self._enter_layer(0)
+        self._properties = None
+        if self.temperature_dependent:
+            self._properties = get_property_table(self.material)
+            # Undo the temperature scaling of the previous run
+            scaled = getattr(self, '_property_scaled', None)
+            if scaled is not None:
+                for name, value in self._property_base.items():
+                    if getattr(self, name) == scaled[name]:  # Not edited since
+                        setattr(self, name, value)
+            self._property_base = {name: getattr(self, name) for name in PROPERTY_ATTRIBUTES}
+            self._property_scaled = None
+        self._property_values = None
+        
+        # History buffers (sampled every record_interval)
+        self.history = HistoryBuffer(HISTORY_FIELDS)
+        self.history_stats = {stat: HistoryBuffer(HISTORY_FIELDS) for stat in self.aggregate}
+        self._next_record = self.record_interval
+        
+        # Per-step rows of the current interval (only needed for aggregates)
+        self._pending = np.zeros((64, len(HISTORY_FIELDS)))
+        self._n_pending = 0
+        self._last_rate = 0.0
+        self._last_eta = 0.0
+        
+        initial = (0.0, self.T_ambient, 0.0, 0.0, 0.0, 0.0)
+        self.history.append(initial)
+        for buffer in self.history_stats.values():
+            buffer.append(initial)
+    
+    # Scalar state carried between steps
+    _STATE = ('time', 'T_surface', 'f_damage', 'depth', 'energy_used',
+              '_last_rate', '_last_eta', '_next_record', '_n_pending', '_layer')
+    
+    def get_state(self):
+        """Snapshot of the full simulation state (history included)"""
+        state = {name: getattr(self, name) for name in self._STATE}
+        state['history'] = self.history.copy()
+        state['history_stats'] = {stat: buffer.copy() for stat, buffer in self.history_stats.items()}
+        state['pending'] = self._pending.copy()
+        return state
+    
+    def set_state(self, state):
+        """Restore a snapshot from get_state() (the snapshot stays reusable)"""
+        for name in self._STATE:
+            setattr(self, name, state[name])
+        if self.formation is not None:
+            self._enter_layer(self._layer)
+        self._property_values = None
+        self.history = state['history'].copy()
+        self.history_stats = {stat: buffer.copy() for stat, buffer in state['history_stats'].items()}
+        self._pending = state['pending'].copy()
+    
+    def _state_scalars(self):
+        """Scalar state and history lengths (cheap per-step snapshot)"""
+        return ({name: getattr(self, name) for name in self._STATE},
+                len(self.history), {stat: len(buffer) for stat, buffer in self.history_stats.items()})
+    
+    def _store_prefix(self, cache, key, step, scalars, ignited):
+        """Cache the state described by `scalars` (taken before `step`)"""
+        values, n_history, n_stats = scalars
+        state = dict(values)
+        state['history'] = self.history.copy(n_history)
+        state['history_stats'] = {stat: buffer.copy(n_stats[stat])
+                                  for stat, buffer in self.history_stats.items()}
+        state['pending'] = self._pending.copy()
+        state['ignited'] = ignited
+        cache.put(key, step, state)
+    
+    def _enter_layer(self, i):
+        """Swap in the precomputed constants of formation layer i"""
+        formation = self.formation
+        for name, value in formation.constants[i].items():
+            setattr(self, name, value)
+        self.material = formation.materials[i]
+        self._layer = i
+        self._layer_bottom = formation.bottoms[i]
+        self._equilibrium = None
+        if self.temperature_dependent:
+            self._properties = get_property_table(self.material)
+            self._property_values = None
+    
+    def _apply_properties(self):
+        """
+        Scale the temperature-dependent constants to the current surface temperature
+        
+        A constant that no longer holds the value last written here was
+        set from outside (attribute edit, set_inputs, formation layer) and
+        becomes the new 300 K value.
+        """
+        values = self._properties.at(self.T_surface)
+        if values is not self._property_values:
+            reference = self._properties.at(PROPERTY_T_REF)
+            base = self._property_base
+            scaled = self._property_scaled
+            if scaled is None:
+                scaled = self._property_scaled = {}
+            for name, prop in PROPERTY_ATTRIBUTES.items():
+                if getattr(self, name) != scaled.get(name):
+                    base[name] = getattr(self, name)
+                scaled[name] = base[name] * values[prop] / reference[prop]
+                setattr(self, name, scaled[name])
+            self._property_values = values
+            self._equilibrium = None
+    
+    def _advance_layer(self):
+        """Move the layer cursor down to the current depth (amortized O(1))"""
+        bottoms = self.formation.bottoms
+        i = self._layer
+        while self.depth >= bottoms[i]:
+            i += 1
+        self._enter_layer(i)
+    
+    # Array views of the recorded history
+    t_history = property(lambda self: self.history['t'])
+    T_history = property(lambda self: self.history['T'])
+    f_damage_history = property(lambda self: self.history['f_damage'])
+    depth_history = property(lambda self: self.history['depth'])
+    rate_history = property(lambda self: self.history['rate'])
+    eta_history = property(lambda self: self.history['eta'])
+    
+    def _record(self, row):
+        """
+        Record one step; emit a history sample when the interval is due
+        
+        Without aggregates only the due steps touch memory. With aggregates
+        each step's row goes into a small scratch block that is reduced
+        once per interval.
+        """
+        if self.aggregate:
+            if self._n_pending == self._pending.shape[0]:
+                self._pending = np.concatenate([self._pending, np.zeros_like(self._pending)])
+            self._pending[self._n_pending] = row
+            self._n_pending += 1
+            
+        if self.time >= self._next_record - 1e-9 * self.record_interval:
+            self._emit(row)
+    
+    def _pend(self, rows):
+        """Add a block of rows to the current interval (aggregates only)"""
+        n = self._n_pending + len(rows)
+        if n > self._pending.shape[0]:
+            grown = np.zeros((max(n, 2 * self._pending.shape[0]), len(HISTORY_FIELDS)))
+            grown[:self._n_pending] = self._pending[:self._n_pending]
+            self._pending = grown
+        self._pending[self._n_pending:n] = rows
+        self._n_pending = n
+            
+    def _emit(self, row):
+        """Append the interval sample (and statistics) to the history"""
+        self.history.append(row)
+        if self._output is not None:
+            self._output['history'].append(row)
+        for callback in self._subscribers:
+            callback(row)
+        self._emit_stats(row[0])
+        while self._next_record <= self.time + 1e-9 * self.record_interval:
+            self._next_record += self.record_interval
+            if self.record_interval <= 0:
+                break
+    
+    def _emit_stats(self, t):
+        """Reduce the pending rows into one statistics sample stamped t"""
+        if self.aggregate and self._n_pending:
+            block = self._pending[:self._n_pending]
+            for stat, buffer in self.history_stats.items():
+                values = HISTORY_STATS[stat](block, axis=0)
+                values[0] = t  # Timestamp of the interval end
+                buffer.append(values)
+                if self._output is not None:
+                    self._output[stat].append(values)
+            self._n_pending = 0
+    
+    def flush_history(self):
+        """Record the partial interval at the current time (end of a run)"""
+        if self.history['t'][-1] < self.time:
+            self._emit((self.time, self.T_surface, self.f_damage, self.depth,
+                        self._last_rate, self._last_eta))
+    
+    def subscribe(self, callback):
+        """
+        Call callback(row) with every history sample as it is recorded
+        
+        row holds the HISTORY_FIELDS values (it may be reused by the
+        caller, so copy what you keep). Callbacks run on the simulating
+        thread and should return quickly; runs with subscribers bypass the
+        result cache.
+        """
+        self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback):
+        """Detach a callback added with subscribe()"""
+        self._subscribers.remove(callback)
+    
+    def observe(self, callback, every_steps=None, every_time=None):
+        """
+        Call callback(state) periodically while run() steps
+        
+        state is a StepState taken after the due step. Observers are due
+        every `every_steps` steps of a run or every `every_time` seconds
+        of simulated time (at the first step boundary at or after each
+        multiple), and once more at the end of each run. A callback
+        returning a true value stops the run there (e.g. a safety
+        check). Checking costs one integer comparison per step whatever
+        the number of observers; runs with observers bypass the result
+        cache.
+        
+        Parameters:
+        -----------
+        callback : callable
+            Called with a StepState
+        every_steps : int, optional
+            Cadence in steps
+        every_time : float, optional
+            Cadence in simulated seconds
+            
+        Returns:
+        --------
+        observer : tuple
+            Handle for remove_observer()
+        """
+        if (every_steps is None) == (every_time is None):
+            raise ValueError("Give exactly one of every_steps and every_time")
+        if (every_steps or every_time) <= 0:
+            raise ValueError("Observer cadence must be positive")
+        observer = (callback, every_steps, every_time)
+        self._observers.append(observer)
+        return observer
+    
+    def remove_observer(self, observer):
+        """Detach an observer added with observe()"""
+        self._observers.remove(observer)
+    
+    def _next_due(self, observer, i, t_start, dt):
+        """First step after step i at which observer is due"""
+        _, every_steps, every_time = observer
+        if every_steps is not None:
+            return (i // every_steps + 1) * every_steps
+        t_next = (np.floor(self.time / every_time + 1e-9) + 1) * every_time
+        return max(i + 1, int(np.ceil((t_next - t_start) / dt - 1e-9)))
+    
+    def _notify(self, hooks, i, t_start, dt, final=False):
+        """
+        Call the observers due at step i (all not yet called there if final)
+        
+        hooks holds [next due step, observer, last step called] per
+        observer. Returns the next due step over all hooks and whether a
+        callback asked to stop.
+        """
+        state = StepState(i, self.time, self.T_surface, self.f_damage, self.depth,
+                          self._last_rate, self._last_eta, self.energy_used)
+        stop = False
+        for hook in hooks:
+            if hook[0] <= i or (final and hook[2] != i):
+                stop |= bool(hook[1][0](state))
+                hook[0] = self._next_due(hook[1], i, t_start, dt)
+                hook[2] = i
+        return min(hook[0] for hook in hooks), stop
+    
+    @staticmethod
+    def _progress_observer(steps):
+        """Observer printing progress at 10, 25, 50, 75 and 100% of a run"""
+        markers = [0.1, 0.25, 0.5, 0.75, 1.0]
+        
+        def report(state):
+            while markers and state.step / steps >= markers[0]:
+                print(f"  Progress: {markers.pop(0)*100:.0f}% " +
+                      f"(T={state.T:.0f}K, depth={state.depth*1000:.2f}mm)")
+        
+        # Every 5%, so each marker prints within 5% of the run after it is reached
+        return (report, max(1, steps // 20), None)
+    
+    def parameters(self):
+        """Scalar inputs and constants of the simulator (no run state)"""
+        params = {name: value for name, value in vars(self).items()
+                  if not name.startswith('_') and name not in self._STATE
+                  and isinstance(value, (bool, int, float, str, np.number))}
+        params['aggregate'] = list(self.aggregate)
+        if self.formation is not None:
+            params['formation'] = [[top, name] for top, name in
+                                   zip(self.formation.tops, self.formation.materials)]
+        return params
+    
+    def _open_output(self, output):
+        """
+        Start streaming history samples to an HDF5 store
+        
+        Samples already in memory are written first, so the file always
+        holds the full history; a store passed in again by a later run
+        continues its series where they stop.
+        """
+        store = output if isinstance(output, HistoryStore) else \
+            HistoryStore(output, 'w', parameters=self.parameters())
+        buffers = {'history': self.history,
+                   **{stat: buffer for stat, buffer in self.history_stats.items()}}
+        self._output = {}
+        for name, buffer in buffers.items():
+            series = 'history' if name == 'history' else f'stats/{name}'
+            writer = store.series(series, HISTORY_FIELDS, HISTORY_UNITS)
+            written = len(writer)
+            if written < len(buffer):
+                writer.extend(np.column_stack([buffer[field][written:] for field in HISTORY_FIELDS]))
+            self._output[name] = writer
+        return store
+    
+    def _publish_restored(self, n_history, n_stats):
+        """
+        Stream history samples past the given buffer lengths
+        
+        For samples that were restored (prefix cache) rather than recorded
+        through _emit(): the output store and subscribers receive them as
+        if they had just been recorded.
+        """
+        rows = np.column_stack([self.history[field][n_history:] for field in HISTORY_FIELDS])
+        if self._output is not None:
+            self._output['history'].extend(rows)
+            for stat, buffer in self.history_stats.items():
+                self._output[stat].extend(np.column_stack(
+                    [buffer[field][n_stats[stat]:] for field in HISTORY_FIELDS]))
+        for callback in self._subscribers:
+            for row in rows:
+                callback(row)
+    
+    def _close_output(self, store, output):
+        """Stop streaming; close the store unless the caller owns it"""
+        self._output = None
+        if store is output:
+            store.flush()
+        else:
+            store.close()
         
     def acoustic_damage(self, t):
         """
@@ -100,14 +761,14 @@ class TrifectaDrillSimulator:
             return 0.0
         
         # Asymptotic approach to maximum damage
-        f_max = 0.07  # 7% damage achievable with our acoustic pressure
-        f_damage = f_max * (1 - np.exp(-N_cycles / 1e6))
+        # (7% achievable with our acoustic pressure)
+        f_damage = self.f_damage_max * (1 - np.exp(-N_cycles / self.damage_cycles))
         
         return f_damage
     
     def laser_absorption(self, f_damage):
         """Calculate enhanced laser absorption from acoustic damage"""
-        alpha = self.alpha_base * (1 + 3.0 * f_damage)
+        alpha = self.alpha_base * (1 + self.absorption_coupling * f_damage)
         return alpha
     
     def laser_heating(self, T_current, f_damage, dt):
@@ -138,22 +799,164 @@ class TrifectaDrillSimulator:
         dT_current = T_current - self.T_ambient
         
         # Conduction loss (simplified)
-        P_loss = self.k_thermal * self.A_spot * dT_current / 0.01  # ~1cm depth
+        P_loss = self.k_thermal * self.A_spot * dT_current / self.conduction_length
         
         # Radiation loss (Stefan-Boltzmann)
         sigma_sb = 5.67e-8  # W/(m²·K⁴)
-        epsilon = 0.9  # Granite emissivity
+        epsilon = self.emissivity
         P_rad = epsilon * sigma_sb * self.A_spot * (T_current**4 - self.T_ambient**4)
         
         # Net heating power
         P_net = P_absorbed - P_loss - P_rad
         
         # Temperature rise
-        mass = self.rho * self.A_spot * 0.001  # 1mm depth of material
+        mass = self.rho * self.A_spot * self.heated_depth  # Heated layer
         dT = (P_net * dt) / (mass * self.c_p)
         
         return dT
     
+    def _heating_power(self, T, f_damage):
+        """Net heating power (W) and its temperature derivative (W/K)"""
+        P_absorbed = self.laser_absorption(f_damage) * self.P_laser
+        G_cond = self.k_thermal * self.A_spot / self.conduction_length
+        G_rad = self.emissivity * 5.67e-8 * self.A_spot
+        P_net = P_absorbed - G_cond * (T - self.T_ambient) - G_rad * (T**4 - self.T_ambient**4)
+        dP_dT = -G_cond - 4 * G_rad * T**3
+        return P_net, dP_dT
+    
+    def laser_heating_implicit(self, T_current, f_prev, f_damage, dt, theta=0.5,
+                               tol=1e-10, max_iter=20):
+        """
+        Temperature change from an implicit step of the surface energy balance
+        
+        Solves m c_p (T - T_n)/dt = θ P(T, f) + (1-θ) P(T_n, f_n) for T by
+        Newton iteration on the quartic. θ = 0.5 is the trapezoidal rule
+        (second order), θ = 1 backward Euler; both are unconditionally stable.
+        
+        Parameters:
+        -----------
+        T_current : float
+            Temperature at the start of the step (K)
+        f_prev, f_damage : float
+            Damage fraction at the start and end of the step
+        dt : float
+            Time step (s)
+        theta : float
+            Implicitness (0.5 to 1)
+            
+        Returns:
+        --------
+        dT : float
+            Temperature change (K)
+        """
+        C = self.rho * self.A_spot * self.heated_depth * self.c_p / dt
+        P_old, _ = self._heating_power(T_current, f_prev)
+        rhs = C * T_current + (1 - theta) * P_old
+        
+        # Start from the explicit estimate; g is increasing and convex in T,
+        # so Newton converges monotonically once past the root
+        T = max(T_current + P_old / C, self.T_ambient)
+        for _ in range(max_iter):
+            P, dP_dT = self._heating_power(T, f_damage)
+            g = C * T - theta * P - rhs
+            dT_newton = g / (C - theta * dP_dT)
+            T -= dT_newton
+            if abs(dT_newton) <= tol * T:
+                break
+        
+        return T - T_current
+    
+    def equilibrium(self):
+        """
+        Long-time limit of the surface state for the current parameters
+        
+        Returns:
+        --------
+        T_eq : float
+            Temperature where laser absorption balances conduction and
+            radiation at saturated damage (K)
+        f_eq : float
+            Saturated damage fraction
+        """
+        if self._equilibrium is None:
+            f_eq = self.f_damage_max if self.f_acoustic > 0 else 0.0
+            
+            # -P_net is increasing and convex: Newton from ambient overshoots
+            # once, then converges monotonically
+            T = self.T_ambient
+            for _ in range(50):
+                P_net, dP_dT = self._heating_power(T, f_eq)
+                dT = P_net / dP_dT
+                T -= dT
+                if abs(dT) <= 1e-12 * T:
+                    break
+            self._equilibrium = (max(T, self.T_ambient), f_eq)
+        return self._equilibrium
+    
+    def is_steady(self, tol):
+        """True if temperature and damage are within tol (relative) of equilibrium"""
+        T_eq, f_eq = self.equilibrium()
+        return (abs(self.T_surface - T_eq) <= tol * T_eq and
+                abs(self.f_damage - f_eq) <= tol * max(f_eq, 1e-300))
+    
+    def fast_forward(self, interval):
+        """
+        Advance a quasi-steady state in closed form
+        
+        Temperature and damage are frozen, so the removal rate and input
+        power are constant and depth/energy grow linearly. One history
+        sample is written at the end of the plateau (the recorded curves
+        are exact under linear interpolation).
+        
+        Parameters:
+        -----------
+        interval : float
+            Time to skip (s)
+        """
+        self.time += interval
+        self.f_damage = self.acoustic_damage(self.time)
+        
+        V_dot = self.material_removal_rate(self.T_surface, self.f_damage)
+        rate = V_dot / self.A_kerf
+        self.depth += rate * interval
+        if self.depth >= self._layer_bottom:
+            self._advance_layer()
+        self.energy_used += (self.P_acoustic + self.P_laser +
+                             (self.P_plasma if self.plasma_active(self.T_surface) else 0)) * interval
+        
+        if self.depth > 0 and self.energy_used > 0:
+            eta_system = self.E_specific * (self.depth * self.A_kerf) / self.energy_used
+        else:
+            eta_system = 0
+        self._last_rate = rate * 3600
+        self._last_eta = eta_system
+        
+        row = (self.time, self.T_surface, self.f_damage, self.depth, self._last_rate, eta_system)
+        if self.aggregate:
+            self._pending[0] = row
+            self._n_pending = 1
+        if self.record_interval > 0:
+            self._next_record = (np.floor(self.time / self.record_interval + 1e-9) + 1) * self.record_interval
+        self._emit(row)
+    
+    def set_inputs(self, **inputs):
+        """
+        Change simulator inputs mid-run (powers, duty cycle, geometry, ...)
+        
+        Derived quantities are refreshed and the cached equilibrium dropped.
+        """
+        for name, value in inputs.items():
+            if not hasattr(self, name) or name.startswith('_') or callable(getattr(self, name)):
+                raise ValueError(f"Unknown input '{name}'")
+            setattr(self, name, value)
+            if self._properties is not None and name in PROPERTY_ATTRIBUTES:
+                self._property_base[name] = value
+                self._property_values = None  # Rescale at the next step
+        self.P_pulse = self.P_laser / self.duty_cycle
+        self.A_spot = np.pi * (self.spot_size/2)**2
+        self.A_kerf = np.pi * (self.kerf_width/2)**2
+        self._equilibrium = None
+    
     def thermal_stress(self, T):
         """Calculate thermal stress from temperature rise"""
         dT = T - self.T_ambient
@@ -174,19 +977,18 @@ class TrifectaDrillSimulator:
         eta_base = self.eta_transfer_base
         
         # Temperature enhancement (exponential approach)
-        if T_surface < self.T_plasma_threshold:
-            eta_temp = eta_base
-        else:
-            T_factor = (T_surface - self.T_plasma_threshold) / (self.T_melt - self.T_plasma_threshold)
-            T_factor = np.clip(T_factor, 0, 1)
-            eta_temp = eta_base * (1 + 1.0 * (1 - np.exp(-3 * T_factor)))
+        # Below threshold T_factor clips to 0 and eta_temp = eta_base exactly
+        T_factor = (T_surface - self.T_plasma_threshold) / (self.T_melt - self.T_plasma_threshold)
+        T_factor = np.clip(T_factor, 0, 1)
+        eta_temp = eta_base * (1 + self.thermal_enhancement *
+                               (1 - np.exp(-self.thermal_enhancement_rate * T_factor)))
         
         # Damage enhancement
-        eta_damage = 1.0 + 0.3 * f_damage
+        eta_damage = 1.0 + self.plasma_damage_coupling * f_damage
         
         # Combined
         eta_total = eta_temp * eta_damage
-        eta_total = np.min([eta_total, 0.95])
+        eta_total = np.minimum(eta_total, self.eta_transfer_max)
         
         return eta_total
     
@@ -207,6 +1009,10 @@ class TrifectaDrillSimulator:
         if not self.plasma_active(T_surface):
             return 0.0
         
+        return self._plasma_removal_rate(T_surface, f_damage)
+    
+    def _plasma_removal_rate(self, T_surface, f_damage):
+        """Removal rate with the plasma on (continuous across the threshold, vectorized)"""
         # Plasma efficiency
         eta = self.plasma_efficiency(T_surface, f_damage)
         
@@ -216,7 +1022,7 @@ class TrifectaDrillSimulator:
         # Account for pre-heating (laser did part of the work!)
         E_preheat = self.rho * self.c_p * (T_surface - self.T_ambient)
         E_remaining = self.E_specific - E_preheat
-        E_remaining = np.max([E_remaining, self.E_specific * 0.1])  # Minimum
+        E_remaining = np.maximum(E_remaining, self.E_specific * self.min_energy_fraction)
         
         # Removal rate
         V_dot = P_eff / E_remaining
@@ -232,6 +1038,11 @@ class TrifectaDrillSimulator:
         dt : float
             Time step (s)
         """
+        if self._properties is not None:
+            self._apply_properties()
+        if self.integrator == 'implicit':
+            return self._step_implicit(dt)
+        
         self.time += dt
         
         # 1. Acoustic damage accumulation (continuous)
@@ -252,6 +1063,8 @@ class TrifectaDrillSimulator:
             self.depth += ddepth
         else:
             rate = 0.0
+        if self.depth >= self._layer_bottom:
+            self._advance_layer()
         
         # 4. Energy accounting
         self.energy_used += (self.P_acoustic + self.P_laser + 
@@ -265,49 +1078,573 @@ class TrifectaDrillSimulator:
             eta_system = 0
         
         # 6. Store history
-        self.t_history.append(self.time)
-        self.T_history.append(self.T_surface)
-        self.f_damage_history.append(self.f_damage)
-        self.depth_history.append(self.depth)
-        self.rate_history.append(rate * 3600)  # Convert to m/hr
-        self.eta_history.append(eta_system)
+        self._last_rate = rate * 3600  # Convert to m/hr
+        self._last_eta = eta_system
+        self._record((self.time, self.T_surface, self.f_damage, self.depth,
+                      self._last_rate, eta_system))
     
-    def run(self, duration, dt=0.001):
+    def _step_implicit(self, dt):
+        """
+        Large-step update: trapezoidal energy balance, plasma switched on/off
+        at the interpolated threshold crossing inside the step
+        """
+        T0, f0 = self.T_surface, self.f_damage
+        self.time += dt
+        
+        # 1. Acoustic damage at the end of the step
+        f1 = self.acoustic_damage(self.time)
+        self.f_damage = f1
+        
+        # 2. Implicit laser heating
+        T1 = T0 + self.laser_heating_implicit(T0, f0, f1, dt)
+        T1 = max(T1, self.T_ambient)
+        self.T_surface = T1
+        
+        # 3. Plasma removal over the active part of the step (trapezoidal)
+        on0, on1 = self.plasma_active(T0), self.plasma_active(T1)
+        rate = self._plasma_removal_rate(T1, f1) / self.A_kerf if on1 else 0.0
+        s_active = 0.0
+        if on0 or on1:
+            if on0 and on1:
+                s_active = 1.0
+                Ta, fa = T0, f0
+                Tb, fb = T1, f1
+            else:
+                s = (self.T_plasma_threshold - T0) / (T1 - T0)  # Crossing, 0..1
+                f_cross = f0 + s * (f1 - f0)
+                s_active = 1 - s if on1 else s
+                Ta, fa = (self.T_plasma_threshold, f_cross) if on1 else (T0, f0)
+                Tb, fb = (T1, f1) if on1 else (self.T_plasma_threshold, f_cross)
+            V_mean = 0.5 * (self._plasma_removal_rate(Ta, fa) + self._plasma_removal_rate(Tb, fb))
+            self.depth += V_mean / self.A_kerf * s_active * dt
+            if self.depth >= self._layer_bottom:
+                self._advance_layer()
+        
+        # 4. Energy accounting
+        self.energy_used += (self.P_acoustic + self.P_laser + self.P_plasma * s_active) * dt
+        
+        # 5. Calculate current efficiency
+        if self.depth > 0 and self.energy_used > 0:
+            eta_system = self.E_specific * (self.depth * self.A_kerf) / self.energy_used
+        else:
+            eta_system = 0
+        
+        # 6. Store history
+        self._last_rate = rate * 3600
+        self._last_eta = eta_system
+        self._record((self.time, self.T_surface, self.f_damage, self.depth,
+                      self._last_rate, eta_system))
+    
+    @result_cache.cached_method(ignore=('verbose',), exclude_state=('_properties', '_equilibrium'),
+                                mutates=True, bypass=('cache', 'output'), live=('_subscribers', '_observers'))
+    def run(self, duration, dt=0.001, verbose=True, steady_tol=None, schedule=(), cache=None,
+            output=None):
         """
         Run simulation for specified duration
         
+        With the result cache enabled (opt-in, see result_cache), a
+        rerun from the same state with the same inputs restores the
+        finished state instead of stepping (runs with a prefix cache are
+        not stored).
+        
         Parameters:
         -----------
         duration : float
             Simulation time (s)
         dt : float
             Time step (s)
+        verbose : bool
+            Print progress
+        steady_tol : float, optional
+            Once temperature and damage are within this relative tolerance
+            of equilibrium, skip ahead in closed form (fast_forward) to the
+            next scheduled event or the end of the run. None steps throughout.
+        schedule : sequence of (float, dict)
+            Input changes as (time in s, {name: value}) passed to
+            set_inputs() at the first step boundary at or after that time
+            (material constants are overwritten again at the next layer
+            top of a formation)
+        cache : PrefixCache, optional
+            Resume from / store the pre-ignition prefix of runs started
+            from reset() (not combinable with a schedule)
+        output : str or HistoryStore, optional
+            HDF5 file (or open store) the history samples are streamed to
+            in compressed chunks as they are recorded, with the simulator
+            parameters and units (see history_store.py)
         """
-        print(f"Running trifecta simulation for {duration:.2f} seconds...")
-        print()
+        if cache is not None and schedule:
+            raise ValueError("A prefix cache cannot be combined with an input schedule")
+        if output is not None:
+            store = self._open_output(output)
+            try:
+                # Straight to the stepping body: a cache hit would write nothing
+                self.run.uncached(self, duration, dt, verbose, steady_tol, schedule, cache)
+            finally:
+                self._close_output(store, output)
+            return
+        if verbose:
+            print(f"Running trifecta simulation for {duration:.2f} seconds...")
+            print()
         
         steps = int(duration / dt)
+        if self.record_interval > 0:
+            self.history.reserve(len(self.history) + duration / self.record_interval + 2)
+        else:
+            self.history.reserve(len(self.history) + steps + 1)
         
-        # Progress markers
-        markers = [0.1, 0.25, 0.5, 0.75, 1.0]
-        marker_idx = 0
+        t_start = self.time
+        events = sorted(schedule, key=lambda event: event[0])
+        event_idx = 0
+        self._equilibrium = None  # Inputs may have been edited since the last run
+        
+        # [next due step, observer, last step called] per observer (and the progress report)
+        observers = list(self._observers)
+        if verbose and steps > 0:
+            observers.append(self._progress_observer(steps))
+        hooks = [[self._next_due(observer, 0, t_start, dt), observer, None] for observer in observers]
+        next_hook = min((hook[0] for hook in hooks), default=np.inf)
         
-        for i in range(steps):
-            self.step(dt)
+        i = 0
+        prefix_key = None
+        if cache is not None and self.time == 0 and len(self.history) == 1:
+            prefix_key = cache.key(self, dt, steady_tol)
+            entry = cache.get(prefix_key)
+            if entry is not None and entry[0] <= steps:
+                i = entry[0]
+                _, n_history, n_stats = self._state_scalars()
+                self.set_state(entry[1])
+                self._publish_restored(n_history, n_stats)
+                if entry[1]['ignited']:
+                    prefix_key = None  # Nothing left to capture
+        
+        while i < steps:
+            while event_idx < len(events) and events[event_idx][0] <= self.time + 1e-9 * dt:
+                self.set_inputs(**events[event_idx][1])
+                event_idx += 1
+            
+            if steady_tol is not None and self.is_steady(steady_tol):
+                # Skip whole steps up to the next event (or the end)
+                i_stop = steps
+                if event_idx < len(events):
+                    i_event = int(np.ceil((events[event_idx][0] - t_start) / dt - 1e-9))
+                    i_stop = min(i_stop, i_event)
+                if self._layer_bottom < np.inf:
+                    # ... and no further than the next layer top
+                    rate = self.material_removal_rate(self.T_surface, self.f_damage) / self.A_kerf
+                    if rate > 0:
+                        i_stop = min(i_stop, i + int((self._layer_bottom - self.depth) / (rate * dt)))
+                if i_stop > i:
+                    self.fast_forward(t_start + i_stop * dt - self.time)
+                    i = i_stop
             
-            # Progress
-            progress = (i+1) / steps
-            if marker_idx < len(markers) and progress >= markers[marker_idx]:
-                print(f"  Progress: {markers[marker_idx]*100:.0f}% " +
-                      f"(T={self.T_surface:.0f}K, depth={self.depth*1000:.2f}mm)")
-                marker_idx += 1
+            if i < steps:
+                if prefix_key is not None:
+                    before = self._state_scalars()
+                self.step(dt)
+                i += 1
+                if prefix_key is not None and self.plasma_active(self.T_surface):
+                    self._store_prefix(cache, prefix_key, i - 1, before, ignited=True)
+                    prefix_key = None
+            
+            if i >= next_hook:
+                next_hook, stop = self._notify(hooks, i, t_start, dt)
+                if stop:
+                    break
         
-        print()
-        print("Simulation complete!")
+        if hooks:
+            self._notify(hooks, i, t_start, dt, final=True)
+        
+        if prefix_key is not None:
+            # No ignition: the whole run is a reusable prefix
+            self._store_prefix(cache, prefix_key, i, self._state_scalars(), ignited=False)
+        
+        self.flush_history()
+        
+        if verbose:
+            print()
+            print("Simulation complete!")
+    
+    def _rhs(self, t, y, plasma_on):
+        """
+        Continuous-time right-hand side for the adaptive integrator
+        
+        State y = [T_surface, depth, energy_used]. The plasma flag is frozen
+        for a whole integration segment so the solver never sees the jump
+        at T_plasma_threshold; events end the segment instead.
+        """
+        T = y[0]
+        f_damage = self.acoustic_damage(t)
+        dT_dt = self.laser_heating(T, f_damage, 1.0)
+        
+        if plasma_on:
+            ddepth_dt = self._plasma_removal_rate(T, f_damage) / self.A_kerf
+            P_total = self.P_acoustic + self.P_laser + self.P_plasma
+        else:
+            ddepth_dt = 0.0
+            P_total = self.P_acoustic + self.P_laser
+            
+        return [dT_dt, ddepth_dt, P_total]
+    
+    def run_adaptive(self, duration, rtol=1e-6, atol=None, method='LSODA',
+                     safety_stop=True, verbose=True, output=None):
+        """
+        Run with an adaptive ODE solver and event detection
+        
+        Integrates the same energy balance as step() with
+        scipy.integrate.solve_ivp instead of fixed explicit Euler. Events
+        locate plasma ignition/extinction (T_plasma_threshold), the melt
+        point (kink in plasma efficiency) and the safety temperature limit
+        (SAFETY_LIMITS['max_surface_temp'], terminal). The dense output is
+        resampled onto the record_interval grid of the history buffer;
+        aggregates reduce AGGREGATE_SAMPLES dense-output samples per
+        interval.
+        
+        Parameters:
+        -----------
+        duration : float
+            Simulation time (s)
+        rtol : float
+            Relative tolerance
+        atol : sequence of float, optional
+            Absolute tolerances for (T, depth, energy) - default scaled
+            to (1e-3 K, 1e-9 m, 1e-3 J) × rtol/1e-6
+        method : str
+            solve_ivp method ('LSODA', 'RK45', 'Radau', ...)
+        safety_stop : bool
+            Stop at the safety temperature limit (False only records the
+            crossing, matching the fixed-step path)
+        verbose : bool
+            Print events and solver statistics
+        output : str or HistoryStore, optional
+            HDF5 file (or open store) the history samples are streamed to,
+            as in run()
+            
+        Returns:
+        --------
+        stats : dict
+            'events' [(name, t)], 'steps', 'nfev', 'segments', 'wall_time'
+        """
+        if self.formation is not None and len(self.formation) > 1:
+            raise ValueError("run_adaptive does not support layered formations; use run()")
+        if self.temperature_dependent:
+            raise ValueError("run_adaptive does not support temperature_dependent properties; use run()")
+        if output is not None:
+            store = self._open_output(output)
+            try:
+                return self.run_adaptive(duration, rtol, atol, method, safety_stop, verbose)
+            finally:
+                self._close_output(store, output)
+        from scipy.integrate import solve_ivp  # Deferred: ~0.3 s of import time
+        if atol is None:
+            atol = np.array([1e-3, 1e-9, 1e-3]) * (rtol / 1e-6)
+        
+        T_safety = SAFETY_LIMITS['max_surface_temp']
+        
+        def ignition(t, y, plasma_on):
+            return y[0] - self.T_plasma_threshold
+        
+        def melt(t, y, plasma_on):
+            return y[0] - self.T_melt
+        
+        def safety(t, y, plasma_on):
+            return y[0] - T_safety
+        safety.terminal = safety_stop
+        safety.direction = 1
+        
+        t0_wall = time.perf_counter()
+        t_end = self.time + duration
+        y = np.array([self.T_surface, self.depth, self.energy_used])
+        plasma_on = self.plasma_active(self.T_surface)
+        
+        events = []
+        segments = []
+        steps = nfev = 0
+        
+        while self.time < t_end:
+            # Only watch the crossing that leaves the current regime
+            ignition.terminal = True
+            ignition.direction = -1 if plasma_on else 1
+            melt.terminal = True
+            melt.direction = -1 if y[0] >= self.T_melt else 1
+            
+            sol = solve_ivp(self._rhs, (self.time, t_end), y, method=method,
+                            rtol=rtol, atol=atol, dense_output=True,
+                            events=(ignition, melt, safety), args=(plasma_on,))
+            steps += len(sol.t) - 1
+            nfev += sol.nfev
+            segments.append((self.time, sol.t[-1], sol.sol, plasma_on))
+            
+            self.time = sol.t[-1]
+            y = sol.y[:, -1].copy()
+            
+            if not safety_stop:
+                events.extend(('safety_limit', t) for t in sol.t_events[2])
+            
+            if sol.status != 1:
+                if sol.status < 0:
+                    raise RuntimeError(f"solve_ivp failed: {sol.message}")
+                break
+            
+            # Terminal event: find which one and switch regime
+            if safety_stop and sol.t_events[2].size:
+                events.append(('safety_limit', self.time))
+                if verbose:
+                    print(f"  SAFETY LIMIT: T ≥ {T_safety:.0f} K at t={self.time:.4f} s - shutdown")
+                break
+            if sol.t_events[0].size:
+                plasma_on = not plasma_on
+                name = 'plasma_ignition' if plasma_on else 'plasma_extinction'
+                events.append((name, self.time))
+                y[0] = self.T_plasma_threshold
+            if sol.t_events[1].size:
+                events.append(('melt', self.time))
+                y[0] = self.T_melt
+            if verbose:
+                print(f"  Event: {events[-1][0]} at t={self.time:.4f} s")
+        
+        self._resample_segments(segments)
+        
+        self.T_surface = max(y[0], self.T_ambient)
+        self.depth = y[1]
+        self.energy_used = y[2]
+        self.f_damage = self.acoustic_damage(self.time)
+        self.flush_history()
+        
+        stats = {
+            'events': events,
+            'steps': steps,
+            'nfev': nfev,
+            'segments': len(segments),
+            'wall_time': time.perf_counter() - t0_wall,
+        }
+        if verbose:
+            print(f"  Adaptive ({method}): {steps} steps, {nfev} RHS evaluations, "
+                  f"{len(segments)} segments, {stats['wall_time']*1000:.1f} ms")
+        return stats
+    
+    def _dense_rows(self, dense, times, plasma_on):
+        """History rows evaluated from a segment's dense output"""
+        T, depth, energy = dense(times)
+        f_damage = np.array([self.acoustic_damage(t) for t in times])
+        if plasma_on:
+            rate = self._plasma_removal_rate(T, f_damage) / self.A_kerf * 3600
+        else:
+            rate = np.zeros(times.size)
+        eta = np.divide(self.E_specific * (depth * self.A_kerf), energy,
+                        out=np.zeros(times.size), where=(depth > 0) & (energy > 0))
+        return np.column_stack([times, T, f_damage, depth, rate, eta])
+    
+    def _resample_segments(self, segments):
+        """
+        Append dense-output samples on the history grid
+        
+        With aggregates, each record interval is also sampled at
+        AGGREGATE_SAMPLES evenly spaced midpoints (the continuous-time
+        counterpart of the per-step rows reduced by run()). Midpoints past
+        the last record time of a segment carry over to the next segment,
+        or to flush_history().
+        """
+        for t_start, t_stop, dense, plasma_on in segments:
+            t_next = self._next_record
+            if self.record_interval > 0:
+                n = int(np.floor((t_stop - t_next) / self.record_interval + 1e-9)) + 1
+                times = t_next + self.record_interval * np.arange(max(n, 0))
+            else:
+                times = np.array([t_stop])
+            
+            if self.aggregate:
+                fine = np.zeros((0, len(HISTORY_FIELDS)))
+                if t_stop > t_start:
+                    h = (self.record_interval if self.record_interval > 0
+                         else t_stop - t_start) / AGGREGATE_SAMPLES
+                    k = np.arange(np.ceil(t_start / h - 0.5), np.ceil(t_stop / h - 0.5))
+                    if k.size:
+                        fine = self._dense_rows(dense, (k + 0.5) * h, plasma_on)
+                ends = np.searchsorted(fine[:, 0], times, side='right')
+            if not times.size:
+                if self.aggregate:
+                    self._pend(fine)
+                continue
+            
+            rows = self._dense_rows(dense, times, plasma_on)
+            self.history.reserve(len(self.history) + len(rows))
+            for row in rows:
+                self.history.append(row)
+            if self._output is not None:
+                self._output['history'].extend(rows)
+            for callback in self._subscribers:
+                for row in rows:
+                    callback(row)
+            if self.aggregate:
+                start = 0
+                for row, end in zip(rows, ends):
+                    self._pend(fine[start:end])
+                    self._pend(row[None])
+                    self._emit_stats(row[0])
+                    start = end
+                self._pend(fine[start:])
+            
+            self._last_rate = rows[-1, 4]
+            self._last_eta = rows[-1, 5]
+            self._next_record = times[-1] + max(self.record_interval, 0.0)
 
 
-def run_validation():
-    """Run coupled trifecta validation"""
+def compare_integrators(duration=2.0, dt=0.001, method='LSODA', implicit_dt=0.05):
+    """
+    Compare fixed-step Euler with the adaptive integrator at matched accuracy
+    
+    The reference is an adaptive run at rtol=1e-11. The adaptive tolerance
+    is loosened until its error in final depth exceeds that of the
+    fixed-step run; the loosest tolerance still at least as accurate is
+    reported. The large-step implicit path (implicit_dt) is listed too.
+    
+    Returns:
+    --------
+    report : dict
+        Step counts, wall times and final-depth errors of both paths
+    """
+    ref = TrifectaDrillSimulator()
+    ref.run_adaptive(duration, rtol=1e-11, method=method, safety_stop=False, verbose=False)
+    
+    fixed = TrifectaDrillSimulator()
+    with result_cache.disabled():
+        t0 = time.perf_counter()
+        fixed.run(duration, dt, verbose=False)
+        t_fixed = time.perf_counter() - t0
+    err_fixed = abs(fixed.depth - ref.depth) / ref.depth
+    
+    implicit = TrifectaDrillSimulator(integrator='implicit')
+    with result_cache.disabled():
+        t0 = time.perf_counter()
+        implicit.run(duration, implicit_dt, verbose=False)
+        t_implicit = time.perf_counter() - t0
+    err_implicit = abs(implicit.depth - ref.depth) / ref.depth
+    
+    best = None
+    for rtol in [1e-3, 1e-4, 1e-5, 1e-6, 1e-7, 1e-8]:
+        sim = TrifectaDrillSimulator()
+        stats = sim.run_adaptive(duration, rtol=rtol, method=method,
+                                 safety_stop=False, verbose=False)
+        err = abs(sim.depth - ref.depth) / ref.depth
+        if err <= err_fixed:
+            best = (rtol, stats, err)
+            break
+    
+    rtol, stats, err = best
+    report = {
+        'fixed_steps': int(duration / dt),
+        'fixed_time': t_fixed,
+        'fixed_error': err_fixed,
+        'adaptive_rtol': rtol,
+        'adaptive_steps': stats['steps'],
+        'adaptive_nfev': stats['nfev'],
+        'adaptive_time': stats['wall_time'],
+        'adaptive_error': err,
+        'implicit_steps': int(duration / implicit_dt),
+        'implicit_time': t_implicit,
+        'implicit_error': err_implicit,
+    }
+    
+    print(f"Fixed-step Euler (dt={dt*1000:.1f} ms): {report['fixed_steps']} steps, "
+          f"{t_fixed*1000:.1f} ms, depth error {err_fixed:.1e}")
+    print(f"Adaptive {method} (rtol={rtol:.0e}):    {stats['steps']} steps "
+          f"({stats['nfev']} RHS evals), {stats['wall_time']*1000:.1f} ms, depth error {err:.1e}")
+    print(f"Implicit (dt={implicit_dt*1000:.0f} ms):       {report['implicit_steps']} steps, "
+          f"{t_implicit*1000:.1f} ms, depth error {err_implicit:.1e}")
+    return report
+
+
+def check_prefix_cache(duration=2.0, dt=0.001):
+    """
+    Check that runs sharing a PrefixCache match uncached runs
+    
+    A single-material run and a two-layer formation run (granite over
+    sandstone from 1 mm) share one cache in both orders; each must end
+    in the same state as the same run without a cache.
+    
+    Returns:
+    --------
+    depths : dict
+        {name: (uncached depth, cached depth)}
+    """
+    def build(name):
+        if name == 'formation':
+            return TrifectaDrillSimulator(formation=Formation([(0.0, 'granite'), (0.001, 'sandstone')]))
+        return TrifectaDrillSimulator()
+    
+    names = ('plain', 'formation')
+    with result_cache.disabled():
+        reference = {}
+        for name in names:
+            sim = build(name)
+            sim.run(duration, dt, verbose=False)
+            reference[name] = sim.depth
+        depths = {}
+        for order in (names, names[::-1]):
+            cache = PrefixCache()
+            for name in order:
+                sim = build(name)
+                sim.run(duration, dt, verbose=False, cache=cache)
+                depths[name] = (reference[name], sim.depth)
+                if sim.depth != reference[name]:
+                    raise AssertionError(f"{name} after {order[0]}: depth {sim.depth} "
+                                         f"with the shared cache, {reference[name]} without")
+    print("Prefix cache check passed: " +
+          ", ".join(f"{name} {depth*1000:.3f} mm" for name, (depth, _) in depths.items()))
+    return depths
+
+
+def check_streaming(duration=2.0, dt=0.001):
+    """
+    Check that streamed output matches the history in memory
+    
+    Runs once to fill a PrefixCache, then again from the cached prefix
+    while streaming to an HDF5 file and a subscriber. Both must hold as
+    many samples as the simulator's own buffers.
+    
+    Returns:
+    --------
+    counts : dict
+        {series: (rows in memory, rows in the file)}, plus 'subscriber'
+    """
+    import tempfile
+    
+    cache = PrefixCache()
+    TrifectaDrillSimulator(aggregate=('max',)).run(duration, dt, verbose=False, cache=cache)
+    
+    sim = TrifectaDrillSimulator(aggregate=('max',))
+    received = []
+    sim.subscribe(received.append)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stream.h5')
+        sim.run(duration, dt, verbose=False, cache=cache, output=path)
+        with HistoryStore(path) as store:
+            counts = {'history': (len(sim.history), len(store['history'])),
+                      'max': (len(sim.history_stats['max']), len(store['stats/max']))}
+    # The initial sample is recorded by reset(), before any subscriber
+    counts['subscriber'] = (len(sim.history) - 1, len(received))
+    
+    for name, (memory, streamed) in counts.items():
+        if memory != streamed:
+            raise AssertionError(f"{name}: {streamed} rows streamed, {memory} in memory")
+    print(f"Streaming check passed ({cache.hits} prefix hit): " +
+          ", ".join(f"{name} {streamed}" for name, (_, streamed) in counts.items()))
+    return counts
+
+
+def run_validation(plot=True, show=True, background=False):
+    """
+    Run coupled trifecta validation
+    
+    Parameters:
+    -----------
+    plot : bool
+        Draw and save the summary figure (plot_validation)
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    background : bool
+        Render the figure in a background process (see plot_validation)
+    """
     
     print("="*70)
     print("TRIFECTA DRILLING SIMULATOR - COUPLED SYSTEM")
@@ -339,7 +1676,9 @@ def run_validation():
     T_final = sim.T_history[-1]
     f_final = sim.f_damage_history[-1]
     depth_final = sim.depth_history[-1]
-    rate_final = np.mean(sim.rate_history[-500:]) if len(sim.rate_history) > 500 else 0
+    # Average rate over the last 0.5 s
+    t_hist = sim.t_history
+    rate_final = np.mean(sim.rate_history[t_hist >= t_hist[-1] - 0.5]) if t_hist[-1] > 0.5 else 0
     eta_final = sim.eta_history[-1]
     
     print(f"\nFinal State (t={duration:.2f} s):")
@@ -365,20 +1704,81 @@ def run_validation():
     print(f"  Energy per mm: {energy_per_mm:.1f} J/mm")
     print(f"  Specific energy: {eta_final * sim.E_specific / 1e9:.2f} GJ/m³ effective")
     
-    # Generate plots
-    print()
-    print("Generating plots...")
+    if plot:
+        print()
+        print("Generating plots...")
+        plot_validation(sim, rate_final, baseline_rate, show=show, background=background)
     
-    fig = plt.figure(figsize=(16, 10))
+    return sim
+
+
+def plot_validation(sim, rate_final, baseline_rate=2.0,
+                    filename='trifecta_coupled_simulation.png', show=True,
+                    background=False, max_points=SCREEN_POINTS, method='lttb'):
+    """
+    Summary figure of a finished run (imports matplotlib on first call)
     
-    t_arr = np.array(sim.t_history) * 1000  # Convert to ms
+    The history is downsampled to max_points per line before drawing, so
+    the figure costs the same for a 2 s and a 1 h run.
+    
+    Parameters:
+    -----------
+    sim : TrifectaDrillSimulator
+        Simulator after run()
+    rate_final : float
+        Drilling rate reported for the end of the run (m/hr)
+    baseline_rate : float
+        Mechanical drilling rate for comparison (m/hr)
+    filename : str
+        Output image
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    background : bool
+        Render on the Agg backend in a background process and return at
+        once (show is ignored)
+    max_points : int
+        Points kept per line
+    method : str
+        Downsampler, 'lttb' or 'minmax' (see plotting.downsample)
+        
+    Returns:
+    --------
+    future : concurrent.futures.Future or None
+        Pending render when background=True
+    """
+    t = sim.t_history * 1000  # ms
+    crossed = np.flatnonzero(sim.T_history >= sim.T_plasma_threshold)
+    data = {
+        'lines': {name: downsample(t, sim.history[name], max_points, method)
+                  for name in HISTORY_FIELDS[1:]},
+        'duration': t[-1],
+        't_plasma_start': t[crossed[0]] if crossed.size else None,
+        'T_plasma_threshold': sim.T_plasma_threshold,
+        'T_melt': sim.T_melt,
+        'powers': [sim.P_acoustic, sim.P_laser, sim.P_plasma],
+        'rate_final': rate_final,
+        'baseline_rate': baseline_rate,
+    }
+    if background:
+        return render_in_background(render_validation, data, filename)
+    render_validation(data, filename, show)
+
+
+def render_validation(data, filename='trifecta_coupled_simulation.png', show=True):
+    """Draw the plot_validation() figure from its downsampled data"""
+    plt = pyplot(show)
+    lines = data['lines']
+    baseline_rate = data['baseline_rate']
+    rate_final = data['rate_final']
+    
+    fig = plt.figure(figsize=(16, 10))
     
     # 1. Temperature evolution
     ax1 = plt.subplot(3, 3, 1)
-    ax1.plot(t_arr, sim.T_history, 'r-', linewidth=2)
-    ax1.axhline(sim.T_plasma_threshold, color='orange', linestyle='--', 
-                label=f'Plasma threshold ({sim.T_plasma_threshold:.0f}K)')
-    ax1.axhline(sim.T_melt, color='gray', linestyle='--', alpha=0.5, label='Melting point')
+    ax1.plot(*lines['T'], 'r-', linewidth=2)
+    ax1.axhline(data['T_plasma_threshold'], color='orange', linestyle='--', 
+                label=f"Plasma threshold ({data['T_plasma_threshold']:.0f}K)")
+    ax1.axhline(data['T_melt'], color='gray', linestyle='--', alpha=0.5, label='Melting point')
     ax1.set_xlabel('Time (ms)')
     ax1.set_ylabel('Temperature (K)')
     ax1.set_title('Surface Temperature Evolution')
@@ -387,7 +1787,8 @@ def run_validation():
     
     # 2. Acoustic damage
     ax2 = plt.subplot(3, 3, 2)
-    ax2.plot(t_arr, np.array(sim.f_damage_history)*100, 'b-', linewidth=2)
+    t, f_damage = lines['f_damage']
+    ax2.plot(t, f_damage*100, 'b-', linewidth=2)
     ax2.set_xlabel('Time (ms)')
     ax2.set_ylabel('Damage Fraction (%)')
     ax2.set_title('Acoustic Damage Accumulation')
@@ -395,7 +1796,8 @@ def run_validation():
     
     # 3. Drilling depth
     ax3 = plt.subplot(3, 3, 3)
-    ax3.plot(t_arr, np.array(sim.depth_history)*1000, 'g-', linewidth=2)
+    t, depth = lines['depth']
+    ax3.plot(t, depth*1000, 'g-', linewidth=2)
     ax3.set_xlabel('Time (ms)')
     ax3.set_ylabel('Depth (mm)')
     ax3.set_title('Drilling Depth vs Time')
@@ -403,7 +1805,7 @@ def run_validation():
     
     # 4. Drilling rate
     ax4 = plt.subplot(3, 3, 4)
-    ax4.plot(t_arr, sim.rate_history, 'purple', linewidth=2)
+    ax4.plot(*lines['rate'], 'purple', linewidth=2)
     ax4.axhline(baseline_rate, color='gray', linestyle='--', label='Mechanical baseline')
     ax4.set_xlabel('Time (ms)')
     ax4.set_ylabel('Drilling Rate (m/hr)')
@@ -413,7 +1815,8 @@ def run_validation():
     
     # 5. System efficiency
     ax5 = plt.subplot(3, 3, 5)
-    ax5.plot(t_arr, np.array(sim.eta_history)*100, 'orange', linewidth=2)
+    t, eta = lines['eta']
+    ax5.plot(t, eta*100, 'orange', linewidth=2)
     ax5.set_xlabel('Time (ms)')
     ax5.set_ylabel('System Efficiency (%)')
     ax5.set_title('Overall Energy Efficiency')
@@ -421,7 +1824,7 @@ def run_validation():
     
     # 6. Power breakdown
     ax6 = plt.subplot(3, 3, 6)
-    powers = [sim.P_acoustic, sim.P_laser, sim.P_plasma]
+    powers = data['powers']
     labels = ['Acoustic\n(760W)', 'Laser\n(5W)', 'Plasma\n(85W)']
     colors = ['blue', 'red', 'orange']
     ax6.pie(powers, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
@@ -431,19 +1834,14 @@ def run_validation():
     ax7 = plt.subplot(3, 3, 7)
     
     # Mark phases
-    t_plasma_start = None
-    for i, T in enumerate(sim.T_history):
-        if T >= sim.T_plasma_threshold:
-            t_plasma_start = sim.t_history[i] * 1000
-            break
-    
-    ax7.axvspan(0, t_plasma_start if t_plasma_start else duration*1000, 
+    t_plasma_start = data['t_plasma_start']
+    ax7.axvspan(0, t_plasma_start if t_plasma_start else data['duration'], 
                 alpha=0.2, color='blue', label='Acoustic + Laser')
     if t_plasma_start:
-        ax7.axvspan(t_plasma_start, duration*1000, 
+        ax7.axvspan(t_plasma_start, data['duration'], 
                     alpha=0.2, color='red', label='Full Trifecta')
     
-    ax7.plot(t_arr, sim.rate_history, 'k-', linewidth=2)
+    ax7.plot(*lines['rate'], 'k-', linewidth=2)
     ax7.set_xlabel('Time (ms)')
     ax7.set_ylabel('Drilling Rate (m/hr)')
     ax7.set_title('System Phases')
@@ -452,8 +1850,8 @@ def run_validation():
     
     # 8. Synergy factor over time
     ax8 = plt.subplot(3, 3, 8)
-    synergy = np.array(sim.rate_history) / baseline_rate
-    ax8.plot(t_arr, synergy, 'r-', linewidth=2)
+    t, rate = lines['rate']
+    ax8.plot(t, rate / baseline_rate, 'r-', linewidth=2)
     ax8.axhline(1.0, color='gray', linestyle='--', label='Baseline (1×)')
     ax8.set_xlabel('Time (ms)')
     ax8.set_ylabel('Speedup Factor')
@@ -480,15 +1878,13 @@ def run_validation():
                 ha='center', va='bottom', fontsize=12, fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig('trifecta_coupled_simulation.png', dpi=150, bbox_inches='tight')
-    print("Plot saved: trifecta_coupled_simulation.png")
-    plt.show()
-    
-    return sim
+    plt.savefig(filename, dpi=150, bbox_inches='tight')
+    print(f"Plot saved: {filename}")
+    finish(plt, fig, show)
 
 
 if __name__ == '__main__':
-    sim = run_validation()
+    sim = run_validation(plot=not headless_requested())
     
     print()
     print("="*70)
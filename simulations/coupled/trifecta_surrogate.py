@@ -0,0 +1,458 @@
+"""
+Trifecta Surrogate - Fast Queries of the Coupled Simulator
+==========================================================
+
+Fits cheap regression models to coupled-simulator runs so control and
+planning code can ask for drilling rate, time to ignition and energy per
+mm in microseconds instead of running the simulator.
+
+Per material, inputs (P_acoustic, P_laser, P_plasma, duty_cycle) are
+sampled on a scrambled Sobol design within box bounds and simulated in
+ensemble chunks (optionally on a process pool). Each output gets a cubic
+radial-basis-function interpolant with a linear tail, fitted and
+evaluated with plain NumPy:
+
+- 'margin' = T_final - T_plasma_threshold decides whether the plasma
+  ignited (smooth, so it interpolates well across the ignition boundary)
+- 'rate', 't_ignition' and the mean removal rate over the plasma-on
+  window, depth / (duration - t_ignition + dt), are fitted on the ignited
+  runs
+- energy per mm follows from those exactly: the input energy is known in
+  closed form once t_ignition is, so late ignitions (tiny depth, huge
+  J/mm) do not have to be interpolated directly
+
+Leave-one-out errors (Rippa's closed form) give a local error estimate
+per query, and held-out runs give the validation report. Queries outside
+the trained box, for untrained materials, or too close to the ignition
+boundary to classify fall back to the full simulator.
+
+Typical use:
+    surrogate = TrifectaSurrogate.build(['granite', 'basalt'])
+    surrogate.save('trifecta_surrogate.npz')
+    surrogate.query('granite', P_laser=5.5, P_plasma=90.0)
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import qmc
+
+from trifecta_simulator import TrifectaDrillSimulator, material_parameters
+from trifecta_ensemble import TrifectaEnsembleSimulator
+
+INPUTS = ('P_acoustic', 'P_laser', 'P_plasma', 'duty_cycle')
+OUTPUTS = ('rate', 't_ignition', 'energy_per_mm')
+
+# Interpolants fitted on the ignited runs only
+IGNITED_MODELS = ('rate', 't_ignition', 'mean_rate')
+
+DEFAULT_BOUNDS = {
+    'P_acoustic': (100.0, 850.0),
+    'P_laser': (1.0, 6.0),
+    'P_plasma': (20.0, 100.0),
+    'duty_cycle': (0.02, 0.5),
+}
+
+SURROGATE_VERSION = 1
+
+
+class CubicRBF:
+    """
+    Cubic RBF interpolant φ(r) = r³ with a linear polynomial tail
+
+    Inputs are expected in the unit cube. loo_errors holds the
+    leave-one-out residual at every center (Rippa 1999).
+    """
+
+    def __init__(self, centers=None, weights=None, tail=None, loo_errors=None):
+        self.centers = centers
+        self.weights = weights
+        self.tail = tail
+        self.loo_errors = loo_errors
+
+    def fit(self, X, y, smoothing=1e-10):
+        X = np.asarray(X, dtype=float)
+        n, d = X.shape
+        r = np.sqrt(((X[:, None, :] - X[None, :, :])**2).sum(-1))
+        P = np.hstack([np.ones((n, 1)), X])
+        M = np.zeros((n + d + 1, n + d + 1))
+        M[:n, :n] = r**3 + smoothing * np.eye(n)
+        M[:n, n:] = P
+        M[n:, :n] = P.T
+        rhs = np.concatenate([y, np.zeros(d + 1)])
+
+        M_inv = np.linalg.inv(M)
+        coef = M_inv @ rhs
+        self.centers = X
+        self.weights = coef[:n]
+        self.tail = coef[n:]
+        self.loo_errors = coef[:n] / np.diag(M_inv)[:n]
+        return self
+
+    def distances(self, X):
+        X = np.atleast_2d(X)
+        return np.sqrt(((X[:, None, :] - self.centers[None, :, :])**2).sum(-1))
+
+    def predict(self, X, dist=None):
+        X = np.atleast_2d(X)
+        if dist is None:
+            dist = self.distances(X)
+        # weights/tail may hold several outputs as columns
+        return dist**3 @ self.weights + self.tail[0] + X @ self.tail[1:]
+
+    def error(self, X, dist=None, k=8):
+        """Local error estimate: distance-weighted LOO error of the k nearest centers"""
+        if dist is None:
+            dist = self.distances(X)
+        k = min(k, dist.shape[1])
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        w = 1.0 / (dist[np.arange(len(dist))[:, None], nearest] + 1e-6)
+        loo = np.abs(self.loo_errors[nearest])
+        if loo.ndim == 3:
+            w = w[..., None]
+        return (w * loo).sum(1) / w.sum(1)
+
+    def to_arrays(self, prefix):
+        return {f'{prefix}/centers': self.centers, f'{prefix}/weights': self.weights,
+                f'{prefix}/tail': self.tail, f'{prefix}/loo_errors': self.loo_errors}
+
+    @classmethod
+    def from_arrays(cls, data, prefix):
+        return cls(*(data[f'{prefix}/{name}'] for name in ('centers', 'weights', 'tail', 'loo_errors')))
+
+
+def _simulate(material, X, duration, dt):
+    """Coupled runs for rows of X (columns INPUTS); raw outputs"""
+    params = {name: X[:, i] for i, name in enumerate(INPUTS)}
+    ens = TrifectaEnsembleSimulator(n=len(X), **material_parameters(material), **params)
+    ens.run(duration, dt)
+    res = ens.results()
+    res['margin'] = res['T'] - ens.T_plasma_threshold
+    res['P_base'] = ens.P_acoustic + ens.P_laser
+    res['P_plasma'] = ens.P_plasma
+    return {name: res[name] for name in ('margin', 'depth', 'P_base', 'P_plasma', *OUTPUTS)}
+
+
+def _simulate_parallel(material, X, duration, dt, workers, chunk_size=256):
+    chunks = [X[i:i + chunk_size] for i in range(0, len(X), chunk_size)]
+    if workers == 1:
+        parts = [_simulate(material, chunk, duration, dt) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate, [material] * len(chunks), chunks,
+                                  [duration] * len(chunks), [dt] * len(chunks)))
+    return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+
+class TrifectaSurrogate:
+    """Per-material RBF surrogates of the coupled simulator"""
+
+    def __init__(self, bounds=None, duration=2.0, dt=0.001):
+        self.bounds = dict(DEFAULT_BOUNDS if bounds is None else bounds)
+        self.duration = duration
+        self.dt = dt
+        self.low = np.array([self.bounds[name][0] for name in INPUTS], dtype=float)
+        self.high = np.array([self.bounds[name][1] for name in INPUTS], dtype=float)
+        self.models = {}       # material -> {output: CubicRBF}
+        self.validation = {}   # material -> holdout report
+        self._joints = {}
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, materials=('granite',), n_train=512, n_holdout=128, bounds=None,
+              duration=2.0, dt=0.001, workers=None, seed=0, verbose=True):
+        """
+        Sample the simulator and fit surrogates
+
+        Parameters:
+        -----------
+        materials : sequence of str
+            Materials to train
+        n_train, n_holdout : int
+            Training (Sobol, best a power of two) and validation (Latin
+            hypercube) runs per material
+        bounds : dict, optional
+            {input: (low, high)} (default DEFAULT_BOUNDS)
+        duration, dt : float
+            Simulated time and step per run (s)
+        workers : int, optional
+            Worker processes for the runs (default os.cpu_count())
+        seed : int
+            Sobol scrambling seed
+        verbose : bool
+            Print the validation report
+
+        Returns:
+        --------
+        surrogate : TrifectaSurrogate
+        """
+        surrogate = cls(bounds, duration, dt)
+        workers = workers or os.cpu_count() or 1
+        for material in materials:
+            t0 = time.perf_counter()
+            U = np.vstack([qmc.Sobol(d=len(INPUTS), scramble=True, seed=seed).random(n_train),
+                           qmc.LatinHypercube(d=len(INPUTS), seed=seed + 1).random(n_holdout)])
+            X = surrogate.low + U * (surrogate.high - surrogate.low)
+            Y = _simulate_parallel(material, X, duration, dt, workers)
+
+            train = slice(0, n_train)
+            hold = slice(n_train, None)
+            surrogate.models[material] = surrogate._fit(U[train], {k: v[train] for k, v in Y.items()})
+            surrogate.validation[material] = surrogate._validate(
+                material, X[hold], {k: v[hold] for k, v in Y.items()})
+            surrogate.validation[material]['build_time'] = time.perf_counter() - t0
+            if verbose:
+                surrogate.print_validation(material)
+        return surrogate
+
+    def _fit(self, U, Y):
+        ignited = Y['margin'] >= 0
+        models = {'margin': CubicRBF().fit(U, Y['margin'])}
+        if ignited.sum() > len(INPUTS) + 1:
+            # Plasma-on time, counting the ignition step itself
+            window = self.duration - Y['t_ignition'][ignited] + self.dt
+            targets = {'rate': Y['rate'][ignited], 't_ignition': Y['t_ignition'][ignited],
+                       'mean_rate': Y['depth'][ignited] / window}
+            for name in IGNITED_MODELS:
+                models[name] = CubicRBF().fit(U[ignited], targets[name])
+        return models
+
+    def _validate(self, material, X, Y):
+        pred = self.predict(material, X)
+        report = {'n_holdout': len(X)}
+        ignited = Y['margin'] >= 0
+        report['classification_accuracy'] = float(np.mean(pred['ignited'] == ignited))
+        both = ignited & pred['ignited']
+        for name in OUTPUTS:
+            err = pred[name][both] - Y[name][both]
+            if name == 'energy_per_mm':
+                err = err / Y[name][both]  # Relative
+                report['energy_per_mm_median'] = float(np.median(np.abs(err))) if both.any() else np.nan
+            report[f'{name}_rmse'] = float(np.sqrt(np.mean(err**2))) if both.any() else np.nan
+            report[f'{name}_max'] = float(np.max(np.abs(err))) if both.any() else np.nan
+        return report
+
+    def print_validation(self, material):
+        v = self.validation[material]
+        print(f"{material.capitalize()}: built in {v['build_time']:.1f} s, "
+              f"{v['n_holdout']} holdout runs, ignition classified {v['classification_accuracy']*100:.1f}% correctly")
+        print(f"  rate:          RMSE {v['rate_rmse']:.3g} m/hr, max {v['rate_max']:.3g} m/hr")
+        print(f"  t_ignition:    RMSE {v['t_ignition_rmse']*1000:.3g} ms, max {v['t_ignition_max']*1000:.3g} ms")
+        print(f"  energy_per_mm: RMSE {v['energy_per_mm_rmse']*100:.3g}%, median {v['energy_per_mm_median']*100:.2g}%, "
+              f"max {v['energy_per_mm_max']*100:.3g}% (worst at late ignition)")
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _unit(self, X):
+        return (np.atleast_2d(X) - self.low) / (self.high - self.low)
+
+    def predict(self, material, X):
+        """
+        Vectorized surrogate evaluation (no domain checks or fallback)
+
+        Parameters:
+        -----------
+        material : str
+            Trained material
+        X : array_like, shape (m, 4)
+            Inputs in INPUTS order
+
+        Returns:
+        --------
+        pred : dict of ndarray
+            'ignited', the OUTPUTS (NaN/0/inf where not ignited), and
+            '<output>_error' local error estimates
+        """
+        models = self.models[material]
+        X = np.atleast_2d(X)
+        U = self._unit(X)
+        dist = models['margin'].distances(U)
+        margin = models['margin'].predict(U, dist)
+        pred = {'margin': margin, 'margin_error': models['margin'].error(U, dist)}
+        ignited = margin >= 0
+
+        # Ignited-only models share a subset of the margin model's centers
+        # and are evaluated together as one multi-output interpolant
+        values, errors = {}, {}
+        if 'rate' in models:
+            joint = self._joint(material)
+            sub = dist[:, joint.index]
+            V = joint.predict(U, sub)
+            E = joint.error(U, sub)
+            for j, name in enumerate(IGNITED_MODELS):
+                values[name] = V[:, j]
+                errors[name] = E[:, j]
+        else:
+            ignited[:] = False  # No ignited training runs
+            for name in IGNITED_MODELS:
+                values[name] = errors[name] = np.zeros(len(U))
+
+        # Exact energy bookkeeping given the ignition time
+        P_base = X[:, INPUTS.index('P_acoustic')] + X[:, INPUTS.index('P_laser')]
+        P_plasma = X[:, INPUTS.index('P_plasma')]
+        window = np.maximum(self.duration - values['t_ignition'] + self.dt, self.dt)
+        energy = P_base * self.duration + P_plasma * window
+        depth_mm = np.maximum(values['mean_rate'] * window, 1e-12) * 1000
+        energy_per_mm = energy / depth_mm
+        # First-order propagation of the t_ignition and mean_rate errors
+        error_epm = energy_per_mm * (errors['mean_rate'] / np.maximum(values['mean_rate'], 1e-30) +
+                                     errors['t_ignition'] * (1 / window + P_plasma / energy))
+
+        pred['ignited'] = ignited
+        pred['rate'] = np.where(ignited, values['rate'], 0.0)
+        pred['t_ignition'] = np.where(ignited, values['t_ignition'], np.nan)
+        pred['energy_per_mm'] = np.where(ignited, energy_per_mm, np.inf)
+        pred['rate_error'] = np.where(ignited, errors['rate'], 0.0)
+        pred['t_ignition_error'] = np.where(ignited, errors['t_ignition'], 0.0)
+        pred['energy_per_mm_error'] = np.where(ignited, error_epm, 0.0)
+        return pred
+
+    def _joint(self, material):
+        """IGNITED_MODELS stacked column-wise, with their center indices"""
+        joint = self._joints.get(material)
+        if joint is None:
+            models = self.models[material]
+            lookup = {row.tobytes(): i for i, row in enumerate(models['margin'].centers)}
+            first = models[IGNITED_MODELS[0]]
+            joint = CubicRBF(first.centers,
+                             np.column_stack([models[name].weights for name in IGNITED_MODELS]),
+                             np.column_stack([models[name].tail for name in IGNITED_MODELS]),
+                             np.column_stack([models[name].loo_errors for name in IGNITED_MODELS]))
+            joint.index = np.array([lookup[row.tobytes()] for row in first.centers])
+            self._joints[material] = joint
+        return joint
+
+    def in_domain(self, material, X):
+        """True where the query lies inside the trained box of a trained material"""
+        X = np.atleast_2d(X)
+        if material not in self.models:
+            return np.zeros(len(X), dtype=bool)
+        return np.all((X >= self.low) & (X <= self.high), axis=1)
+
+    def query(self, material='granite', margin_sigma=3.0, **inputs):
+        """
+        Single-point query with error estimate and simulator fallback
+
+        Parameters:
+        -----------
+        material : str
+            Material name
+        margin_sigma : float
+            Fall back when the predicted ignition margin is within this many
+            error estimates of zero
+        **inputs : float
+            Any of INPUTS (missing ones take the simulator defaults)
+
+        Returns:
+        --------
+        result : dict
+            'rate' (m/hr), 't_ignition' (s, NaN if no ignition),
+            'energy_per_mm' (J/mm), '<output>_error' and 'source'
+            ('surrogate' or 'simulator')
+        """
+        unknown = set(inputs) - set(INPUTS)
+        if unknown:
+            raise ValueError(f"Unknown input(s): {sorted(unknown)}")
+        x = np.array([[inputs[name] if name in inputs else self._default(name) for name in INPUTS]])
+
+        if self.in_domain(material, x)[0]:
+            pred = self.predict(material, x)
+            if abs(pred['margin'][0]) > margin_sigma * pred['margin_error'][0]:
+                result = {name: float(pred[name][0]) for name in OUTPUTS}
+                result.update({f'{name}_error': float(pred[f'{name}_error'][0]) for name in OUTPUTS})
+                result['source'] = 'surrogate'
+                return result
+
+        Y = _simulate(material, x, self.duration, self.dt)
+        result = {name: float(Y[name][0]) for name in OUTPUTS}
+        result.update({f'{name}_error': 0.0 for name in OUTPUTS})
+        result['source'] = 'simulator'
+        return result
+
+    _defaults = None
+
+    @classmethod
+    def _default(cls, name):
+        if cls._defaults is None:
+            sim = TrifectaDrillSimulator()
+            cls._defaults = {input_name: getattr(sim, input_name) for input_name in INPUTS}
+        return cls._defaults[name]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        """Write all materials to one npz (atomic)"""
+        meta = {'version': SURROGATE_VERSION, 'bounds': self.bounds, 'duration': self.duration,
+                'dt': self.dt, 'validation': self.validation,
+                'models': {material: list(models) for material, models in self.models.items()}}
+        arrays = {'meta': np.array(json.dumps(meta))}
+        for material, models in self.models.items():
+            for name, model in models.items():
+                arrays.update(model.to_arrays(f'{material}/{name}'))
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['version'] != SURROGATE_VERSION:
+                raise ValueError(f"Surrogate file version {meta['version']} "
+                                 f"(expected {SURROGATE_VERSION}); rebuild it")
+            surrogate = cls({k: tuple(v) for k, v in meta['bounds'].items()},
+                            meta['duration'], meta['dt'])
+            surrogate.validation = meta['validation']
+            for material, names in meta['models'].items():
+                surrogate.models[material] = {name: CubicRBF.from_arrays(data, f'{material}/{name}')
+                                              for name in names}
+        return surrogate
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("TRIFECTA SURROGATE - BUILD AND VALIDATE")
+    print("="*70)
+    print()
+
+    surrogate = TrifectaSurrogate.build(['granite', 'basalt'])
+    path = os.path.join(tempfile.gettempdir(), 'trifecta_surrogate.npz')
+    surrogate.save(path)
+    surrogate = TrifectaSurrogate.load(path)
+
+    print()
+    point = {'P_acoustic': 500.0, 'P_laser': 5.5, 'P_plasma': 90.0, 'duty_cycle': 0.1}
+    n = 2000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fast = surrogate.query('granite', **point)
+    t_query = (time.perf_counter() - t0) / n
+    t0 = time.perf_counter()
+    full = _simulate('granite', np.array([[point[name] for name in INPUTS]]), 2.0, 0.001)
+    t_full = time.perf_counter() - t0
+
+    print(f"Query {point}")
+    print(f"  surrogate: rate {fast['rate']:.2f} ± {fast['rate_error']:.2f} m/hr, "
+          f"ignition {fast['t_ignition']:.3f} s, {fast['energy_per_mm']:.1f} J/mm  ({t_query*1e6:.0f} µs)")
+    print(f"  simulator: rate {full['rate'][0]:.2f} m/hr, "
+          f"ignition {full['t_ignition'][0]:.3f} s, {full['energy_per_mm'][0]:.1f} J/mm  ({t_full*1e3:.0f} ms)")
@@ -19,8 +19,13 @@ Author: Sportysport + Claude + Grok collaboration
 Date: December 2025
 """
 
+import os
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from plotting import finish, headless_requested, pyplot
 
 class PlasmaEfficiencyModel:
     """Model plasma cutting efficiency with temperature dependence"""
@@ -99,16 +104,19 @@ class PlasmaEfficiencyModel:
         
         Parameters:
         -----------
-        T_material : float
+        T_material : float or array_like
             Material surface temperature (K)
-        f_damage : float
-            Acoustic damage fraction (0-1)
+        f_damage : float or array_like
+            Acoustic damage fraction (0-1), broadcast against T_material
             
         Returns:
         --------
-        eta_transfer : float
+        eta_transfer : float or ndarray
             Transfer efficiency (0-1)
         """
+        T_material = np.asarray(T_material, dtype=float)
+        f_damage = np.asarray(f_damage, dtype=float)
+        
         # Base efficiency (cold, undamaged material)
         eta_base = self.eta_transfer_base
         
@@ -128,7 +136,7 @@ class PlasmaEfficiencyModel:
         eta_total = eta_preheat * eta_damage
         
         # Cap at realistic maximum
-        eta_total = np.min([eta_total, 0.95])
+        eta_total = np.minimum(eta_total, 0.95)
         
         return eta_total
     
@@ -138,16 +146,18 @@ class PlasmaEfficiencyModel:
         
         Parameters:
         -----------
-        T_material : float
+        T_material : float or array_like
             Material surface temperature (K)
-        f_damage : float
+        f_damage : float or array_like
             Acoustic damage fraction
             
         Returns:
         --------
-        removal_rate : float
+        removal_rate : float or ndarray
             Volume removal rate (m³/s)
         """
+        T_material = np.asarray(T_material, dtype=float)
+        
         # Effective power delivered to material
         eta_trans = self.transfer_efficiency(T_material, f_damage)
         P_effective = self.P_plasma * self.eta_arc * eta_trans
@@ -160,10 +170,7 @@ class PlasmaEfficiencyModel:
         E_preheat = self.rho * self.c_p * (T_material - T_0)
         
         # Energy to melt (if needed)
-        if T_material < self.T_melt:
-            E_melt_needed = self.rho * self.L_melt
-        else:
-            E_melt_needed = 0
+        E_melt_needed = np.where(T_material < self.T_melt, self.rho * self.L_melt, 0.0)
             
         # Energy to vaporize
         E_vap = self.rho * self.L_vap
@@ -172,7 +179,7 @@ class PlasmaEfficiencyModel:
         E_eff = E_melt_needed + E_vap
         
         # If E_eff is very low (material near melt), set minimum
-        E_eff = np.max([E_eff, self.E_specific * 0.1])
+        E_eff = np.maximum(E_eff, self.E_specific * 0.1)
         
         # Volume removal rate
         V_dot = P_effective / E_eff
@@ -185,21 +192,24 @@ class PlasmaEfficiencyModel:
         
         Parameters:
         -----------
-        T_material : float
+        T_material : float or array_like
             Material temperature (K)
-        f_damage : float
+        f_damage : float or array_like
             Acoustic damage fraction
-        kerf_width : float
+        kerf_width : float or array_like
             Cutting kerf width (m) - default 1mm
             
+        All inputs broadcast together, so (T, damage, kerf) grids of any
+        shape evaluate in a single call.
+            
         Returns:
         --------
-        rate : float
+        rate : float or ndarray
             Drilling rate (m/hr)
         """
         V_dot = self.material_removal_rate(T_material, f_damage)
         # Use kerf area (small cutting width, not large drill hole)
-        A_kerf = np.pi * (kerf_width/2)**2
+        A_kerf = np.pi * (np.asarray(kerf_width, dtype=float)/2)**2
         
         rate_m_per_s = V_dot / A_kerf
         rate_m_per_hr = rate_m_per_s * 3600
@@ -207,8 +217,17 @@ class PlasmaEfficiencyModel:
         return rate_m_per_hr
 
 
-def run_validation():
-    """Run plasma efficiency validation"""
+def run_validation(plot=True, show=True):
+    """
+    Run plasma efficiency validation
+    
+    Parameters:
+    -----------
+    plot : bool
+        Draw and save the validation figure (plot_validation)
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    """
     
     print("="*70)
     print("PLASMA CUTTING EFFICIENCY VALIDATION")
@@ -325,17 +344,41 @@ def run_validation():
     print(f"  Rate: {baseline_rate:.1f} → {trifecta['rate']:.1f} m/hr")
     print(f"  Rate enhancement: {trifecta['rate']/baseline_rate:.1f}×")
     
-    # Generate plots
+    if plot:
+        plot_validation(plasma, results, baseline_eta, show=show)
+    
+    return plasma, results
+
+
+def plot_validation(plasma, results, baseline_eta, filename='plasma_efficiency_validation.png',
+                    show=True):
+    """
+    Efficiency and scenario figure (imports matplotlib on first call)
+    
+    Parameters:
+    -----------
+    plasma : PlasmaEfficiencyModel
+        Model to plot
+    results : list of dict
+        Scenario results from run_validation()
+    baseline_eta : float
+        Cold, undamaged transfer efficiency
+    filename : str
+        Output image
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    """
+    plt = pyplot(show)
     fig = plt.figure(figsize=(15, 10))
     
     # 1. Efficiency vs Temperature
     ax1 = plt.subplot(2, 3, 1)
     T_range = np.linspace(300, 1500, 100)
-    eta_cold = [plasma.transfer_efficiency(T, 0.0) for T in T_range]
-    eta_damaged = [plasma.transfer_efficiency(T, 0.67) for T in T_range]
+    eta_cold = plasma.transfer_efficiency(T_range, 0.0)
+    eta_damaged = plasma.transfer_efficiency(T_range, 0.67)
     
-    ax1.plot(T_range, np.array(eta_cold)*100, 'b-', linewidth=2, label='No acoustic')
-    ax1.plot(T_range, np.array(eta_damaged)*100, 'r-', linewidth=2, label='With acoustic')
+    ax1.plot(T_range, eta_cold*100, 'b-', linewidth=2, label='No acoustic')
+    ax1.plot(T_range, eta_damaged*100, 'r-', linewidth=2, label='With acoustic')
     ax1.axvline(300, color='gray', linestyle='--', alpha=0.5, label='Baseline')
     ax1.axvline(1305, color='orange', linestyle='--', alpha=0.5, label='Laser heated')
     ax1.set_xlabel('Material Temperature (K)')
@@ -346,8 +389,8 @@ def run_validation():
     
     # 2. Drilling Rate vs Temperature
     ax2 = plt.subplot(2, 3, 2)
-    rate_cold = [plasma.drilling_rate(T, 0.0) for T in T_range]
-    rate_damaged = [plasma.drilling_rate(T, 0.67) for T in T_range]
+    rate_cold = plasma.drilling_rate(T_range, 0.0)
+    rate_damaged = plasma.drilling_rate(T_range, 0.67)
     
     ax2.plot(T_range, rate_cold, 'b-', linewidth=2, label='No acoustic')
     ax2.plot(T_range, rate_damaged, 'r-', linewidth=2, label='With acoustic')
@@ -362,11 +405,11 @@ def run_validation():
     # 3. Enhancement Factor vs Damage
     ax3 = plt.subplot(2, 3, 3)
     f_range = np.linspace(0, 1, 50)
-    eta_300K = [plasma.transfer_efficiency(300, f) for f in f_range]
-    eta_1305K = [plasma.transfer_efficiency(1305, f) for f in f_range]
+    eta_300K = plasma.transfer_efficiency(300, f_range)
+    eta_1305K = plasma.transfer_efficiency(1305, f_range)
     
-    ax3.plot(f_range*100, np.array(eta_300K)/baseline_eta, 'b-', linewidth=2, label='Cold (300K)')
-    ax3.plot(f_range*100, np.array(eta_1305K)/baseline_eta, 'r-', linewidth=2, label='Heated (1305K)')
+    ax3.plot(f_range*100, eta_300K/baseline_eta, 'b-', linewidth=2, label='Cold (300K)')
+    ax3.plot(f_range*100, eta_1305K/baseline_eta, 'r-', linewidth=2, label='Heated (1305K)')
     ax3.axhline(2.2, color='green', linestyle='--', alpha=0.5, label='Target: 2.2×')
     ax3.set_xlabel('Acoustic Damage Fraction (%)')
     ax3.set_ylabel('Enhancement Factor')
@@ -443,15 +486,13 @@ def run_validation():
                     ha='center', va='bottom', fontsize=9, fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig('plasma_efficiency_validation.png', dpi=150, bbox_inches='tight')
-    print("\nPlots saved to: plasma_efficiency_validation.png")
-    plt.show()
-    
-    return plasma, results
+    plt.savefig(filename, dpi=150, bbox_inches='tight')
+    print(f"\nPlots saved to: {filename}")
+    finish(plt, fig, show)
 
 
 if __name__ == '__main__':
-    plasma, results = run_validation()
+    plasma, results = run_validation(plot=not headless_requested())
     
     print()
     print("="*70)
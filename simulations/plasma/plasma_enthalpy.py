@@ -0,0 +1,487 @@
+"""
+Enthalpy-Method Removal Model for the Plasma Stage
+===================================================
+
+1D phase-change solver beneath the plasma footprint (d_arc).
+
+The closed form in PlasmaEfficiencyModel.material_removal_rate divides the
+delivered power by a fixed specific energy. That ignores conduction into
+the surrounding rock, the energy lost to the hole wall as the hole deepens,
+and resolidification of melt the gas jet fails to clear. This model tracks
+all three.
+
+Physics:
+- Volumetric enthalpy H(z) in a column of cross-section π d_arc²/4
+- Solid → melt plateau (L_melt) → liquid → vapour plateau (L_vap)
+- Axial conduction + lateral conduction to the surrounding rock
+- Arc flux at the hole bottom attenuated by wall losses: exp(-depth/L_wall)
+- Removal: fully vaporized cells leave immediately; the molten layer is
+  ejected by the gas jet down to a retained film that thickens with depth
+  and resolidifies if it loses heat
+
+Numerics:
+- Backward Euler in time (unconditionally stable)
+- Newton iteration on the piecewise-linear T(H); each iteration is one
+  banded (tridiagonal) sparse solve. If Newton stalls between phase kinks
+  the step falls back to chord iteration with a fixed LU-factorized matrix
+- Grid attached to the moving hole bottom; removed cells are shifted out
+  and fresh far-field cells appended
+
+The solver is too slow to call every coupled step, so
+EnthalpyRemovalSurrogate tabulates mean removal rate over (depth, dwell)
+once per parameter set and persists it on disk.
+
+Cost and accuracy against the closed form are documented in
+docs/validation/plasma-enthalpy-validation.md (reproduce with
+compare_with_closed_form()).
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+from scipy.linalg import solve_banded
+from scipy.sparse import diags
+from scipy.sparse.linalg import splu
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from result_cache import default_directory
+
+# Bump when the solver physics or surrogate layout change
+SURROGATE_VERSION = 1
+
+
+def model_parameters(model):
+    """
+    Collect the parameters that determine a model's output
+
+    Every public numeric (or string) attribute counts, so adding a new
+    constant to the model automatically invalidates existing surrogates.
+
+    Returns:
+    --------
+    params : tuple
+        Sorted (name, value) pairs
+    """
+    return tuple(sorted(
+        (name, value) for name, value in vars(model).items()
+        if not name.startswith('_') and isinstance(value, (int, float, str))
+    ))
+
+
+class EnthalpyRemovalSolver:
+    """Implicit 1D enthalpy solver for plasma melt/vaporization removal"""
+
+    def __init__(self, plasma, dz=10e-6, n_cells=400, dt=2e-4,
+                 T_ambient=300.0, wall_loss_length=0.1, melt_film=20e-6,
+                 eject_length=0.05, R_far_factor=10.0, tol=1e-8, max_iter=50):
+        """
+        Initialize solver from a plasma model
+
+        Parameters:
+        -----------
+        plasma : PlasmaEfficiencyModel
+            Source of material properties, latent heats and torch settings
+        dz : float
+            Cell size (m)
+        n_cells : int
+            Column length in cells (n_cells*dz should exceed the thermal
+            diffusion length over the longest dwell)
+        dt : float
+            Time step (s) - implicit, so limited by accuracy only
+        T_ambient : float
+            Far-field rock temperature (K)
+        wall_loss_length : float
+            e-folding hole depth for arc power lost to the hole wall (m)
+        melt_film : float
+            Melt film retained at the surface of a shallow hole (m)
+        eject_length : float
+            Depth over which the retained film doubles (m) - the gas jet
+            loses momentum in deep, narrow holes
+        R_far_factor : float
+            Outer radius of the lateral conduction zone in units of arc radius
+        tol : float
+            Iteration tolerance (relative to the liquidus enthalpy)
+        max_iter : int
+            Maximum Newton iterations per step before falling back to chord
+        """
+        self.plasma = plasma
+        self.dz = dz
+        self.n_cells = n_cells
+        self.dt = dt
+        self.T_ambient = T_ambient
+        self.wall_loss_length = wall_loss_length
+        self.melt_film = melt_film
+        self.eject_length = eject_length
+        self.R_far_factor = R_far_factor
+        self.tol = tol
+        self.max_iter = max_iter
+
+        p = plasma
+        self.rho_c = p.rho * p.c_p
+        self.A_arc = np.pi * (p.d_arc/2)**2
+
+        # Enthalpy breakpoints (J/m³, relative to T_ambient)
+        self.H_solidus = self.rho_c * (p.T_melt - T_ambient)
+        self.H_liquidus = self.H_solidus + p.rho * p.L_melt
+        self.H_boil = self.H_liquidus + self.rho_c * (p.T_vap - p.T_melt)
+        self.H_vapor = self.H_boil + p.rho * p.L_vap
+
+        # Lateral conduction to the surrounding rock (cylinder shape factor)
+        r = p.d_arc / 2
+        self.beta_lateral = 2 * p.k_thermal / (r**2 * np.log(R_far_factor))  # W/(m³·K)
+
+        self._factorize()
+
+    def _factorize(self):
+        """Build the conduction operator K and LU-factorize the chord matrix"""
+        n = self.n_cells
+        g = self.plasma.k_thermal / self.dz**2
+
+        main = np.full(n, 2 * g + self.beta_lateral)
+        main[0] = g + self.beta_lateral  # insulated top except for the arc flux
+        off = np.full(n - 1, -g)
+        self.K = diags([off, main, off], [-1, 0, 1], format='csr')
+        self._K_main = main
+        self._K_off = off
+
+        # Chord matrix I/dt + K/ρc (max slope of T(H)) - fallback only
+        M = diags(np.full(n, 1.0 / self.dt)) + self.K / self.rho_c
+        self._lu = splu(M.tocsc())
+
+    def _slope(self, H):
+        """dT/dH: 1/ρc in sensible-heat ranges, 0 on the phase plateaus"""
+        sensible = ((H < self.H_solidus) |
+                    ((H >= self.H_liquidus) & (H < self.H_boil)))
+        return sensible / self.rho_c
+
+    def _implicit_step(self, H_old, source):
+        """
+        Solve (H - H_old)/dt + K (T(H) - T_ambient) = source for H
+
+        Returns:
+        --------
+        H : ndarray
+            Enthalpy at the new time level
+        iterations : int
+            Linear solves used
+        """
+        dt = self.dt
+        tol = self.tol * self.H_liquidus
+        ab = np.empty((3, self.n_cells))
+        H = H_old
+
+        # Newton with the banded Jacobian I/dt + K diag(dT/dH)
+        for it in range(1, self.max_iter + 1):
+            R = (H - H_old) / dt + self.K @ (self.temperature(H) - self.T_ambient) - source
+            D = self._slope(H)
+            ab[0, 1:] = self._K_off * D[1:]
+            ab[1] = 1.0 / dt + self._K_main * D
+            ab[2, :-1] = self._K_off * D[:-1]
+            dH = solve_banded((1, 1), ab, -R, check_finite=False)
+            H = H + dH
+            if np.max(np.abs(dH)) < tol:
+                return H, it
+
+        # Newton can cycle across phase kinks - chord iteration always converges
+        for extra in range(1, 100 * self.max_iter + 1):
+            R = (H - H_old) / dt + self.K @ (self.temperature(H) - self.T_ambient) - source
+            dH = self._lu.solve(-R)
+            H = H + dH
+            if np.max(np.abs(dH)) < tol:
+                break
+        return H, self.max_iter + extra
+
+    def temperature(self, H):
+        """Temperature from volumetric enthalpy (vectorized, piecewise linear)"""
+        T = self.T_ambient + np.minimum(H, self.H_solidus) / self.rho_c
+        T += np.clip(H - self.H_liquidus, 0.0, self.H_boil - self.H_liquidus) / self.rho_c
+        return T
+
+    def arc_flux(self, depth, T_surface=None, f_damage=0.0):
+        """
+        Arc heat flux reaching the hole bottom (W/m²)
+
+        Transfer efficiency comes from the plasma model at the pre-heat
+        temperature; wall losses grow exponentially with hole depth.
+        """
+        p = self.plasma
+        if T_surface is None:
+            T_surface = self.T_ambient
+        eta = p.transfer_efficiency(T_surface, f_damage)
+        q0 = p.P_plasma * p.eta_arc * eta / self.A_arc
+        return q0 * np.exp(-depth / self.wall_loss_length)
+
+    def film_thickness(self, depth):
+        """Melt film the gas jet cannot clear at this hole depth (m)"""
+        return self.melt_film * 2.0**(depth / self.eject_length)
+
+    def run(self, depth, dwell, T_initial=None, f_damage=0.0, record_times=None):
+        """
+        Simulate one dwell of the plasma over the hole bottom
+
+        Parameters:
+        -----------
+        depth : float
+            Current hole depth (m)
+        dwell : float
+            Dwell time (s)
+        T_initial : float, optional
+            Pre-heat temperature of the column (K) - default T_ambient
+        f_damage : float
+            Acoustic damage fraction (affects transfer efficiency)
+        record_times : array_like, optional
+            Times (s) at which cumulative removal is reported
+
+        Returns:
+        --------
+        result : dict
+            'times', 'removed' (cumulative removed depth, m), 'vaporized'
+            and 'ejected' (m), 'energy_in' (J), 'steps', 'iterations'
+        """
+        if T_initial is None:
+            T_initial = self.T_ambient
+        if record_times is None:
+            record_times = [dwell]
+        record_times = np.sort(np.asarray(record_times, dtype=float))
+
+        n = self.n_cells
+        dz = self.dz
+        H_init = self.rho_c * (T_initial - self.T_ambient)
+        if T_initial > self.plasma.T_melt:
+            raise ValueError("T_initial must be below T_melt (column starts solid)")
+
+        H = np.full(n, H_init)
+        q = self.arc_flux(depth, T_initial, f_damage)
+        film_cells = int(np.ceil(self.film_thickness(depth) / dz))
+        source = np.zeros(n)
+        source[0] = q / dz
+
+        dt = self.dt
+        n_steps = int(np.ceil(dwell / dt))
+
+        vaporized = ejected = 0
+        removed_out = np.zeros(record_times.size)
+        next_record = 0
+        iterations = 0
+
+        for step in range(1, n_steps + 1):
+            H, its = self._implicit_step(H, source)
+            iterations += its
+
+            # Vaporization: fully vaporized cells leave the hole
+            n_vap = 0
+            while n_vap < n and H[n_vap] >= self.H_vapor:
+                n_vap += 1
+
+            # Melt ejection: clear the molten layer down to the retained film
+            n_liq = n_vap
+            while n_liq < n and H[n_liq] >= self.H_liquidus:
+                n_liq += 1
+            n_eject = max(0, (n_liq - n_vap) - film_cells)
+
+            n_remove = n_vap + n_eject
+            if n_remove:
+                H = np.concatenate([H[n_remove:], np.full(n_remove, H_init)])
+                vaporized += n_vap
+                ejected += n_eject
+
+            t = step * dt
+            while next_record < record_times.size and record_times[next_record] <= t + 1e-12:
+                removed_out[next_record] = (vaporized + ejected) * dz
+                next_record += 1
+
+        return {
+            'times': record_times,
+            'removed': removed_out,
+            'vaporized': vaporized * dz,
+            'ejected': ejected * dz,
+            'energy_in': q * self.A_arc * n_steps * dt,
+            'steps': n_steps,
+            'iterations': iterations,
+        }
+
+    def removal_rate(self, depth, dwell, T_initial=None, f_damage=0.0):
+        """
+        Mean volume removal rate over one dwell (m³/s)
+
+        Same units as PlasmaEfficiencyModel.material_removal_rate.
+        """
+        result = self.run(depth, dwell, T_initial, f_damage)
+        return result['removed'][-1] * self.A_arc / dwell
+
+    def parameters(self):
+        """Solver settings that determine its output (for cache keys)"""
+        return tuple(sorted(
+            (name, value) for name, value in vars(self).items()
+            if not name.startswith('_') and isinstance(value, (int, float))
+        ))
+
+
+class EnthalpyRemovalSurrogate:
+    """Cached (depth, dwell) → removal-rate table built from the solver"""
+
+    def __init__(self, solver, max_depth=0.2, n_depth=17, dwell_range=(1e-3, 1.0),
+                 n_dwell=25, T_initial=None, f_damage=0.0, cache_dir=None):
+        """
+        Build (or load) the surrogate
+
+        One solver run per depth node covers the whole dwell axis, because
+        cumulative removal is recorded at every dwell node.
+
+        Parameters:
+        -----------
+        solver : EnthalpyRemovalSolver
+            Configured solver
+        max_depth : float
+            Deepest hole depth tabulated (m)
+        n_depth : int
+            Depth nodes (uniform in depth)
+        dwell_range : tuple
+            (min, max) dwell time (s), log-spaced nodes
+        n_dwell : int
+            Dwell nodes
+        T_initial : float, optional
+            Pre-heat temperature (K)
+        f_damage : float
+            Acoustic damage fraction
+        cache_dir : str, optional
+            Persistence directory (None → result_cache.default_directory(),
+            False → none)
+        """
+        self.solver = solver
+        self.depths = np.linspace(0.0, max_depth, n_depth)
+        self.dwells = np.geomspace(dwell_range[0], dwell_range[1], n_dwell)
+        self.T_initial = solver.T_ambient if T_initial is None else T_initial
+        self.f_damage = f_damage
+        self.cache_dir = default_directory() if cache_dir is None else cache_dir
+
+        self.key = self._cache_key()
+        self.rates = self._load() if self.cache_dir else None
+        if self.rates is None:
+            self.rates = self._build()
+            if self.cache_dir:
+                self._save()
+
+        self._interp = RegularGridInterpolator(
+            (self.depths, np.log(self.dwells)), self.rates,
+            bounds_error=False, fill_value=None)
+
+    def _cache_key(self):
+        payload = json.dumps({
+            'version': SURROGATE_VERSION,
+            'plasma': model_parameters(self.solver.plasma),
+            'solver': self.solver.parameters(),
+            'depths': self.depths.tolist(),
+            'dwells': self.dwells.tolist(),
+            'T_initial': self.T_initial,
+            'f_damage': self.f_damage,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _cache_path(self):
+        return os.path.join(self.cache_dir, f"plasma_enthalpy_{self.key[:24]}.npz")
+
+    def _build(self):
+        rates = np.empty((self.depths.size, self.dwells.size))
+        for i, depth in enumerate(self.depths):
+            result = self.solver.run(depth, self.dwells[-1], self.T_initial,
+                                     self.f_damage, record_times=self.dwells)
+            rates[i] = result['removed'] * self.solver.A_arc / self.dwells
+        return rates
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                np.savez(fh, key=np.array(self.key), rates=self.rates)
+            os.replace(tmp, self._cache_path())
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _load(self):
+        path = self._cache_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data['key']) != self.key:
+                    return None
+                return data['rates']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def removal_rate(self, depth, dwell):
+        """
+        Interpolated mean removal rate (m³/s), vectorized over depth/dwell
+
+        Dwell is interpolated in log space; values outside the table are
+        linearly extrapolated from the edge cells.
+        """
+        depth, dwell = np.broadcast_arrays(np.asarray(depth, dtype=float),
+                                           np.asarray(dwell, dtype=float))
+        points = np.stack([depth.ravel(), np.log(dwell.ravel())], axis=-1)
+        rate = np.maximum(self._interp(points), 0.0).reshape(depth.shape)
+        return rate[()] if rate.ndim == 0 else rate
+
+
+def compare_with_closed_form(plasma=None, depths=(0.0, 0.01, 0.05, 0.1),
+                             dwell=0.5, T_initial=300.0):
+    """
+    Compare enthalpy-model removal rate and cost against the closed form
+
+    Returns:
+    --------
+    rows : list of dict
+        depth, closed-form and enthalpy rates (mm³/s), ratio, wall time (s)
+    """
+    if plasma is None:
+        from plasma_efficiency import PlasmaEfficiencyModel
+        plasma = PlasmaEfficiencyModel()
+
+    solver = EnthalpyRemovalSolver(plasma)
+
+    t0 = time.perf_counter()
+    n_calls = 10000
+    for _ in range(n_calls):
+        V_closed = plasma.material_removal_rate(T_initial, 0.0)
+    t_closed = (time.perf_counter() - t0) / n_calls
+
+    rows = []
+    print(f"{'depth (mm)':>10s} {'closed (mm³/s)':>15s} {'enthalpy (mm³/s)':>17s} "
+          f"{'ratio':>6s} {'time (s)':>9s}")
+    for depth in depths:
+        t0 = time.perf_counter()
+        V_enth = solver.removal_rate(depth, dwell, T_initial)
+        t_enth = time.perf_counter() - t0
+        rows.append({
+            'depth': depth,
+            'closed': V_closed * 1e9,
+            'enthalpy': V_enth * 1e9,
+            'ratio': V_enth / V_closed,
+            'time': t_enth,
+        })
+        print(f"{depth*1e3:10.0f} {V_closed*1e9:15.3f} {V_enth*1e9:17.3f} "
+              f"{V_enth/V_closed:6.2f} {t_enth:9.3f}")
+    print(f"Closed form: {t_closed*1e6:.1f} µs per call")
+
+    return rows
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("ENTHALPY-METHOD PLASMA REMOVAL vs CLOSED FORM")
+    print("="*70)
+    print()
+    compare_with_closed_form()
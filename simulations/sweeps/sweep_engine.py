@@ -0,0 +1,513 @@
+"""
+Parameter Sweep Engine - Resumable Designs of Experiments
+=========================================================
+
+Runs grid, Latin hypercube or Sobol designs over the coupled, plasma,
+laser and acoustic models on a process pool and stores results in an
+on-disk columnar store:
+
+    <store>/design.json         model, fixed inputs, chunking
+    <store>/design.npz          one column per swept input
+    <store>/chunks/NNNNNN.npz   one column per output + point index
+
+Every file is written to a temporary name and renamed into place, so a
+reader (SweepStore.load) running alongside the sweep only ever sees
+complete chunks. A restarted sweep skips the chunks already on disk,
+which makes interrupted 10⁵-10⁶ point sweeps cheap to finish.
+
+Typical use:
+    space = {'P_laser': (3.0, 8.0), 'P_plasma': (60.0, 120.0)}
+    design = sobol_design(space, 2**14)
+    run_sweep('coupled', design, 'sweeps/laser_plasma', duration=2.0)
+    results = SweepStore('sweeps/laser_plasma').load()
+
+Author: Sportysport + Claude + Grok collaboration
+Date: December 2025
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from scipy.stats import qmc
+
+_SIMULATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for _subdir in ('coupled', 'plasma', 'thermal', 'acoustic'):
+    sys.path.insert(0, os.path.join(_SIMULATIONS, _subdir))
+
+STORE_VERSION = 1
+
+
+# ============================================================================
+# DESIGNS
+# ============================================================================
+
+def _bounds(space):
+    names = list(space)
+    low = np.array([space[name][0] for name in names], dtype=float)
+    high = np.array([space[name][1] for name in names], dtype=float)
+    log = np.array([len(space[name]) > 2 and space[name][2] == 'log' for name in names])
+    return names, low, high, log
+
+
+def _scale(unit, space):
+    """Map points in the unit cube onto the (low, high[, 'log']) ranges"""
+    names, low, high, log = _bounds(space)
+    lo = low.copy()
+    hi = high.copy()
+    lo[log] = np.log(low[log])
+    hi[log] = np.log(high[log])
+    x = lo + unit * (hi - lo)
+    x[:, log] = np.exp(x[:, log])
+    return {name: x[:, i] for i, name in enumerate(names)}
+
+
+def grid_design(space):
+    """
+    Full factorial design
+
+    Parameters:
+    -----------
+    space : dict
+        {name: sequence of values}
+
+    Returns:
+    --------
+    design : dict of ndarray
+        {name: values}, one entry per grid point (last name varies fastest)
+    """
+    names = list(space)
+    axes = np.meshgrid(*[np.asarray(space[name], dtype=float) for name in names], indexing='ij')
+    return {name: axis.ravel() for name, axis in zip(names, axes)}
+
+
+def lhs_design(space, n, seed=0):
+    """
+    Latin hypercube design
+
+    Parameters:
+    -----------
+    space : dict
+        {name: (low, high)} or {name: (low, high, 'log')}
+    n : int
+        Number of points
+    seed : int
+        Random seed
+    """
+    sampler = qmc.LatinHypercube(d=len(space), seed=seed)
+    return _scale(sampler.random(n), space)
+
+
+def sobol_design(space, n, seed=0):
+    """
+    Scrambled Sobol design (n is best a power of two)
+
+    Parameters:
+    -----------
+    space : dict
+        {name: (low, high)} or {name: (low, high, 'log')}
+    n : int
+        Number of points
+    seed : int
+        Scrambling seed
+    """
+    sampler = qmc.Sobol(d=len(space), scramble=True, seed=seed)
+    return _scale(sampler.random(n), space)
+
+
+# ============================================================================
+# MODELS
+# ============================================================================
+# Each evaluator takes {input: array} for one chunk plus fixed keyword
+# inputs and returns {output: array} of the same length.
+
+def evaluate_coupled(points, duration=2.0, dt=0.001, material='granite', **fixed):
+    """
+    Coupled simulator (vectorized over the chunk with the ensemble)
+
+    The material supplies the MATERIAL_PARAMETERS constants; fixed or
+    swept values of the same names override them.
+    """
+    from trifecta_ensemble import TrifectaEnsembleSimulator
+    from trifecta_simulator import material_parameters
+
+    n = len(next(iter(points.values())))
+    params = {**material_parameters(material), **fixed, **points}
+    ens = TrifectaEnsembleSimulator(n=n, **params)
+    ens.run(duration, dt)
+    return ens.results()
+
+
+def evaluate_plasma(points, material='granite', **fixed):
+    """
+    Plasma efficiency model: transfer efficiency, removal and drilling rate
+
+    The model carries granite constants only, so other materials are
+    rejected rather than silently evaluated as granite.
+    """
+    from plasma_efficiency import PlasmaEfficiencyModel
+
+    if material != 'granite':
+        raise ValueError(f"PlasmaEfficiencyModel has no parameters for '{material}' (granite only)")
+    model = PlasmaEfficiencyModel(material)
+    for name, value in fixed.items():
+        setattr(model, name, value)
+
+    n = len(next(iter(points.values())))
+    T = points.get('T_material', np.full(n, model.T_melt))
+    f = points.get('f_damage', np.zeros(n))
+    kerf = points.get('kerf_width', np.full(n, 1e-3))
+    attrs = [name for name in points if name not in ('T_material', 'f_damage', 'kerf_width')]
+
+    if not attrs:
+        return {
+            'eta': model.transfer_efficiency(T, f),
+            'V_dot': model.material_removal_rate(T, f),
+            'rate': model.drilling_rate(T, f, kerf),
+        }
+
+    # Model constants vary per point: evaluate point by point
+    out = {'eta': np.empty(n), 'V_dot': np.empty(n), 'rate': np.empty(n)}
+    for i in range(n):
+        for name in attrs:
+            setattr(model, name, points[name][i])
+        out['eta'][i] = model.transfer_efficiency(T[i], f[i])
+        out['V_dot'][i] = model.material_removal_rate(T[i], f[i])
+        out['rate'][i] = model.drilling_rate(T[i], f[i], kerf[i])
+    return out
+
+
+def evaluate_laser(points, material='granite', **fixed):
+    """Pulsed laser heating: steady-state temperature, pulse rise, time constant"""
+    from pulsed_laser_heating import PulsedLaserHeating
+
+    model = PulsedLaserHeating(material)
+    n = len(next(iter(points.values())))
+    for name, value in {**fixed, **points}.items():
+        if name != 'f_damage':
+            setattr(model, name, value)
+
+    # Refresh the quantities __init__ derives (arrays broadcast per point)
+    model.duty = model.f_pulse * model.t_pulse
+    model.P_peak = model.P_avg / model.duty
+    f = np.clip(points.get('f_damage', fixed.get('f_damage', 0.0)), 0.0, 1.0)
+    model.alpha_eff = model.mat['alpha_base'] * (1 + 3.0 * f)
+
+    T_ss, dT_pulse, tau = model.steady_state_temperature()
+    return {
+        'T_ss': np.broadcast_to(T_ss, (n,)).astype(float),
+        'dT_pulse': np.broadcast_to(dT_pulse, (n,)).astype(float),
+        'tau': np.broadcast_to(tau, (n,)).astype(float),
+    }
+
+
+def _refresh_acoustic(field, given):
+    """Recompute what AcousticPressureField.__init__ derives, except names in given"""
+    derived = {
+        'Z': lambda: field.rho * field.c,
+        'wavelength': lambda: field.c / field.f,
+        'k': lambda: 2 * np.pi / field.wavelength,
+        'alpha': lambda: 0.5 * 1e-2 * 1e-6 * field.f * 0.115,
+        'A_emitter': lambda: np.pi * field.r_emitter**2,
+        'positions': field._generate_positions,
+    }
+    for name, compute in derived.items():  # In dependency order
+        if name not in given:
+            setattr(field, name, compute())
+
+
+def evaluate_acoustic(points, array_type='fol', **fixed):
+    """
+    Rock-contact acoustic field: on-axis pressure and damage fraction at z
+
+    Each point gets its own field built from the constructor arguments,
+    with the fixed and swept constants applied and the derived quantities
+    (wavelength, k, alpha, emitter positions, ...) recomputed from them.
+    """
+    from gorkov_pressure_field_ROCK import AcousticPressureField
+
+    n = len(next(iter(points.values())))
+    n_emitters = points.get('n_emitters', np.full(n, fixed.pop('n_emitters', 19)))
+    z = points.get('z', np.full(n, fixed.pop('z', 0.05)))
+    sigma = points.get('sigma_fracture', np.full(n, fixed.pop('sigma_fracture', 100e6)))
+    attrs = [name for name in points if name not in ('n_emitters', 'z', 'sigma_fracture')]
+    given = set(fixed) | set(attrs)
+
+    P = np.empty(n)
+    f_damage = np.empty(n)
+    for i in range(n):
+        field = AcousticPressureField(array_type, int(n_emitters[i]))
+        for name, value in fixed.items():
+            setattr(field, name, value)
+        for name in attrs:
+            setattr(field, name, points[name][i])
+        if given:
+            _refresh_acoustic(field, given)
+        P[i] = field.pressure_at_point(0.0, 0.0, z[i])
+        f_damage[i] = field.calculate_damage_fraction(P[i], sigma[i])
+
+    return {'P': P, 'f_damage': f_damage}
+
+
+MODELS = {
+    'coupled': evaluate_coupled,
+    'plasma': evaluate_plasma,
+    'laser': evaluate_laser,
+    'acoustic': evaluate_acoustic,
+}
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+def _atomic_savez(path, **arrays):
+    """Write an npz under a temporary name and rename it into place"""
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _atomic_write_text(path, text):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class SweepStore:
+    """
+    Chunked npz results store of one sweep (safe to read while it runs)
+
+    Parameters:
+    -----------
+    path : str
+        Store directory
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.chunk_dir = os.path.join(path, 'chunks')
+
+    @property
+    def meta(self):
+        with open(os.path.join(self.path, 'design.json')) as f:
+            return json.load(f)
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, 'design.json'))
+
+    def design(self):
+        """Swept inputs as {name: ndarray}"""
+        with np.load(os.path.join(self.path, 'design.npz')) as data:
+            return {name: data[name] for name in data.files}
+
+    def chunk_path(self, chunk_id):
+        return os.path.join(self.chunk_dir, f'{chunk_id:06d}.npz')
+
+    def completed_chunks(self):
+        """Sorted ids of the chunks on disk"""
+        if not os.path.isdir(self.chunk_dir):
+            return []
+        return sorted(int(name[:-4]) for name in os.listdir(self.chunk_dir)
+                      if name.endswith('.npz') and not name.startswith('.'))
+
+    def progress(self):
+        """(points done, total points)"""
+        meta = self.meta
+        size = meta['chunk_size']
+        done = sum(min(size, meta['n_points'] - c * size) for c in self.completed_chunks())
+        return done, meta['n_points']
+
+    def create(self, model, design, chunk_size, fixed):
+        """Write the design (or check it matches an existing store)"""
+        names = list(design)
+        n_points = len(design[names[0]]) if names else 0
+        meta = {
+            'version': STORE_VERSION,
+            'model': model,
+            'inputs': names,
+            'fixed': fixed,
+            'n_points': n_points,
+            'chunk_size': chunk_size,
+        }
+        if self.exists():
+            old = self.meta
+            same = (old == json.loads(json.dumps(meta)) and
+                    all(np.array_equal(a, design[name]) for name, a in self.design().items()))
+            if not same:
+                raise ValueError(f"Store '{self.path}' holds a different sweep; "
+                                 f"use a new directory to start another one")
+            return
+
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        _atomic_savez(os.path.join(self.path, 'design.npz'),
+                      **{name: np.asarray(values, dtype=float) for name, values in design.items()})
+        _atomic_write_text(os.path.join(self.path, 'design.json'), json.dumps(meta, indent=2))
+
+    def load(self, columns=None):
+        """
+        Completed points with their inputs
+
+        Parameters:
+        -----------
+        columns : sequence of str, optional
+            Output columns to load (default all)
+
+        Returns:
+        --------
+        results : dict of ndarray
+            'index', the swept inputs and the outputs, for every point in a
+            completed chunk (in design order)
+        """
+        chunks = self.completed_chunks()
+        parts = []
+        for chunk_id in chunks:
+            with np.load(self.chunk_path(chunk_id)) as data:
+                names = data.files if columns is None else ['index', *columns]
+                parts.append({name: data[name] for name in names})
+
+        design = self.design()
+        if not parts:
+            return {'index': np.zeros(0, dtype=np.int64),
+                    **{name: values[:0] for name, values in design.items()}}
+
+        out = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+        for name, values in design.items():
+            out[name] = values[out['index']]
+        return out
+
+
+def _run_chunk(store_path, model, chunk_id, start, points, fixed):
+    """Evaluate one chunk and write it to the store (runs in a worker)"""
+    outputs = MODELS[model](points, **fixed)
+    n = len(next(iter(points.values())))
+    columns = {name: np.asarray(values, dtype=float) for name, values in outputs.items()}
+    columns['index'] = np.arange(start, start + n)
+    _atomic_savez(SweepStore(store_path).chunk_path(chunk_id), **columns)
+    return chunk_id
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def run_sweep(model, design, store_path, chunk_size=1000, workers=None,
+              verbose=True, **fixed):
+    """
+    Evaluate a design and store the results, resuming if interrupted
+
+    Parameters:
+    -----------
+    model : str
+        One of MODELS ('coupled', 'plasma', 'laser', 'acoustic')
+    design : dict of ndarray
+        {input: values} from grid_design/lhs_design/sobol_design
+    store_path : str
+        Store directory (created if missing; an existing store must hold
+        the same sweep and is resumed)
+    chunk_size : int
+        Points per chunk (unit of work, of resume and of visibility)
+    workers : int, optional
+        Worker processes (default os.cpu_count(); 1 runs in-process)
+    verbose : bool
+        Print progress
+    **fixed
+        Inputs held constant (JSON-serializable), e.g. duration, dt, material
+
+    Returns:
+    --------
+    store : SweepStore
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}'. Available: {', '.join(MODELS)}")
+
+    store = SweepStore(store_path)
+    store.create(model, design, chunk_size, fixed)
+    n_points = store.meta['n_points']
+    n_chunks = -(-n_points // chunk_size)
+
+    done = set(store.completed_chunks())
+    todo = [c for c in range(n_chunks) if c not in done]
+    if verbose:
+        print(f"Sweep '{model}' -> {store_path}: {n_points:,} points, "
+              f"{len(done)}/{n_chunks} chunks already done")
+
+    def task(chunk_id):
+        start = chunk_id * chunk_size
+        stop = min(start + chunk_size, n_points)
+        points = {name: np.asarray(values[start:stop], dtype=float) for name, values in design.items()}
+        return (store_path, model, chunk_id, start, points, fixed)
+
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    report_every = max(len(todo) // 20, 1)
+
+    def report(n_finished):
+        if verbose and (n_finished % report_every == 0 or n_finished == len(todo)):
+            elapsed = time.perf_counter() - t0
+            print(f"  {n_finished}/{len(todo)} chunks ({elapsed:.1f} s)")
+
+    if workers == 1:
+        for i, chunk_id in enumerate(todo):
+            _run_chunk(*task(chunk_id))
+            report(i + 1)
+        return store
+
+    # Bounded number of chunks in flight keeps parent memory flat
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        queue = iter(todo)
+        pending = set()
+        n_finished = 0
+        try:
+            for chunk_id in queue:
+                pending.add(pool.submit(_run_chunk, *task(chunk_id)))
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                        n_finished += 1
+                        report(n_finished)
+            for future in pending:
+                future.result()
+                n_finished += 1
+                report(n_finished)
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    return store
+
+
+if __name__ == '__main__':
+    import shutil
+
+    print("="*70)
+    print("PARAMETER SWEEP ENGINE - COUPLED MODEL DEMO")
+    print("="*70)
+    print()
+
+    path = os.path.join(tempfile.gettempdir(), 'trifecta_sweep_demo')
+    shutil.rmtree(path, ignore_errors=True)
+
+    space = {'P_laser': (3.0, 8.0), 'P_plasma': (60.0, 120.0), 'alpha_base': (0.08, 0.25)}
+    design = sobol_design(space, 2**12)
+    store = run_sweep('coupled', design, path, chunk_size=512, duration=2.0)
+
+    res = store.load(columns=['rate', 'energy_per_mm'])
+    best = np.argmax(res['rate'])
+    print()
+    print(f"Loaded {len(res['index']):,} points")
+    print(f"Best rate {res['rate'][best]:.1f} m/hr at P_laser={res['P_laser'][best]:.2f} W, "
+          f"P_plasma={res['P_plasma'][best]:.1f} W, alpha={res['alpha_base'][best]:.3f}")
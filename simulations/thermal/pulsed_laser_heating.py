@@ -14,9 +14,14 @@ Author: Sportysport + Claude + Grok collaboration
 Date: December 2025
 """
 
+import os
+import sys
+
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import odeint
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'code', 'python'))
+from plotting import finish, headless_requested, pyplot
+from result_cache import cached_method
 
 class PulsedLaserHeating:
     """Model pulsed laser heating with thermal diffusion"""
@@ -145,6 +150,7 @@ class PulsedLaserHeating:
         
         return T_ss, dT_pulse, tau
         
+    @cached_method()
     def simulate_pulse_train(self, n_pulses=1000, T_ambient=300):
         """
         Simulate temperature evolution over multiple pulses
@@ -182,8 +188,17 @@ class PulsedLaserHeating:
         return t, T
 
 
-def run_validation():
-    """Run validation simulation matching Grok's results"""
+def run_validation(plot=True, show=True):
+    """
+    Run validation simulation matching Grok's results
+    
+    Parameters:
+    -----------
+    plot : bool
+        Plot the pulse-train temperature evolution (plot_validation)
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    """
     
     print("="*60)
     print("PULSED LASER HEATING VALIDATION")
@@ -235,14 +250,37 @@ def run_validation():
     print(f"Thermal stress:     {sigma_thermal/1e6:.0f} MPa")
     print()
     
-    # Plot temperature evolution
-    t, T = sim.simulate_pulse_train(n_pulses=1000)
+    if plot:
+        t, T = sim.simulate_pulse_train(n_pulses=1000)
+        plot_validation(sim, t, T, T_ss_enhanced, show=show)
     
+    return sim, T_ss_enhanced
+
+
+def plot_validation(sim, t, T, T_ss, filename='../../assets/images/thermal_validation.png',
+                    show=True):
+    """
+    Temperature evolution of a pulse train (imports matplotlib on first call)
+    
+    Parameters:
+    -----------
+    sim : PulsedLaserHeating
+        Model the pulse train was simulated with
+    t, T : array
+        simulate_pulse_train() output
+    T_ss : float
+        Steady-state temperature (K)
+    filename : str
+        Output image
+    show : bool
+        Display the figure (False saves it with the Agg backend)
+    """
+    plt = pyplot(show)
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
     
     # Full evolution
     ax1.plot(t*1000, T, 'b-', linewidth=2)
-    ax1.axhline(T_ss_enhanced, color='r', linestyle='--', label=f'Steady-state: {T_ss_enhanced:.0f} K')
+    ax1.axhline(T_ss, color='r', linestyle='--', label=f'Steady-state: {T_ss:.0f} K')
     ax1.axhline(sim.mat['T_melt'], color='orange', linestyle=':', label=f'Melting: {sim.mat["T_melt"]} K')
     ax1.set_xlabel('Time (ms)')
     ax1.set_ylabel('Temperature (K)')
@@ -258,12 +296,10 @@ def run_validation():
     ax2.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig('../../assets/images/thermal_validation.png', dpi=150)
-    print("Plot saved to: assets/images/thermal_validation.png")
-    plt.show()
-    
-    return sim, T_ss_enhanced
+    plt.savefig(filename, dpi=150)
+    print(f"Plot saved to: {filename}")
+    finish(plt, fig, show)
 
 
 if __name__ == '__main__':
-    sim, T_ss = run_validation()
\ No newline at end of file
+    sim, T_ss = run_validation(plot=not headless_requested())
\ No newline at end of file